@@ -0,0 +1,110 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from collections import defaultdict
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+
+from contest.models import ActiveContestVersion
+from contest.models import Contest
+from contest.models import Contestant
+from contest.contest_info import get_freeze_time_datetime
+
+# cache key of the index of contests restricting submission visibility,
+# formatted with the version of the index
+ACTIVE_CONTEST_INDEX_KEY = 'active_contest_index:%d'
+# seconds the index lives at most, a new version is used when contests change
+ACTIVE_CONTEST_INDEX_TIMEOUT = 300
+
+
+def build_active_contest_index():
+    """Return the contests restricting submission visibility, i.e. the
+    contests (not homework) which have not ended yet, as a list of dicts
+    holding what the visibility rules need. Contests, coowners, problems
+    and contestants are loaded with one query each."""
+    contests = list(Contest.objects.filter(
+        is_homework=False,
+        end_time__gte=datetime.now()
+    ).order_by('id'))
+    contest_ids = [contest.id for contest in contests]
+
+    owners = defaultdict(set)
+    for contest in contests:
+        owners[contest.id].add(contest.owner_id)
+    for contest_id, username in Contest.coowner.through.objects.filter(
+            contest__in=contest_ids).values_list('contest', 'user'):
+        owners[contest_id].add(username)
+
+    problems = defaultdict(set)
+    for contest_id, problem_id in Contest.problem.through.objects.filter(
+            contest__in=contest_ids).values_list('contest', 'problem'):
+        problems[contest_id].add(problem_id)
+
+    contestants = defaultdict(set)
+    for contest_id, username in Contestant.objects.filter(
+            contest__in=contest_ids).values_list('contest', 'user'):
+        contestants[contest_id].add(username)
+
+    return [{
+        'id': contest.id,
+        'owners': owners[contest.id],
+        'problems': problems[contest.id],
+        'contestants': contestants[contest.id],
+        'creation_time': contest.creation_time,
+        'freeze_time': get_freeze_time_datetime(contest),
+        'end_time': contest.end_time,
+    } for contest in contests]
+
+
+def get_active_contest_index_version():
+    versions = ActiveContestVersion.objects.filter(
+        pk=1).values_list('version', flat=True)
+    return versions[0] if versions else 0
+
+
+def get_active_contest_index():
+    """Return the cached index of contests restricting submission
+    visibility. Contests which have ended since the index was built are
+    left out. The index is cached per version kept in the database, so
+    that a change seen by one process is seen by all of them."""
+    key = ACTIVE_CONTEST_INDEX_KEY % get_active_contest_index_version()
+    index = cache.get(key)
+    if index is None:
+        index = build_active_contest_index()
+        cache.set(key, index, ACTIVE_CONTEST_INDEX_TIMEOUT)
+    now = datetime.now()
+    return [contest for contest in index if contest['end_time'] >= now]
+
+
+def invalidate_active_contest_index():
+    """Bump the version of the index, so that no process uses the index
+    it has cached."""
+    versions = ActiveContestVersion.objects.filter(pk=1)
+    if versions.update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ActiveContestVersion.objects.create(pk=1, version=1)
+    except IntegrityError:
+        # created by another bump meanwhile
+        versions.update(version=F('version') + 1)
@@ -0,0 +1,53 @@
+'''
+    Benchmark of the contest resolver, not run with the test suite:
+
+        python manage.py test contest.bench_resolver
+    '''
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.test import SimpleTestCase
+
+from contest.contest_info import build_object_scoreboard
+from contest.resolver import resolve
+from contest.scoreboard import ScoreboardProblem
+from utils.test_helper import random_scoreboard_results
+
+CONTESTANTS = 2000
+PROBLEMS = 10
+
+
+class Bench_Contest_resolver(SimpleTestCase):
+    """ time resolving a frozen scoreboard """
+
+    def setUp(self):
+        start_time = datetime(2015, 1, 1)
+        freeze_time = start_time + timedelta(hours=4)
+        usernames = ['user%d' % i for i in xrange(CONTESTANTS)]
+        problems = [ScoreboardProblem(i, 'problem%d' % i, 0)
+                    for i in xrange(1, PROBLEMS + 1)]
+        total_testcases = dict((problem.id, 10) for problem in problems)
+        results = random_scoreboard_results(
+            usernames, problems, total_testcases, start_time)
+        # results after freeze time are hidden, with a few more attempts
+        frozen_results = {}
+        for key, result in results.items():
+            attempts, ac_time, passed = result
+            if ac_time is not None and ac_time > freeze_time:
+                frozen_results[key] = (attempts - 1, None, 0)
+            elif ac_time is None and random.randint(0, 1):
+                frozen_results[key] = (attempts - 1, None, passed)
+            else:
+                frozen_results[key] = result
+        self.final = build_object_scoreboard(
+            start_time, usernames, problems, total_testcases, results)
+        self.frozen = build_object_scoreboard(
+            start_time, usernames, problems, total_testcases, frozen_results)
+
+    def test_resolve(self):
+        start = time.time()
+        events = resolve(self.frozen, self.final)
+        print '\n%d contestants x %d problems' % (CONTESTANTS, PROBLEMS)
+        print '%d events resolved in %.3fs' % (
+            len(events), time.time() - start)
@@ -0,0 +1,50 @@
+'''
+    Benchmark of the scoreboard engines, not run with the test suite:
+
+        python manage.py test contest.bench_scoreboard
+    '''
+import time
+from datetime import datetime
+
+from django.test import SimpleTestCase
+
+from contest.contest_info import build_object_scoreboard
+from contest.scoreboard import ScoreboardProblem
+from contest.scoreboard_matrix import MatrixScoreboard
+from utils.test_helper import random_scoreboard_results
+
+CONTESTANTS = 5000
+PROBLEMS = 15
+
+
+class Bench_Contest_scoreboard(SimpleTestCase):
+    """ compare the object and the matrix scoreboard engines """
+
+    def setUp(self):
+        self.start_time = datetime(2015, 1, 1)
+        self.usernames = ['user%d' % i for i in xrange(CONTESTANTS)]
+        self.problems = [ScoreboardProblem(i, 'problem%d' % i, 0)
+                         for i in xrange(1, PROBLEMS + 1)]
+        self.total_testcases = dict(
+            (problem.id, 10) for problem in self.problems)
+        self.results = random_scoreboard_results(
+            self.usernames, self.problems, self.total_testcases,
+            self.start_time)
+
+    def run_engine(self, engine):
+        # build and sort the scoreboard as the contest page does
+        start = time.time()
+        scoreboard = engine(self.start_time, self.usernames, self.problems,
+                            self.total_testcases, self.results)
+        scoreboard.sort_users_by_solved_testcases()
+        scoreboard.sort_users_by_penalty()
+        return time.time() - start
+
+    def test_engines(self):
+        object_time = self.run_engine(build_object_scoreboard)
+        matrix_time = self.run_engine(MatrixScoreboard)
+        print '\n%d contestants x %d problems' % (CONTESTANTS, PROBLEMS)
+        print 'object engine: %.3fs' % object_time
+        print 'matrix engine: %.3fs (%.1fx)' % (
+            matrix_time, object_time / matrix_time)
+        self.assertLess(matrix_time, object_time)
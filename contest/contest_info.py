@@ -20,22 +20,26 @@
 import datetime
 import string
 import random
+import json
 from contest.models import Contest
 from contest.models import Contestant
 from contest.models import Clarification
+from contest.models import ContestResult
+from contest.models import ScoreboardSnapshot
+from contest.contest_version import get_data_version
 
 from contest.scoreboard import Scoreboard
 from contest.scoreboard import User as ScoreboardUser
 from contest.scoreboard import ScoreboardProblem
-from contest.scoreboard import UserProblem
-from contest.scoreboard import Submission as ScoreboardSubmission
+from contest.scoreboard import ResultUserProblem
+from contest.scoreboard import display
+from contest.scoreboard_matrix import MatrixScoreboard
 from contest.public_user import is_public_user
 from contest import public_user
 
 from problem.models import Problem
-from problem.models import Testcase
 from problem.models import Submission
-from problem.models import SubmissionDetail
+from problem.problem_info import get_testcase_counts_map
 
 from users.models import User
 
@@ -43,16 +47,25 @@ from utils.user_info import has_contest_ownership
 from utils.user_info import validate_user
 from utils.log_info import get_logger
 from utils import user_info
+from utils import config_info
 
 from django.http import Http404
 from django.contrib.auth.hashers import make_password
 from django.db.models import Q
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
 
 import csv
 from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 logger = get_logger()
 
+# (attempts, AC time, passed testcases) of a problem without submission
+NO_RESULT = (0, None, 0)
+# seconds a cached scoreboard lives at most
+SCOREBOARD_CACHE_TIMEOUT = 300
+
 
 def get_running_contests():
     now = datetime.datetime.now()
@@ -73,8 +86,7 @@ def get_contestant(contest):
 
 
 def get_total_testcases(problem):
-    testcases = Testcase.objects.filter(problem=problem)
-    return testcases.count()
+    return problem.testcase_count
 
 
 def get_contest_submissions(contest, submissions):
@@ -118,77 +130,216 @@ def get_contestant_problem_submission_list_before_freeze_time(contest, contestan
 
 
 def get_passed_testcases(submission):
-    passed_testcases = SubmissionDetail.objects.filter(
-        sid=submission, verdict=SubmissionDetail.AC)
-    return passed_testcases.count()
+    counts = get_testcase_counts_map([submission.id])
+    return counts.get(submission.id, (0, 0))[0]
 
 
 def get_penalty(obj, start_time):
-    penalty = obj.get_penalty(start_time)
-    if penalty == 0:
-        return '--'
-    else:
-        return penalty
+    return display(obj.get_penalty(start_time))
 
 
 def get_submit_times(problem):
-    submit_times = problem.submit_times()
-    if submit_times == 0:
-        return '--'
-    else:
-        return submit_times
+    return display(problem.submit_times())
+
+
+def get_scoreboard_cache_key(contest, show_all, version):
+    view = 'full' if show_all else 'frozen'
+    return 'scoreboard:%d:%s:%d' % (contest.id, view, version)
+
+
+def get_scoreboard_cache_timeout(contest):
+    """Return how many seconds a scoreboard of the contest can be cached.
+    Cached scoreboards never live across the freeze time or the end time."""
+    now = datetime.datetime.now()
+    timeout = SCOREBOARD_CACHE_TIMEOUT
+    for boundary in (get_freeze_time_datetime(contest), contest.end_time):
+        if boundary > now:
+            timeout = min(timeout, int((boundary - now).total_seconds()))
+    return timeout
+
+
+def can_see_full_scoreboard(user, contest):
+    """Return False if the user only sees the scoreboard before freeze time."""
+    return is_ended(contest) or has_contest_ownership(user, contest)
 
 
 def get_scoreboard(user, contest):
-    contestants = get_contestant_list(contest)
+    # contest_result is built on this module, so import it here
+    from contest.contest_result import get_synced_data_version
+    show_all = can_see_full_scoreboard(user, contest)
+    return get_cached_scoreboard(
+        contest, show_all, get_synced_data_version(contest))
+
+
+def get_cached_scoreboard(contest, show_all, version):
+    """Return the scoreboard of a contest at the given data version,
+    building it if it is not cached yet. The full scoreboard of an ended
+    contest is read from its snapshot instead."""
+    key = get_scoreboard_cache_key(contest, show_all, version)
+    scoreboard = cache.get(key)
+    if scoreboard is None:
+        if show_all and is_ended(contest):
+            scoreboard = get_scoreboard_snapshot(contest, version)
+            if scoreboard is None:
+                scoreboard = save_scoreboard_snapshot(contest, version)
+        else:
+            scoreboard = build_scoreboard(contest, show_all)
+        timeout = get_scoreboard_cache_timeout(contest)
+        if timeout > 0:
+            cache.set(key, scoreboard, timeout)
+    return scoreboard
+
+
+def get_scoreboard_snapshot(contest, version):
+    """Return the final scoreboard of an ended contest stored at the given
+    data version, or None if there is no such snapshot."""
+    try:
+        snapshot = ScoreboardSnapshot.objects.get(
+            contest=contest, version=version)
+    except ScoreboardSnapshot.DoesNotExist:
+        return None
+    try:
+        data = json.loads(snapshot.scoreboard)
+        problems = [ScoreboardProblem(problem_id, pname, total)
+                    for problem_id, pname, total in data['problems']]
+        results = dict(
+            ((username, problem_id),
+             (attempts, parse_datetime(ac_time) if ac_time else None,
+              passed_testcases))
+            for username, problem_id, attempts, ac_time, passed_testcases
+            in data['results'])
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning('Contest: Can not load scoreboard snapshot of '
+                       'contest %s: %s' % (contest.id, e))
+        return None
+    total_testcases = dict(
+        (problem.id, problem.total_testcase) for problem in problems)
+    return get_scoreboard_builder()(
+        parse_datetime(data['start_time']), data['usernames'], problems,
+        total_testcases, results)
+
+
+def has_pending_submissions(contest):
+    """Return True if a submission during a contest is still waiting for
+    or being judged."""
+    return Submission.objects.filter(
+        problem__in=contest.problem.all(),
+        submit_time__lte=contest.end_time,
+        submit_time__gte=contest.start_time,
+        user__in=get_contestant_list(contest).values('user'),
+        status__in=(Submission.WAIT, Submission.JUDGING)
+    ).exists()
+
+
+def save_scoreboard_snapshot(contest, version):
+    """Build the final scoreboard of an ended contest and return it.
+    It is stored as the snapshot of the contest at the given data version
+    unless a submission is still to be judged, so that a rejudge never
+    leaves a snapshot of unjudged results. What the scoreboard is built
+    from is stored as json."""
+    problems, usernames, total_testcases, results = \
+        get_scoreboard_data(contest, True)
+    scoreboard = get_scoreboard_builder()(
+        contest.start_time, usernames, problems, total_testcases, results)
+    if has_pending_submissions(contest):
+        return scoreboard
+    data = {
+        'start_time': contest.start_time.isoformat(),
+        'usernames': usernames,
+        'problems': [(problem.id, problem.pname, total_testcases[problem.id])
+                     for problem in problems],
+        'results': [
+            (username, problem_id, attempts,
+             ac_time.isoformat() if ac_time else None, passed_testcases)
+            for (username, problem_id), (attempts, ac_time, passed_testcases)
+            in results.items()],
+    }
+    ScoreboardSnapshot.objects.update_or_create(
+        contest=contest, defaults={
+            'version': version, 'scoreboard': json.dumps(data)})
+    return scoreboard
+
+
+def get_scoreboard_engine():
+    """Return the scoreboard engine set in nthuoj.cfg, 'object' by default."""
+    engine = config_info.get_config('scoreboard', 'engine')
+    if engine == 'matrix':
+        return engine
+    return 'object'
+
+
+def get_scoreboard_builder():
+    """Return the function building a scoreboard with the engine set in
+    nthuoj.cfg."""
+    if get_scoreboard_engine() == 'matrix':
+        return MatrixScoreboard
+    return build_object_scoreboard
+
+
+def get_scoreboard_data(contest, show_all):
+    """Return (problems, usernames, total testcases, results) a scoreboard
+    of a contest is built from."""
+    problems = list(contest.problem.all())
+    total_testcases = dict(
+        (problem.id, get_total_testcases(problem)) for problem in problems)
+    usernames = get_contestant_list(contest).order_by(
+        'id').values_list('user', flat=True)
+    results = get_result_map(contest, show_all)
+    return problems, list(usernames), total_testcases, results
+
+
+def build_scoreboard(contest, show_all):
+    """Build the scoreboard of a contest from its stored results.
 
-    scoreboard = Scoreboard(contest.start_time)
+    If show_all is False, submissions after the freeze time are not
+    taken into account."""
+    problems, usernames, total_testcases, results = \
+        get_scoreboard_data(contest, show_all)
+    return get_scoreboard_builder()(
+        contest.start_time, usernames, problems, total_testcases, results)
+
+
+def get_result_map(contest, show_all, users=None):
+    """Return the stored (attempts, AC time, passed testcases) of the
+    contestants on the problems of a contest, keyed by (username, problem id).
+    Only results of the given users are returned if given."""
+    if show_all:
+        fields = ('attempts', 'ac_time', 'passed_testcases')
+    else:
+        fields = ('frozen_attempts', 'frozen_ac_time',
+                  'frozen_passed_testcases')
+    results = ContestResult.objects.filter(contest=contest)
+    if users is not None:
+        results = results.filter(user__in=users)
+    results = results.values_list('user', 'problem', *fields)
+    return dict(((result[0], result[1]), result[2:]) for result in results)
+
+
+def build_object_scoreboard(start_time, usernames, problems, total_testcases,
+                            results):
+    """Build a Scoreboard from (attempts, AC time, passed testcases) of
+    each contestant on each problem, keyed by (username, problem id)."""
+    scoreboard = Scoreboard(start_time)
     # Store contest's problem data
-    for problem in contest.problem.all():
-        total_testcases = get_total_testcases(problem)
+    for problem in problems:
         new_problem = ScoreboardProblem(
-            problem.id, problem.pname, total_testcases)
+            problem.id, problem.pname, total_testcases[problem.id])
         new_problem.no_submission = True
         scoreboard.add_problem(new_problem)
 
     # For Contestants' data
-    for contestant in contestants:
-        new_contestant = ScoreboardUser(contestant.user.username)
-        for problem in contest.problem.all():
-            if(is_ended(contest) or has_contest_ownership(user, contest)):
-                submissions = get_contestant_problem_submission_list(
-                    contest, contestant, problem)
-            else:
-                submissions = get_contestant_problem_submission_list_before_freeze_time(
-                    contest, contestant, problem)
-            total_testcases = get_total_testcases(problem)
-            new_problem = UserProblem(problem.id, total_testcases)
-            for submission in submissions:
-                passed_testcases = get_passed_testcases(submission)
-                new_submission = ScoreboardSubmission(
-                    submission.submit_time, passed_testcases)
-                new_problem.add_submission(new_submission)
-                if new_submission.is_solved(total_testcases):
-                    new_problem.AC_time = new_submission.submit_time - \
-                        contest.start_time
-                    new_problem.AC_time = int(
-                        new_problem.AC_time.total_seconds() / 60)
-                    break
-            if new_problem.is_solved():
-                scoreboard.get_problem(new_problem.id).add_pass_user()
-            else:
-                new_problem.AC_time = '--'
-            if len(submissions):
-                scoreboard.get_problem(new_problem.id).no_submission = False
-
-            # setup problem attribute
-            new_problem.penalty = get_penalty(
-                new_problem, scoreboard.start_time)
-            new_problem.submit_times = get_submit_times(new_problem)
-            new_problem.solved = new_problem.is_solved()
-            new_problem.testcases_solved = new_problem.get_testcases_solved()
-            # to get single problem's total passed submission
+    for username in usernames:
+        new_contestant = ScoreboardUser(username)
+        for problem in problems:
+            result = results.get((username, problem.id), NO_RESULT)
+            new_problem = get_user_problem(
+                problem.id, total_testcases[problem.id], result, start_time)
             scoreboard_problem = scoreboard.get_problem(problem.id)
+            if new_problem.solved:
+                scoreboard_problem.add_pass_user()
+            if result[0]:
+                scoreboard_problem.no_submission = False
+            # to get single problem's total passed submission
             scoreboard_problem.total_solved += new_problem.testcases_solved
 
             new_contestant.add_problem(new_problem)
@@ -212,26 +363,54 @@ def get_scoreboard(user, contest):
     return scoreboard
 
 
-def get_scoreboard_csv(contest_id, scoreboard_type):
-    contest = get_contest_or_404(contest_id)
-    scoreboard = get_scoreboard(contest)
+def get_user_problem(problem_id, total_testcases, result, start_time):
+    """Build a contestant's result of a problem from the stored
+    (attempts, AC time, passed testcases)."""
+    attempts, ac_time, passed_testcases = result
+    new_problem = ResultUserProblem(
+        problem_id, total_testcases, attempts, ac_time, passed_testcases)
+    if ac_time is not None:
+        new_problem.AC_time = int((ac_time - start_time).total_seconds() / 60)
+    else:
+        new_problem.AC_time = '--'
 
-    response = HttpResponse(content_type='text/csv')
-    filename = contest.cname.encode(
-        'utf-8') + '-scoreboard-' + str(scoreboard_type)
-    response['Content-Disposition'] = 'attachment; filename=' + filename
+    # setup problem attribute
+    new_problem.penalty = get_penalty(new_problem, start_time)
+    new_problem.submit_times = get_submit_times(new_problem)
+    new_problem.solved = new_problem.is_solved()
+    new_problem.testcases_solved = new_problem.get_testcases_solved()
+    return new_problem
+
+
+class Echo(object):
+    """A pseudo-buffer returning what is written to it, so that csv.writer
+    can format rows one by one for a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def get_scoreboard_csv(user, contest_id, scoreboard_type):
+    contest = get_contest_or_404(contest_id)
+    scoreboard = get_scoreboard(user, contest)
 
-    # init
-    writer = csv.writer(response)
     if scoreboard_type == "penalty":
-        write_scoreboard_csv_penalty(writer, contest, scoreboard)
+        rows = get_scoreboard_csv_penalty_rows(contest, scoreboard)
     elif scoreboard_type == "testcases":
-        write_scoreboard_csv_testcases(writer, contest, scoreboard)
+        rows = get_scoreboard_csv_testcases_rows(contest, scoreboard)
+    else:
+        rows = []
 
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type='text/csv')
+    filename = contest.cname.encode(
+        'utf-8') + '-scoreboard-' + str(scoreboard_type)
+    response['Content-Disposition'] = 'attachment; filename=' + filename
     return response
 
 
-def write_scoreboard_csv_penalty(writer, contest, scoreboard):
+def get_scoreboard_csv_penalty_rows(contest, scoreboard):
     # penalty scoreboard csv
     scoreboard.sort_users_by_penalty()
     # title
@@ -239,7 +418,7 @@ def write_scoreboard_csv_penalty(writer, contest, scoreboard):
     for problem in scoreboard.problems:
         title.append(problem.id)
     title.append('Total')
-    writer.writerow(title)
+    yield title
     # user data
     for counter, user in enumerate(scoreboard.users):
         user_row = [counter + 1, user.username]
@@ -249,15 +428,15 @@ def write_scoreboard_csv_penalty(writer, contest, scoreboard):
             user_row.append(str(submit_times) + '/' + str(AC_time))
         total_penalty = user.get_penalty(contest.start_time)
         user_row.append(total_penalty)
-        writer.writerow(user_row)
+        yield user_row
 
     footer = ['Passed', '']
     for problem in scoreboard.problems:
         footer.append(problem.pass_user)
-    writer.writerow(footer)
+    yield footer
 
 
-def write_scoreboard_csv_testcases(writer, contest, scoreboard):
+def get_scoreboard_csv_testcases_rows(contest, scoreboard):
     # testcases scoreboard csv
     scoreboard.sort_users_by_solved_testcases()
     # title
@@ -265,7 +444,7 @@ def write_scoreboard_csv_testcases(writer, contest, scoreboard):
     for problem in scoreboard.problems:
         title.append(problem.id)
     title.append('Total')
-    writer.writerow(title)
+    yield title
     # user data
     for counter, user in enumerate(scoreboard.users):
         user_row = [counter + 1, user.username]
@@ -275,12 +454,12 @@ def write_scoreboard_csv_testcases(writer, contest, scoreboard):
             user_row.append(str(passed_testcases) + '/' + str(total_testcases))
         user_total_testcases = user.get_testcases_solved()
         user_row.append(user_total_testcases)
-        writer.writerow(user_row)
+        yield user_row
 
     footer = ['Passed Testcases', '']
     for problem in scoreboard.problems:
         footer.append(problem.total_solved)
-    writer.writerow(footer)
+    yield footer
 
 
 def get_public_user_password_csv(contest):
@@ -0,0 +1,253 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+
+from contest.models import Contest
+from contest.models import ContestResult
+from contest.contest_info import get_contestant_list
+from contest.contest_info import get_freeze_time_datetime
+from contest.contest_info import NO_RESULT
+from contest.contest_version import bump_data_version
+from contest.contest_version import get_data_version
+
+from problem.models import Problem
+from problem.models import Submission
+from problem.models import SubmissionDetail
+
+from utils.log_info import get_logger
+
+logger = get_logger()
+
+RESULT_FIELDS = (
+    'attempts', 'ac_time', 'passed_testcases',
+    'frozen_attempts', 'frozen_ac_time', 'frozen_passed_testcases',
+)
+# statuses the judge moves submissions from without going through Django
+PENDING_STATUSES = (Submission.WAIT, Submission.JUDGING)
+# seconds between two checks for verdicts written behind the models
+RESULT_SYNC_INTERVAL = 5
+RESULT_SYNC_KEY = 'contest_result_sync'
+
+
+def get_contest_submission_values(contest, users, problems):
+    """Return the given users' submissions of the given problems during
+    a contest as a list of dicts, in submitting order."""
+    return list(Submission.objects.filter(
+        problem__in=problems,
+        submit_time__lte=contest.end_time,
+        submit_time__gte=contest.start_time,
+        user__in=users
+    ).exclude(
+        status=Submission.JUDGE_ERROR
+    ).order_by('submit_time', 'id').values(
+        'id', 'user', 'problem', 'submit_time'))
+
+
+def get_passed_testcases_map(contest, users, problems):
+    """Return a dict mapping submission id to its number of passed testcases
+    for the submissions returned by get_contest_submission_values.
+    Submissions without any passed testcase are left out."""
+    counts = SubmissionDetail.objects.filter(
+        sid__problem__in=problems,
+        sid__submit_time__lte=contest.end_time,
+        sid__submit_time__gte=contest.start_time,
+        sid__user__in=users,
+        verdict=SubmissionDetail.AC
+    ).values('sid').annotate(passed=Count('id'))
+    return dict((count['sid'], count['passed']) for count in counts)
+
+
+def get_result(submissions, total_testcases):
+    """Return (attempts, AC time, passed testcases) of a contestant on
+    a problem from (submit time, passed testcases) of their submissions
+    in submitting order. Submissions after the first AC are ignored."""
+    attempts = 0
+    best_passed_testcases = 0
+    for submit_time, passed_testcases in submissions:
+        attempts += 1
+        best_passed_testcases = max(best_passed_testcases, passed_testcases)
+        if passed_testcases == total_testcases:
+            return (attempts, submit_time, best_passed_testcases)
+    return (attempts, None, best_passed_testcases)
+
+
+def refresh_results(contest, users=None, problems=None):
+    """Recompute the stored results of a contest from its submissions.
+    Only results of the given users and problems are recomputed if given.
+    The data version of the contest is bumped if any result changes."""
+    if problems is None:
+        problems = list(contest.problem.all())
+    contestants = get_contestant_list(contest)
+    if users is not None:
+        contestants = contestants.filter(user__in=users)
+    usernames = list(contestants.values_list('user', flat=True))
+    if not usernames or not problems:
+        return
+
+    users = get_contestant_list(contest).values('user') \
+        if users is None else usernames
+    # read again as the problems passed in may predate a testcase change
+    total_testcases = dict(Problem.objects.filter(
+        pk__in=[problem.pk for problem in problems]
+    ).values_list('id', 'testcase_count'))
+    passed_testcases = get_passed_testcases_map(contest, users, problems)
+    freeze_time = get_freeze_time_datetime(contest)
+
+    # group submissions by contestant and problem, in submitting order
+    submission_groups = defaultdict(list)
+    for submission in get_contest_submission_values(contest, users, problems):
+        submission_groups[(submission['user'], submission['problem'])].append(
+            (submission['submit_time'],
+             passed_testcases.get(submission['id'], 0)))
+
+    stored_results = ContestResult.objects.filter(
+        contest=contest, user__in=users, problem__in=problems)
+    stored_results = dict(((result.user_id, result.problem_id), result)
+                          for result in stored_results)
+
+    changed_results = []
+    for username in usernames:
+        for problem in problems:
+            key = (username, problem.id)
+            submissions = submission_groups.get(key, [])
+            if not submissions and key not in stored_results:
+                continue
+            total = total_testcases[problem.id]
+            result = get_result(submissions, total)
+            frozen_result = get_result(
+                [submission for submission in submissions
+                 if submission[0] <= freeze_time], total)
+            stored_result = stored_results.get(key)
+            if get_stored_result(stored_result) != result + frozen_result:
+                changed_results.append(
+                    (stored_result, username, problem, result + frozen_result))
+    if not changed_results:
+        return
+
+    with transaction.atomic():
+        version = bump_data_version(contest)
+        for stored_result, username, problem, result in changed_results:
+            save_result(stored_result, contest, username, problem, result,
+                        version)
+
+
+def get_stored_result(contest_result):
+    if contest_result is None:
+        return None
+    return tuple(getattr(contest_result, field) for field in RESULT_FIELDS)
+
+
+def save_result(contest_result, contest, username, problem, result, version):
+    """Store the result of a contestant on a problem. contest_result is
+    the currently stored result or None. The full and the frozen result
+    are marked with the data version if they change."""
+    fields = dict(zip(RESULT_FIELDS, result))
+    # a result not stored yet looks the same as one without submission
+    stored_result = get_stored_result(contest_result) or NO_RESULT * 2
+    if stored_result[:3] != result[:3]:
+        fields['version'] = version
+    if stored_result[3:] != result[3:]:
+        fields['frozen_version'] = version
+    if contest_result is None:
+        try:
+            with transaction.atomic():
+                ContestResult.objects.create(
+                    contest=contest, user_id=username, problem=problem,
+                    **fields)
+            return
+        except IntegrityError:
+            # created by another refresh meanwhile
+            pass
+    # update instead of save() so that a deleted result is never inserted
+    ContestResult.objects.filter(
+        contest=contest, user=username, problem=problem).update(**fields)
+
+
+def refresh_submission_results(submission):
+    """Recompute the results affected by a submission in every contest
+    the submitter attends."""
+    contests = Contest.objects.filter(
+        problem=submission.problem_id,
+        contestant__user=submission.user_id)
+    for contest in contests:
+        refresh_results(
+            contest, users=[submission.user_id], problems=[submission.problem])
+
+
+def refresh_problem_results(problem):
+    """Recompute the results of a problem in every contest containing it."""
+    for contest in problem.contest_set.all():
+        refresh_results(contest, problems=[problem])
+        # the number of testcases is shown even if no result changes
+        bump_data_version(contest, reset=True)
+
+
+def rebuild_results(contest):
+    """Reconcile the stored results of a contest with its submissions."""
+    ContestResult.objects.filter(contest=contest).exclude(
+        user__in=get_contestant_list(contest).values('user'),
+        problem__in=contest.problem.all()
+    ).delete()
+    refresh_results(contest)
+    bump_data_version(contest, reset=True)
+    logger.info('Contest: results of contest %s rebuilt!' % contest.id)
+
+
+def sync_results():
+    """Refresh the stored results of the submissions the judge has given
+    a verdict behind the models, at most once every RESULT_SYNC_INTERVAL
+    seconds per process. Only submissions scored as pending can be behind,
+    so an indexed query over those finds them, and only the results of
+    their contestants on their problems are recomputed. The judge writes
+    the details of a submission before its verdict, so they are in place
+    by then. Return the number of submissions synced."""
+    if not cache.add(RESULT_SYNC_KEY, True, RESULT_SYNC_INTERVAL):
+        return 0
+    submissions = Submission.objects.filter(
+        scored_status__in=PENDING_STATUSES
+    ).exclude(status=F('scored_status')).select_related('problem')
+    groups = defaultdict(list)
+    for submission in submissions:
+        groups[(submission.user_id, submission.problem_id)].append(submission)
+    synced = 0
+    for group in groups.values():
+        with transaction.atomic():
+            # those changed again meanwhile are left to the next sync
+            scored = [submission for submission in group
+                      if Submission.objects.filter(
+                          pk=submission.pk, status=submission.status,
+                          scored_status=submission.scored_status).update(
+                          scored_status=submission.status)]
+            if scored:
+                refresh_submission_results(scored[0])
+        synced += len(scored)
+    return synced
+
+
+def get_synced_data_version(contest):
+    """Sync the stored results and return the data version of a contest."""
+    sync_results()
+    return get_data_version(contest)
@@ -0,0 +1,63 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+
+from contest.models import ContestVersion
+
+
+def get_data_version(contest):
+    """Return the version of the scoreboard data of a contest."""
+    versions = ContestVersion.objects.filter(
+        contest=contest).values_list('version', flat=True)
+    return versions[0] if versions else 0
+
+
+def bump_data_version(contest, reset=False):
+    """Mark the scoreboard data of a contest as changed, so that cached
+    scoreboards of the contest are no longer used. Return the new version.
+
+    reset tells that rows may have changed without their results, e.g.
+    the number of testcases or the contestants changed, so that clients
+    holding an older version have to fetch all rows again."""
+    updated = ContestVersion.objects.filter(contest=contest).update(
+        version=F('version') + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                ContestVersion.objects.create(
+                    contest=contest, version=1, reset_version=int(reset))
+            return 1
+        except IntegrityError:
+            # created by another bump meanwhile
+            ContestVersion.objects.filter(contest=contest).update(
+                version=F('version') + 1)
+    if reset:
+        ContestVersion.objects.filter(contest=contest).update(
+            reset_version=F('version'))
+    return get_data_version(contest)
+
+
+def get_reset_version(contest):
+    """Return the last version of a contest bumped with reset."""
+    versions = ContestVersion.objects.filter(
+        contest=contest).values_list('reset_version', flat=True)
+    return versions[0] if versions else 0
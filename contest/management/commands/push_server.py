@@ -0,0 +1,57 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from contest.push_server import PushServer
+from utils import config_info
+
+
+def get_push_config(option, default):
+    value = config_info.get_config('push', option)
+    return value if value else default
+
+
+class Command(BaseCommand):
+    help = 'Push contest submissions, verdicts, clarification replies and ' \
+        'scoreboard versions to browsers over server-sent events. ' \
+        'Browsers subscribe to /contest/<contest_id>/events/, and status ' \
+        'pages wait for pending submissions at /status/pending/wait/. ' \
+        'Every subscriber holds a file descriptor, raise the limit with ' \
+        '`ulimit -n` before starting it'
+    option_list = BaseCommand.option_list + (
+        make_option('--host', dest='host',
+                    default=get_push_config('host', '127.0.0.1'),
+                    help='Address to listen on'),
+        make_option('--port', dest='port', type='int',
+                    default=int(get_push_config('port', 8001)),
+                    help='Port to listen on'),
+        make_option('--interval', dest='interval', type='float',
+                    default=float(get_push_config('interval', 1)),
+                    help='Seconds between polling the database'),
+    )
+
+    def handle(self, *args, **options):
+        server = PushServer(
+            options['host'], options['port'], options['interval'])
+        self.stdout.write('Pushing contest events on %s:%d' %
+                          (options['host'], options['port']))
+        server.serve_forever()
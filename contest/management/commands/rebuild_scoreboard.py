@@ -0,0 +1,37 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from django.core.management.base import BaseCommand
+
+from contest.models import Contest
+from contest.contest_result import rebuild_results
+
+
+class Command(BaseCommand):
+    args = '<contest_id contest_id ...>'
+    help = 'Rebuild stored scoreboard results from submissions ' \
+        '(all contests if no contest id is given)'
+
+    def handle(self, *args, **options):
+        contests = Contest.objects.all()
+        if args:
+            contests = contests.filter(id__in=args)
+        for contest in contests.order_by('id'):
+            rebuild_results(contest)
+            self.stdout.write('Contest %d rebuilt' % contest.id)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import datetime
+from django.conf import settings
+import django.core.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('team', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Clarification',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('content', models.CharField(default=b'', max_length=500)),
+                ('reply', models.CharField(default=b'No Response. Please read the problem statement', max_length=500)),
+                ('ask_time', models.DateTimeField(default=datetime.datetime.now, auto_now=True)),
+                ('reply_time', models.DateTimeField(null=True, blank=True)),
+                ('reply_all', models.BooleanField(default=False)),
+                ('asker', models.ForeignKey(related_name=b'asker', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='Contest',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('cname', models.CharField(default=b'', max_length=50)),
+                ('start_time', models.DateTimeField(default=datetime.datetime.now)),
+                ('end_time', models.DateTimeField(default=datetime.datetime.now)),
+                ('freeze_time', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)])),
+                ('is_homework', models.BooleanField(default=False)),
+                ('open_register', models.BooleanField(default=True)),
+                ('creation_time', models.DateTimeField(default=datetime.datetime.now, auto_now_add=True)),
+                ('coowner', models.ManyToManyField(related_name=b'coowner', to=settings.AUTH_USER_MODEL, blank=True)),
+                ('owner', models.ForeignKey(related_name=b'owner', to=settings.AUTH_USER_MODEL)),
+                ('problem', models.ManyToManyField(to='problem.Problem', blank=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='Contestant',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('contest', models.ForeignKey(to='contest.Contest')),
+                ('team', models.ForeignKey(blank=True, to='team.Team', null=True)),
+                ('user', models.ForeignKey(related_name=b'user', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='contestant',
+            unique_together=set([('contest', 'user')]),
+        ),
+        migrations.AddField(
+            model_name='clarification',
+            name='contest',
+            field=models.ForeignKey(to='contest.Contest'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='clarification',
+            name='problem',
+            field=models.ForeignKey(blank=True, to='problem.Problem', null=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='clarification',
+            name='replier',
+            field=models.ForeignKey(related_name=b'replier', blank=True, to=settings.AUTH_USER_MODEL, null=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0002_counts_and_judge_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contest', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveContestVersion',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('version', models.IntegerField(default=0)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ContestResult',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('ac_time', models.DateTimeField(null=True, blank=True)),
+                ('passed_testcases', models.IntegerField(default=0)),
+                ('frozen_attempts', models.IntegerField(default=0)),
+                ('frozen_ac_time', models.DateTimeField(null=True, blank=True)),
+                ('frozen_passed_testcases', models.IntegerField(default=0)),
+                ('version', models.IntegerField(default=0)),
+                ('frozen_version', models.IntegerField(default=0)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ContestVersion',
+            fields=[
+                ('contest', models.OneToOneField(primary_key=True, serialize=False, to='contest.Contest')),
+                ('version', models.IntegerField(default=0)),
+                ('reset_version', models.IntegerField(default=0)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ScoreboardSnapshot',
+            fields=[
+                ('contest', models.OneToOneField(primary_key=True, serialize=False, to='contest.Contest')),
+                ('version', models.IntegerField(default=0)),
+                ('scoreboard', models.TextField()),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AddField(
+            model_name='contestresult',
+            name='contest',
+            field=models.ForeignKey(to='contest.Contest'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='contestresult',
+            name='problem',
+            field=models.ForeignKey(to='problem.Problem'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='contestresult',
+            name='user',
+            field=models.ForeignKey(related_name=b'contest_result', to=settings.AUTH_USER_MODEL),
+            preserve_default=True,
+        ),
+        migrations.AlterUniqueTogether(
+            name='contestresult',
+            unique_together=set([('contest', 'user', 'problem')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='contestresult',
+            index_together=set([('contest', 'version'), ('contest', 'frozen_version')]),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import models, migrations
+
+RESULT_FIELDS = (
+    'attempts', 'ac_time', 'passed_testcases',
+    'frozen_attempts', 'frozen_ac_time', 'frozen_passed_testcases',
+)
+
+
+def get_result(submissions, total_testcases):
+    """(attempts, AC time, passed testcases) from (submit time, passed
+    testcases) in submitting order, as contest.contest_result.get_result."""
+    attempts = 0
+    best_passed_testcases = 0
+    for submit_time, passed_testcases in submissions:
+        attempts += 1
+        best_passed_testcases = max(best_passed_testcases, passed_testcases)
+        if passed_testcases == total_testcases:
+            return (attempts, submit_time, best_passed_testcases)
+    return (attempts, None, best_passed_testcases)
+
+
+def backfill_results(apps, schema_editor):
+    """Compute the results of existing contests, which the scoreboards and
+    final snapshots read, as the rebuild_scoreboard command does."""
+    Contest = apps.get_model('contest', 'Contest')
+    Contestant = apps.get_model('contest', 'Contestant')
+    ContestResult = apps.get_model('contest', 'ContestResult')
+    ContestVersion = apps.get_model('contest', 'ContestVersion')
+    Submission = apps.get_model('problem', 'Submission')
+    SubmissionDetail = apps.get_model('problem', 'SubmissionDetail')
+    # contests whose results are stored already were rebuilt meanwhile
+    contests = Contest.objects.exclude(
+        id__in=ContestResult.objects.values('contest'))
+    for contest in contests.order_by('id'):
+        users = Contestant.objects.filter(contest=contest).values('user')
+        total_testcases = dict(
+            contest.problem.values_list('id', 'testcase_count'))
+        submissions = Submission.objects.filter(
+            problem__in=total_testcases.keys(),
+            submit_time__lte=contest.end_time,
+            submit_time__gte=contest.start_time,
+            user__in=users
+        ).exclude(status='JE')
+        passed_testcases = dict(SubmissionDetail.objects.filter(
+            sid__in=submissions, verdict='AC'
+        ).order_by().values('sid').annotate(
+            passed=models.Count('id')).values_list('sid', 'passed'))
+        submission_groups = defaultdict(list)
+        for submission in submissions.order_by('submit_time', 'id').values(
+                'id', 'user', 'problem', 'submit_time'):
+            submission_groups[(submission['user'], submission['problem'])] \
+                .append((submission['submit_time'],
+                         passed_testcases.get(submission['id'], 0)))
+        if not submission_groups:
+            continue
+
+        freeze_time = contest.end_time - \
+            timedelta(minutes=contest.freeze_time)
+        version, created = ContestVersion.objects.get_or_create(
+            contest=contest)
+        version.version += 1
+        version.reset_version = version.version
+        version.save()
+        results = []
+        for (username, problem_id), group in submission_groups.items():
+            total = total_testcases[problem_id]
+            result = get_result(group, total) + get_result(
+                [submission for submission in group
+                 if submission[0] <= freeze_time], total)
+            results.append(ContestResult(
+                contest=contest, user_id=username, problem_id=problem_id,
+                version=version.version, frozen_version=version.version,
+                **dict(zip(RESULT_FIELDS, result))))
+        ContestResult.objects.bulk_create(results)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contest', '0002_contest_results'),
+        ('problem', '0004_submission_scored_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_results, noop),
+    ]
@@ -89,3 +89,65 @@ class Clarification(models.Model):
 
     def __unicode__(self):
         return str(self.id)
+
+
+class ContestResult(models.Model):
+
+    contest = models.ForeignKey(Contest)
+    user = models.ForeignKey(User, related_name='contest_result')
+    problem = models.ForeignKey(Problem)
+    # result counting all submissions in the contest
+    attempts = models.IntegerField(default=0)
+    ac_time = models.DateTimeField(blank=True, null=True)
+    passed_testcases = models.IntegerField(default=0)
+    # result counting only submissions before freeze time
+    frozen_attempts = models.IntegerField(default=0)
+    frozen_ac_time = models.DateTimeField(blank=True, null=True)
+    frozen_passed_testcases = models.IntegerField(default=0)
+    # contest data versions when the full and the frozen result last changed
+    version = models.IntegerField(default=0)
+    frozen_version = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('contest', 'user', 'problem'),)
+        index_together = (('contest', 'version'),
+                          ('contest', 'frozen_version'))
+
+    def __unicode__(self):
+        return '%s - %s - %s' % (self.contest_id, self.user_id, self.problem_id)
+
+
+class ContestVersion(models.Model):
+
+    # bumped whenever the scoreboard data of the contest changes
+    contest = models.OneToOneField(Contest, primary_key=True)
+    version = models.IntegerField(default=0)
+    # last version changing rows without changing their results
+    reset_version = models.IntegerField(default=0)
+
+    def __unicode__(self):
+        return '%s - %d' % (self.contest_id, self.version)
+
+
+class ActiveContestVersion(models.Model):
+
+    # a single row bumped whenever contests, their coowners, problems or
+    # contestants change, so that every process drops its cached index
+    # of active contests
+    version = models.IntegerField(default=0)
+
+    def __unicode__(self):
+        return str(self.version)
+
+
+class ScoreboardSnapshot(models.Model):
+
+    # what the final scoreboard of an ended contest is built from,
+    # stored as json at a data version
+    contest = models.OneToOneField(Contest, primary_key=True)
+    version = models.IntegerField(default=0)
+    scoreboard = models.TextField()
+    update_time = models.DateTimeField(auto_now=True)
+
+    def __unicode__(self):
+        return '%s - %d' % (self.contest_id, self.version)
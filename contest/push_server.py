@@ -0,0 +1,706 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+import Queue
+import asynchat
+import asyncore
+import errno
+import json
+import re
+import socket
+import threading
+import time
+import urlparse
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import close_old_connections
+from django.db.models import Q
+
+from contest.models import Contest
+from contest.models import ContestVersion
+from contest.models import Clarification
+from contest.contest_info import get_freeze_time_datetime
+from contest.contest_info import get_contestant_list
+from contest.contest_result import sync_results
+
+from problem.models import Submission
+
+from status.pending import PENDING_MAX_WAIT
+from status.pending import get_changed_sids
+from status.pending import parse_statuses
+from status.status_info import get_visible_submission
+
+from users.models import User
+
+from utils.log_info import get_logger
+
+logger = get_logger()
+
+PENDING_STATUSES = (Submission.WAIT, Submission.JUDGING)
+EVENTS_PATH = re.compile(r'^/contest/(?P<cid>\d+)/events/?(\?.*)?$')
+PENDING_PATH = re.compile(r'^/status/pending/wait/?(\?(?P<query>.*))?$')
+# seconds between refreshing contest members, problems and times
+CONTEST_REFRESH_INTERVAL = 10
+# seconds between comments keeping idle connections alive
+HEARTBEAT_INTERVAL = 15
+# seconds the connection thread waits for socket events at most
+LOOP_TIMEOUT = 0.1
+# seconds between checks for pending waits running out of time
+WAIT_CHECK_INTERVAL = 1
+# errors of accept() when the process runs out of file descriptors
+ACCEPT_LIMIT_ERRORS = (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM)
+
+
+class ContestState(object):
+    """What subscribers' filters need to know about a contest, kept in
+    memory and refreshed every CONTEST_REFRESH_INTERVAL seconds."""
+
+    def __init__(self, contest_id):
+        self.id = contest_id
+        self.refreshed = 0
+        self.exists = True
+        self.refresh()
+
+    def refresh(self):
+        try:
+            contest = Contest.objects.get(id=self.id)
+        except Contest.DoesNotExist:
+            self.exists = False
+            return
+        self.start_time = contest.start_time
+        self.end_time = contest.end_time
+        self.freeze_time = get_freeze_time_datetime(contest)
+        self.owners = set([contest.owner_id])
+        self.owners.update(
+            contest.coowner.values_list('username', flat=True))
+        self.contestants = set(
+            get_contestant_list(contest).values_list('user', flat=True))
+        problems = contest.problem.values_list('id', 'visible', 'owner')
+        self.problems = set(problem[0] for problem in problems)
+        # invisible problems are only seen by their owners
+        self.problem_owners = dict(
+            (problem[0], problem[2]) for problem in problems
+            if not problem[1])
+        self.refreshed = time.time()
+
+    def is_ended(self):
+        return datetime.now() > self.end_time
+
+    def is_frozen(self):
+        return self.freeze_time <= datetime.now() <= self.end_time
+
+
+class Subscriber(object):
+
+    def __init__(self, user, contest, privileged):
+        self.user = user
+        self.contest = contest
+        # privileged subscribers see what contest owners see
+        self.privileged = privileged
+        # the last scoreboard event held back during the freeze
+        self.held_event = None
+
+    def can_receive(self, event):
+        """Filter events as get_visible_submission, get_contest_submissions
+        and get_clarifications filter what the contest page shows.
+        Scoreboard events during the freeze are held back from
+        unprivileged subscribers, so that they do not tell when others
+        submit, until release_held_event gives them out."""
+        kind = event['event']
+        data = event['data']
+        if self.privileged:
+            return True
+        if kind == 'scoreboard':
+            if self.contest.is_frozen():
+                self.held_event = event
+                return False
+            self.held_event = None
+            return True
+        if kind == 'clarification':
+            return data['reply_all'] or data['asker'] == self.user.username
+        # submissions and verdicts
+        contest = self.contest
+        submitter = data['user']
+        if submitter == self.user.username:
+            return True
+        if data['admin']:
+            return False
+        owner = contest.problem_owners.get(data['problem'], self.user.username)
+        if owner != self.user.username:
+            return False
+        if contest.is_ended():
+            return True
+        if submitter in contest.owners:
+            return False
+        return data['submit_time'] <= contest.freeze_time
+
+    def release_held_event(self):
+        """Return the held scoreboard event once the contest has ended,
+        or None."""
+        event = self.held_event
+        if event is None or not self.contest.is_ended():
+            return None
+        self.held_event = None
+        return event
+
+
+class PendingWaiter(object):
+    """A request of the status page waiting for any of its submissions
+    to change from the status the client shows."""
+
+    def __init__(self, statuses, timeout):
+        # the statuses the client shows, keyed by sid
+        self.statuses = statuses
+        self.deadline = time.time() + timeout
+
+    def get_changed(self, current):
+        return get_changed_sids(self.statuses, current)
+
+    def is_expired(self, now):
+        return now >= self.deadline
+
+
+class EventTailer(object):
+    """Tail the database for new submissions, verdicts, clarification
+    replies and scoreboard versions of contests. One query of each kind
+    is made per poll, however many contests and subscribers there are."""
+
+    def __init__(self):
+        self.contests = {}
+        self.last_submission_id = Submission.objects.order_by(
+            '-id').values_list('id', flat=True).first() or 0
+        # (reply time, id) of the last clarification reply seen
+        self.last_reply = (datetime.now(), 0)
+        # status of submissions seen being judged, keyed by id
+        self.pending = {}
+        self.versions = {}
+        self.event_id = 0
+
+    def get_contest(self, contest_id):
+        contest = self.contests.get(contest_id)
+        if contest is None:
+            contest = ContestState(contest_id)
+            if contest.exists:
+                self.contests[contest_id] = contest
+                self.versions[contest_id] = self.get_versions(
+                    [contest_id]).get(contest_id, 0)
+        return contest
+
+    def release_contest(self, contest_id):
+        self.contests.pop(contest_id, None)
+        self.versions.pop(contest_id, None)
+
+    def get_versions(self, contest_ids):
+        return dict(ContestVersion.objects.filter(
+            contest__in=contest_ids).values_list('contest', 'version'))
+
+    def new_event(self, contest_id, kind, data):
+        self.event_id += 1
+        return {'id': self.event_id, 'contest': contest_id,
+                'event': kind, 'data': data}
+
+    def poll(self):
+        """Return events happened since the last poll."""
+        now = time.time()
+        for contest in self.contests.values():
+            if now - contest.refreshed > CONTEST_REFRESH_INTERVAL:
+                contest.refresh()
+        if not self.contests:
+            return []
+        return (self.poll_submissions() + self.poll_clarifications() +
+                self.poll_versions())
+
+    def get_submission_contests(self, submission):
+        """Return ids of the contests a submission belongs to."""
+        contest_ids = []
+        for contest in self.contests.values():
+            if (submission['problem'] in contest.problems and
+                    contest.start_time <= submission['submit_time'] <=
+                    contest.end_time and
+                    (submission['user'] in contest.contestants or
+                     submission['user'] in contest.owners)):
+                contest_ids.append(contest.id)
+        return contest_ids
+
+    def submission_data(self, submission):
+        return {
+            'id': submission['id'],
+            'user': submission['user'],
+            'problem': submission['problem'],
+            'status': submission['status'],
+            'submit_time': submission['submit_time'],
+            'admin': submission['user__user_level'] == User.ADMIN,
+        }
+
+    def poll_submissions(self):
+        events = []
+        fields = ('id', 'user', 'problem', 'status', 'submit_time',
+                  'user__user_level')
+        problems = set()
+        for contest in self.contests.values():
+            problems.update(contest.problems)
+        new_submissions = Submission.objects.filter(
+            id__gt=self.last_submission_id,
+            problem__in=problems).order_by('id').values(*fields)
+        judged_submissions = Submission.objects.filter(
+            id__in=self.pending.keys()).values(*fields) \
+            if self.pending else []
+
+        for submission in judged_submissions:
+            if submission['status'] == self.pending[submission['id']]:
+                continue
+            data = self.submission_data(submission)
+            for contest_id in self.get_submission_contests(submission):
+                events.append(self.new_event(contest_id, 'verdict', data))
+            if submission['status'] in PENDING_STATUSES:
+                self.pending[submission['id']] = submission['status']
+            else:
+                del self.pending[submission['id']]
+
+        for submission in new_submissions:
+            self.last_submission_id = submission['id']
+            contest_ids = self.get_submission_contests(submission)
+            if not contest_ids:
+                continue
+            data = self.submission_data(submission)
+            for contest_id in contest_ids:
+                events.append(self.new_event(contest_id, 'submission', data))
+            if submission['status'] in PENDING_STATUSES:
+                self.pending[submission['id']] = submission['status']
+        return events
+
+    def poll_clarifications(self):
+        events = []
+        reply_time, reply_id = self.last_reply
+        # replies may share a reply time
+        clarifications = Clarification.objects.filter(
+            Q(reply_time__gt=reply_time) |
+            Q(reply_time=reply_time, id__gt=reply_id),
+            contest__in=self.contests.keys()
+        ).order_by('reply_time', 'id').values(
+            'id', 'contest', 'problem', 'asker', 'content', 'reply',
+            'reply_all', 'reply_time')
+        for clarification in clarifications:
+            self.last_reply = (clarification['reply_time'], clarification['id'])
+            contest_id = clarification.pop('contest')
+            del clarification['reply_time']
+            events.append(
+                self.new_event(contest_id, 'clarification', clarification))
+        return events
+
+    def poll_versions(self):
+        # pick up verdicts the judge writes behind the models
+        sync_results()
+        events = []
+        versions = self.get_versions(self.contests.keys())
+        for contest_id, version in versions.items():
+            if version != self.versions.get(contest_id):
+                self.versions[contest_id] = version
+                events.append(self.new_event(
+                    contest_id, 'scoreboard', {'version': version}))
+        return events
+
+
+def format_event(event):
+    """Return an event in the text/event-stream format."""
+    data = json.dumps(event['data'], default=lambda obj: obj.isoformat())
+    return 'id: %d\nevent: %s\ndata: %s\n\n' % (
+        event['id'], event['event'], data)
+
+
+def get_request_user(headers):
+    """Return the user logged in with the session cookie in the request
+    headers, or an anonymous user treated as a normal user."""
+    cookie = re.search(
+        r'(?:^|;\s*)%s=([^;\s]+)' % re.escape(settings.SESSION_COOKIE_NAME),
+        headers.get('cookie', ''))
+    if cookie:
+        session = SessionStore(cookie.group(1))
+        username = session.get('_auth_user_id')
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                pass
+    return User()
+
+
+def parse_request(request):
+    """Return the path and the lower-cased headers of a http request head."""
+    lines = request.split('\r\n')
+    path = lines[0].split(' ')[1] if len(lines[0].split(' ')) > 1 else ''
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return path, headers
+
+
+def parse_wait_query(query):
+    """Return the statuses keyed by sid and the timeout of a pending wait
+    from its query string. Raise ValueError if they are invalid."""
+    query = urlparse.parse_qs(query or '')
+    statuses = parse_statuses(query.get('sids', [''])[0])
+    timeout = float(query.get('timeout', [PENDING_MAX_WAIT])[0])
+    return statuses, max(min(timeout, PENDING_MAX_WAIT), 0)
+
+
+class EventConnection(asynchat.async_chat):
+    """A subscriber's connection. The request is read, then events are
+    pushed until the client disconnects. A pending wait of the status
+    page is answered once, when a status changes or the wait times out."""
+
+    def __init__(self, sock, server):
+        asynchat.async_chat.__init__(self, sock)
+        self.server = server
+        self.request = []
+        self.subscriber = None
+        self.waiter = None
+        self.closed = False
+        self.set_terminator('\r\n\r\n')
+
+    def collect_incoming_data(self, data):
+        if self.request is not None:
+            self.request.append(data)
+
+    def found_terminator(self):
+        if self.request is None:
+            return
+        self.set_terminator(None)
+        path, headers = parse_request(''.join(self.request))
+        self.request = None
+        match = EVENTS_PATH.match(path)
+        if match:
+            # the subscriber is authorized by the database thread
+            return self.server.request_subscription(
+                self, int(match.group('cid')), headers)
+        match = PENDING_PATH.match(path)
+        if match:
+            try:
+                statuses, timeout = parse_wait_query(match.group('query'))
+            except ValueError:
+                return self.respond_error('400 Bad Request')
+            return self.server.request_wait(self, statuses, timeout, headers)
+        self.respond_error('404 Not Found')
+
+    def accept(self, subscriber):
+        self.subscriber = subscriber
+        self.push('HTTP/1.1 200 OK\r\n'
+                  'Content-Type: text/event-stream\r\n'
+                  'Cache-Control: no-cache\r\n'
+                  'Connection: keep-alive\r\n\r\n'
+                  'retry: 3000\n\n')
+
+    def respond_error(self, status):
+        self.push('HTTP/1.1 %s\r\nContent-Length: 0\r\n'
+                  'Connection: close\r\n\r\n' % status)
+        self.close_when_done()
+
+    def respond_json(self, data):
+        body = json.dumps(data)
+        self.push('HTTP/1.1 200 OK\r\n'
+                  'Content-Type: application/json\r\n'
+                  'Content-Length: %d\r\n'
+                  'Cache-Control: no-cache\r\n'
+                  'Connection: close\r\n\r\n%s' % (len(body), body))
+        self.close_when_done()
+
+    def send_event(self, event):
+        if self.subscriber.can_receive(event):
+            self.push(format_event(event))
+
+    def send_held_event(self):
+        event = self.subscriber.release_held_event()
+        if event is not None:
+            self.push(format_event(event))
+
+    def handle_close(self):
+        self.closed = True
+        self.server.unsubscribe(self)
+        self.server.finish_wait(self)
+        self.close()
+
+
+class PushServer(asyncore.dispatcher):
+    """Push contest events to subscribers over server-sent events, and
+    hold the pending waits of status pages until a status changes.
+
+    All connections are served by one thread with asyncore, so an idle
+    subscriber or waiter costs a socket and a few buffers. Database
+    queries, i.e. authorizing subscribers and waiters, tailing events and
+    the statuses waited for, are made by another thread, so that a slow
+    query never stalls the connections. The two threads talk through the
+    tasks and the results queues."""
+
+    def __init__(self, host, port, interval=1):
+        asyncore.dispatcher.__init__(self)
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.set_reuse_addr()
+        self.bind((host, port))
+        self.listen(128)
+        self.interval = interval
+        self.tailer = EventTailer()
+        # connections keyed by contest id, used by the connection thread
+        self.subscriptions = {}
+        # subscribers of each contest id, used by the database thread
+        self.subscriber_counts = {}
+        # connections of pending waits, used by the connection thread
+        self.waiters = set()
+        # waiters of each sid, used by the database thread
+        self.waiter_counts = {}
+        self.tasks = Queue.Queue()
+        self.results = Queue.Queue()
+
+    def handle_accept(self):
+        try:
+            pair = self.accept()
+        except socket.error as e:
+            if e.errno not in ACCEPT_LIMIT_ERRORS:
+                raise
+            # keep listening, the client is accepted once a socket closes
+            logger.warning('Push server: accept failed: %s' % e)
+            return
+        if pair is not None:
+            EventConnection(pair[0], self)
+
+    # run by the connection thread
+
+    def request_subscription(self, connection, contest_id, headers):
+        self.tasks.put(('subscribe', connection, contest_id, headers))
+
+    def unsubscribe(self, connection):
+        if connection.subscriber is None:
+            return
+        contest_id = connection.subscriber.contest.id
+        connections = self.subscriptions.get(contest_id, set())
+        connections.discard(connection)
+        if not connections:
+            self.subscriptions.pop(contest_id, None)
+        self.tasks.put(('unsubscribe', contest_id))
+
+    def request_wait(self, connection, statuses, timeout, headers):
+        self.tasks.put(('wait', connection, statuses, timeout, headers))
+
+    def finish_wait(self, connection, sids=None):
+        """Answer a pending wait with the changed sids, if it is still
+        open, and stop watching its submissions."""
+        if connection.waiter is None:
+            return
+        statuses = connection.waiter.statuses
+        connection.waiter = None
+        self.waiters.discard(connection)
+        self.tasks.put(('unwatch', statuses.keys()))
+        if not connection.closed:
+            connection.respond_json({'sids': sids or []})
+
+    def check_waits(self, current):
+        """Answer the waits some of whose submissions changed, given the
+        current statuses keyed by sid."""
+        for connection in list(self.waiters):
+            changed = connection.waiter.get_changed(current)
+            if changed:
+                self.finish_wait(connection, changed)
+
+    def expire_waits(self):
+        now = time.time()
+        for connection in list(self.waiters):
+            if connection.waiter.is_expired(now):
+                self.finish_wait(connection)
+
+    def dispatch(self):
+        """Hand out what the database thread has done."""
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except Queue.Empty:
+                return
+            if result[0] == 'events':
+                self.publish(result[1])
+                continue
+            if result[0] == 'statuses':
+                self.check_waits(result[1])
+                continue
+            connection = result[1]
+            if result[0] == 'wait':
+                waiter, current = result[2:]
+                connection.waiter = waiter
+                self.waiters.add(connection)
+                # answered at once if changed already, or if gone while
+                # being authorized
+                changed = waiter.get_changed(current)
+                if changed or connection.closed:
+                    self.finish_wait(connection, changed)
+                continue
+            if result[0] == 'reject':
+                if not connection.closed:
+                    connection.respond_error(result[2])
+                continue
+            subscriber = result[2]
+            if connection.closed:
+                # gone while being authorized
+                self.tasks.put(('unsubscribe', subscriber.contest.id))
+                continue
+            connection.accept(subscriber)
+            self.subscriptions.setdefault(
+                subscriber.contest.id, set()).add(connection)
+
+    def publish(self, events):
+        for event in events:
+            for connection in self.subscriptions.get(event['contest'], ()):
+                connection.send_event(event)
+
+    def heartbeat(self):
+        for connections in self.subscriptions.values():
+            for connection in connections:
+                connection.send_held_event()
+                connection.push(': ping\n\n')
+
+    # run by the database thread
+
+    def authorize(self, contest_id, headers):
+        """Return a Subscriber of a contest for the request headers, or
+        the status to reject the request with."""
+        contest = self.tailer.get_contest(contest_id)
+        if not contest.exists:
+            return '404 Not Found'
+        user = get_request_user(headers)
+        privileged = user.username and (
+            user.has_admin_auth() or user.username in contest.owners)
+        if contest.start_time > datetime.now() and not privileged:
+            return '403 Forbidden'
+        return Subscriber(user, contest, bool(privileged))
+
+    def watch(self, statuses, headers):
+        """Return the current statuses of the given submissions the user
+        of the request headers can view, keyed by sid, and watch them.
+        The submissions the user can't view are dropped from statuses."""
+        user = get_request_user(headers)
+        current = dict(get_visible_submission(user).filter(
+            id__in=statuses.keys()).values_list('id', 'status'))
+        for sid in statuses.keys():
+            if sid not in current:
+                del statuses[sid]
+            else:
+                self.waiter_counts[sid] = self.waiter_counts.get(sid, 0) + 1
+        return current
+
+    def unwatch(self, sids):
+        for sid in sids:
+            count = self.waiter_counts.get(sid, 0) - 1
+            if count > 0:
+                self.waiter_counts[sid] = count
+            else:
+                self.waiter_counts.pop(sid, None)
+
+    def release(self, contest_id):
+        count = self.subscriber_counts.get(contest_id, 0) - 1
+        if count > 0:
+            self.subscriber_counts[contest_id] = count
+        else:
+            # no longer polled for
+            self.subscriber_counts.pop(contest_id, None)
+            self.tailer.release_contest(contest_id)
+
+    def serve_tasks(self, timeout=0):
+        """Serve the queued subscribe and unsubscribe tasks, waiting up
+        to timeout seconds for a task if there is none."""
+        while True:
+            try:
+                task = self.tasks.get(timeout=timeout) \
+                    if timeout > 0 else self.tasks.get_nowait()
+            except Queue.Empty:
+                return
+            timeout = 0
+            if task[0] == 'unsubscribe':
+                self.release(task[1])
+                continue
+            if task[0] == 'unwatch':
+                self.unwatch(task[1])
+                continue
+            if task[0] == 'wait':
+                connection, statuses, wait_time, headers = task[1:]
+                try:
+                    current = self.watch(statuses, headers)
+                except Exception as e:
+                    logger.error('Push server: authorizing failed: %s' % e)
+                    statuses.clear()
+                    current = {}
+                self.results.put(('wait', connection,
+                                  PendingWaiter(statuses, wait_time), current))
+                continue
+            connection, contest_id, headers = task[1:]
+            # count the subscriber first, so that the contest is
+            # released on every way out
+            self.subscriber_counts[contest_id] = \
+                self.subscriber_counts.get(contest_id, 0) + 1
+            try:
+                subscriber = self.authorize(contest_id, headers)
+            except Exception as e:
+                logger.error('Push server: authorizing failed: %s' % e)
+                subscriber = '500 Internal Server Error'
+            if isinstance(subscriber, Subscriber):
+                self.results.put(('accept', connection, subscriber))
+            else:
+                self.release(contest_id)
+                self.results.put(('reject', connection, subscriber))
+
+    def poll(self):
+        self.results.put(('events', self.tailer.poll()))
+        if self.waiter_counts:
+            # one query for the submissions of all waiters
+            self.results.put(('statuses', dict(Submission.objects.filter(
+                id__in=self.waiter_counts.keys()).values_list(
+                'id', 'status'))))
+
+    def serve_database(self):
+        last_poll = time.time()
+        while True:
+            self.serve_tasks(
+                max(last_poll + self.interval - time.time(), 0.01))
+            if time.time() - last_poll < self.interval:
+                continue
+            last_poll = time.time()
+            close_old_connections()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error('Push server: polling failed: %s' % e)
+
+    def serve_connections(self):
+        # poll() instead of select(), which fails on descriptors >= 1024
+        asyncore.loop(timeout=LOOP_TIMEOUT, use_poll=True, count=1)
+        self.dispatch()
+
+    def serve_forever(self):
+        worker = threading.Thread(target=self.serve_database)
+        worker.daemon = True
+        worker.start()
+        last_heartbeat = last_wait_check = time.time()
+        while True:
+            self.serve_connections()
+            now = time.time()
+            if now - last_wait_check >= WAIT_CHECK_INTERVAL:
+                last_wait_check = now
+                self.expire_waits()
+            if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                last_heartbeat = now
+                self.heartbeat()
@@ -0,0 +1,116 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from bisect import bisect_left
+from bisect import insort
+
+from contest.contest_info import build_scoreboard
+
+
+class Ranking:
+    """Contestants kept sorted by (solved descending, penalty, original
+    order), as Scoreboard.sort_users_by_penalty sorts them. Updating a
+    contestant moves only their key instead of sorting everyone again."""
+
+    def __init__(self, solved, penalty):
+        self.solved = list(solved)
+        self.penalty = list(penalty)
+        self.keys = sorted(self.get_key(index)
+                           for index in range(len(self.solved)))
+
+    def get_key(self, index):
+        return (-self.solved[index], self.penalty[index], index)
+
+    def get_rank(self, index):
+        return bisect_left(self.keys, self.get_key(index)) + 1
+
+    def get_index(self, rank):
+        return self.keys[rank - 1][2]
+
+    def update(self, index, solved, penalty):
+        """Update a contestant and return their new rank."""
+        del self.keys[self.get_rank(index) - 1]
+        self.solved[index] = solved
+        self.penalty[index] = penalty
+        insort(self.keys, self.get_key(index))
+        return self.get_rank(index)
+
+
+def get_cell(problem):
+    return (problem.submit_times, problem.AC_time,
+            problem.get_testcases_solved())
+
+
+def resolve(frozen_scoreboard, final_scoreboard):
+    """Return the events revealing the results hidden by the freeze time.
+
+    Starting from the frozen scoreboard, the lowest ranked contestant with
+    hidden results reveals the first of them, which may move them up.
+    Once a contestant has nothing hidden, the one above is next. Both
+    scoreboards must list the same contestants and problems in the same
+    order."""
+    start_time = final_scoreboard.start_time
+    frozen_users = frozen_scoreboard.users
+    final_users = final_scoreboard.users
+    ranking = Ranking(
+        [user.get_solved() for user in frozen_users],
+        [user.get_penalty(start_time) for user in frozen_users])
+    # hidden problems of each contestant, in problem order
+    hidden = []
+    for frozen_user, final_user in zip(frozen_users, final_users):
+        hidden.append([
+            problem_index for problem_index, (frozen, final)
+            in enumerate(zip(frozen_user.problems, final_user.problems))
+            if get_cell(frozen) != get_cell(final)])
+
+    events = []
+    rank = len(frozen_users)
+    while rank > 0:
+        index = ranking.get_index(rank)
+        if not hidden[index]:
+            rank -= 1
+            continue
+        problem_index = hidden[index].pop(0)
+        frozen = frozen_users[index].problems[problem_index]
+        final = final_users[index].problems[problem_index]
+        solved = ranking.solved[index] + \
+            final.is_solved() - frozen.is_solved()
+        penalty = ranking.penalty[index] + \
+            final.get_penalty(start_time) - frozen.get_penalty(start_time)
+        # the rank stays, whoever is there now has not been resolved yet
+        new_rank = ranking.update(index, solved, penalty)
+        events.append({
+            'username': final_users[index].username,
+            'problem': final_scoreboard.problems[problem_index].id,
+            'submit_times': final.submit_times,
+            'AC_time': final.AC_time,
+            'testcases_solved': final.get_testcases_solved(),
+            'solved': solved,
+            'penalty': penalty,
+            'old_rank': rank,
+            'new_rank': new_rank,
+        })
+    return events
+
+
+def resolve_contest(contest):
+    """Return the events revealing the results of a contest hidden by
+    its freeze time."""
+    return resolve(build_scoreboard(contest, False),
+                   build_scoreboard(contest, True))
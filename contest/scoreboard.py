@@ -20,6 +20,16 @@
 import sys
 from operator import methodcaller
 
+# every not passed submission adds this many minutes of penalty
+NOT_PASS_PENALTY_UNIT = 20
+
+
+def display(value):
+    # a zero penalty or number of submissions is shown as '--'
+    if value == 0:
+        return '--'
+    return value
+
 
 class Scoreboard:
 
@@ -119,8 +129,6 @@ class UserProblem:
         return len(self.submissions)
 
     def get_penalty(self, start_time):
-        # every not passed submission should add addtional penalty
-        NOT_PASS_PENALTY_UNIT = 20
         wrong_try = 0
         for submission in self.submissions:
             if submission.is_solved(self.total_testcases):
@@ -130,6 +138,34 @@ class UserProblem:
         return 0
 
 
+class ResultUserProblem(UserProblem):
+
+    # result of a contestant on a problem built from the stored
+    # (attempts, AC time, passed testcases) instead of submissions
+    def __init__(self, id, total_testcases, attempts, ac_time,
+                 passed_testcases):
+        UserProblem.__init__(self, id, total_testcases)
+        self.attempts = attempts
+        self.ac_time = ac_time
+        self.passed_testcases = passed_testcases
+
+    def is_solved(self):
+        return self.ac_time is not None
+
+    def get_testcases_solved(self):
+        return self.passed_testcases
+
+    def submit_times(self):
+        return self.attempts
+
+    def get_penalty(self, start_time):
+        if self.ac_time is None:
+            return 0
+        MINUTE = 60
+        return int((self.attempts - 1) * NOT_PASS_PENALTY_UNIT +
+                   (self.ac_time - start_time).total_seconds() / MINUTE)
+
+
 class Submission:
 
     def __init__(self, submit_time, pass_testcases):
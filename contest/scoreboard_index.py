@@ -0,0 +1,259 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from django.core.cache import cache
+
+from contest.models import ContestResult
+from contest.contest_info import build_object_scoreboard
+from contest.contest_info import can_see_full_scoreboard
+from contest.contest_info import get_cached_scoreboard
+from contest.contest_info import get_contestant_list
+from contest.contest_info import get_result_map
+from contest.contest_info import get_scoreboard_cache_key
+from contest.contest_info import get_scoreboard_cache_timeout
+from contest.contest_info import get_total_testcases
+from contest.contest_result import get_synced_data_version
+from contest.contest_version import get_reset_version
+
+
+# contestants in a page of the scoreboard
+PAGE_SIZE = 50
+ORDERINGS = ('penalty', 'testcases')
+
+
+def get_rank_index_key(contest, show_all, version):
+    return get_scoreboard_cache_key(contest, show_all, version) + ':rank'
+
+
+def get_scoreboard_row(scoreboard_user, rank, testcases_rank):
+    """Return a contestant's row of the scoreboard as a dict."""
+    return {
+        'username': scoreboard_user.username,
+        'rank': rank,
+        'testcases_rank': testcases_rank,
+        'solved': scoreboard_user.solved,
+        'penalty': scoreboard_user.penalty,
+        'testcases_solved': scoreboard_user.testcases_solved,
+        'problems': [{
+            'id': problem.id,
+            'submit_times': problem.submit_times,
+            'AC_time': problem.AC_time,
+            'testcases_solved': problem.testcases_solved,
+            'total_testcases': problem.total_testcases,
+        } for problem in scoreboard_user.problems],
+    }
+
+
+def build_rank_index(contest, show_all, version):
+    """Build and cache the rank index of a scoreboard version, so that a
+    page of rows, the ranks of some contestants or the problem statistics
+    are read without loading the whole scoreboard.
+
+    The index holds 'count', 'problems', 'ranks' mapping usernames to
+    (penalty rank, testcases rank), and '<ordering>:<page>' holding the
+    rows of each page of each ordering. Return the index as a dict."""
+    scoreboard = get_cached_scoreboard(contest, show_all, version)
+    # sort in the same order as the scoreboard page used to
+    scoreboard.sort_users_by_solved_testcases()
+    orders = {'testcases': scoreboard.users}
+    scoreboard.sort_users_by_penalty()
+    orders['penalty'] = scoreboard.users
+
+    ranks = dict((user.username, [rank, 0])
+                 for rank, user in enumerate(orders['penalty'], 1))
+    for rank, user in enumerate(orders['testcases'], 1):
+        ranks[user.username][1] = rank
+    ranks = dict((username, tuple(rank)) for username, rank in ranks.items())
+    index = {
+        'count': len(ranks),
+        'problems': scoreboard.problems,
+        'ranks': ranks,
+    }
+    rows = dict((user.username, get_scoreboard_row(user, *ranks[user.username]))
+                for user in orders['penalty'])
+    for ordering in ORDERINGS:
+        for start in range(0, len(ranks), PAGE_SIZE):
+            index['%s:%d' % (ordering, start / PAGE_SIZE + 1)] = [
+                rows[user.username]
+                for user in orders[ordering][start:start + PAGE_SIZE]]
+
+    key = get_rank_index_key(contest, show_all, version)
+    timeout = get_scoreboard_cache_timeout(contest)
+    if timeout > 0:
+        cache.set_many(dict((key + ':' + name, value)
+                            for name, value in index.items()), timeout)
+    return index
+
+
+def get_index_entries(contest, show_all, version, names):
+    """Return the named entries of the rank index of a scoreboard version,
+    building the index if it is not cached or partly evicted."""
+    key = get_rank_index_key(contest, show_all, version)
+    keys = dict((key + ':' + name, name) for name in names)
+    entries = cache.get_many(keys.keys())
+    if len(entries) == len(keys):
+        return dict((keys[entry_key], entry)
+                    for entry_key, entry in entries.items())
+    index = build_rank_index(contest, show_all, version)
+    return dict((name, index[name]) for name in names if name in index)
+
+
+def get_ranks(contest, show_all, version, usernames):
+    """Return (penalty rank, testcases rank) of the given contestants
+    at a scoreboard version, keyed by username."""
+    ranks = get_index_entries(contest, show_all, version, ['ranks'])['ranks']
+    return dict((username, ranks[username])
+                for username in usernames if username in ranks)
+
+
+class ScoreboardRows(object):
+    """The rows of a scoreboard version in the order of one ordering, to be
+    paged by a Paginator with PAGE_SIZE. Only the rows of the requested
+    page are read from the rank index."""
+
+    def __init__(self, contest, show_all, version, ordering):
+        self.contest = contest
+        self.show_all = show_all
+        self.version = version
+        self.ordering = ordering
+        self.total = get_index_entries(
+            contest, show_all, version, ['count'])['count']
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if not self.total:
+            return []
+        if not isinstance(index, slice) or index.start % PAGE_SIZE:
+            raise IndexError('Scoreboard rows are only read by page')
+        name = '%s:%d' % (self.ordering, index.start / PAGE_SIZE + 1)
+        entries = get_index_entries(
+            self.contest, self.show_all, self.version, [name])
+        return entries.get(name, [])
+
+
+def get_scoreboard_rows(user, contest, ordering):
+    """Return the scoreboard rows of a contest the user can see, ordered
+    by 'penalty' or 'testcases'."""
+    show_all = can_see_full_scoreboard(user, contest)
+    return ScoreboardRows(
+        contest, show_all, get_synced_data_version(contest), ordering)
+
+
+def get_rank_page(rows, username):
+    """Return the page number of a contestant in rows, or None if they
+    are not a contestant."""
+    ranks = get_ranks(rows.contest, rows.show_all, rows.version, [username])
+    if username not in ranks:
+        return None
+    rank = ranks[username][ORDERINGS.index(rows.ordering)]
+    return (rank - 1) / PAGE_SIZE + 1
+
+
+def search_scoreboard_rows(rows, keyword):
+    """Return the rows of the contestants whose usernames contain the
+    keyword, at most a page of them, ordered as rows."""
+    usernames = get_contestant_list(rows.contest).filter(
+        user__username__icontains=keyword
+    ).order_by('id').values_list('user', flat=True)[:PAGE_SIZE]
+    ranks = get_ranks(rows.contest, rows.show_all, rows.version, usernames)
+    rank_index = ORDERINGS.index(rows.ordering)
+    pages = {}
+    for username, rank in ranks.items():
+        page = (rank[rank_index] - 1) / PAGE_SIZE + 1
+        pages.setdefault(page, []).append(username)
+    names = ['%s:%d' % (rows.ordering, page) for page in pages]
+    entries = get_index_entries(
+        rows.contest, rows.show_all, rows.version, names)
+    matched = []
+    for page, usernames in pages.items():
+        matched.extend(row for row in entries['%s:%d' % (rows.ordering, page)]
+                       if row['username'] in usernames)
+    return sorted(matched, key=lambda row: row[
+        'rank' if rows.ordering == 'penalty' else 'testcases_rank'])
+
+
+def get_scoreboard_problems(user, contest):
+    """Return the problem statistics of the scoreboard the user can see."""
+    show_all = can_see_full_scoreboard(user, contest)
+    return get_index_entries(
+        contest, show_all, get_synced_data_version(contest),
+        ['problems'])['problems']
+
+
+def get_cached_ranks(contest, show_all, version):
+    """Return the ranks of the cached rank index of a scoreboard version,
+    or None if it is not cached. The index is never built."""
+    return cache.get(get_rank_index_key(contest, show_all, version) + ':ranks')
+
+
+def get_scoreboard_delta(user, contest, last_version):
+    """Return the scoreboard rows changed after last_version, with their
+    current ranks, as a dict ready to be serialized to json.
+
+    Changed rows are the rows whose results changed and the rows whose
+    ranks moved. If the rows at last_version can not be told apart, e.g.
+    the number of testcases or the contestants changed or the ranks at
+    last_version are no longer cached, all rows are returned and 'full'
+    is True, and a client should drop the rows it holds. Rows are frozen
+    unless the user can see the full scoreboard; the view changes when
+    the contest ends, and a client should then ask for all rows again
+    with version 0."""
+    show_all = can_see_full_scoreboard(user, contest)
+    version = get_synced_data_version(contest)
+    delta = {
+        'version': version,
+        'view': 'full' if show_all else 'frozen',
+        'full': False,
+        'rows': [],
+    }
+    if last_version >= version:
+        return delta
+
+    ranks = get_index_entries(contest, show_all, version, ['ranks'])['ranks']
+    old_ranks = None
+    if last_version >= get_reset_version(contest):
+        old_ranks = get_cached_ranks(contest, show_all, last_version)
+    if old_ranks is None:
+        delta['full'] = True
+        usernames = ranks.keys()
+    else:
+        version_field = 'version' if show_all else 'frozen_version'
+        usernames = set(ContestResult.objects.filter(
+            contest=contest, **{version_field + '__gt': last_version}
+        ).values_list('user', flat=True).distinct())
+        usernames.update(username for username, rank in ranks.items()
+                         if old_ranks.get(username) != rank)
+        usernames = [username for username in usernames if username in ranks]
+    if not usernames:
+        return delta
+
+    problems = list(contest.problem.all())
+    results = get_result_map(
+        contest, show_all, users=None if delta['full'] else usernames)
+    total_testcases = dict(
+        (problem.id, get_total_testcases(problem)) for problem in problems)
+    scoreboard = build_object_scoreboard(
+        contest.start_time, usernames, problems, total_testcases, results)
+    for scoreboard_user in scoreboard.users:
+        delta['rows'].append(get_scoreboard_row(
+            scoreboard_user, *ranks[scoreboard_user.username]))
+    delta['rows'].sort(key=lambda row: row['rank'])
+    return delta
@@ -0,0 +1,195 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+import numpy
+
+from contest.scoreboard import ScoreboardProblem
+from contest.scoreboard import NOT_PASS_PENALTY_UNIT
+from contest.scoreboard import display
+
+MINUTE = 60
+
+
+class MatrixScoreboard(object):
+    """Scoreboard keeping the results of contestants on problems in
+    contestant x problem arrays.
+
+    It exposes the same attributes as contest.scoreboard.Scoreboard, but
+    users and their problems are views on the arrays created on access."""
+
+    def __init__(self, start_time, usernames, problems, total_testcases,
+                 results):
+        """usernames and problems are in display order, total_testcases
+        maps problem id to its number of testcases and results maps
+        (username, problem id) to (attempts, AC time, passed testcases)."""
+        self.start_time = start_time
+        self.usernames = list(usernames)
+        user_index = dict(
+            (username, i) for i, username in enumerate(self.usernames))
+        problem_index = dict(
+            (problem.id, j) for j, problem in enumerate(problems))
+
+        shape = (len(self.usernames), len(problems))
+        self.attempts = numpy.zeros(shape, dtype=numpy.int32)
+        self.passed = numpy.zeros(shape, dtype=numpy.int32)
+        self.solved_matrix = numpy.zeros(shape, dtype=numpy.bool_)
+        # minutes from the start time to the first AC
+        self.ac_minutes = numpy.zeros(shape, dtype=numpy.float64)
+        for (username, problem_id), result in results.iteritems():
+            i = user_index.get(username)
+            j = problem_index.get(problem_id)
+            if i is None or j is None:
+                continue
+            attempts, ac_time, passed_testcases = result
+            self.attempts[i, j] = attempts
+            self.passed[i, j] = passed_testcases
+            if ac_time is not None:
+                self.solved_matrix[i, j] = True
+                self.ac_minutes[i, j] = \
+                    (ac_time - start_time).total_seconds() / MINUTE
+        self.total_testcases = numpy.array(
+            [total_testcases[problem.id] for problem in problems],
+            dtype=numpy.int32)
+
+        self.penalty_matrix = numpy.where(
+            self.solved_matrix,
+            numpy.floor((self.attempts - 1) * NOT_PASS_PENALTY_UNIT +
+                        self.ac_minutes),
+            0).astype(numpy.int64)
+        self.solved = self.solved_matrix.sum(axis=1)
+        self.penalty = self.penalty_matrix.sum(axis=1)
+        self.testcases_solved = self.passed.sum(axis=1)
+        self.order = numpy.arange(len(self.usernames))
+
+        self.problems = []
+        pass_user = self.solved_matrix.sum(axis=0)
+        total_solved = self.passed.sum(axis=0)
+        submitted = self.attempts.sum(axis=0) > 0
+        for j, problem in enumerate(problems):
+            new_problem = ScoreboardProblem(
+                problem.id, problem.pname, int(self.total_testcases[j]))
+            new_problem.pass_user = int(pass_user[j])
+            new_problem.total_solved = int(total_solved[j])
+            new_problem.no_submission = not submitted[j]
+            if len(self.usernames):
+                new_problem.pass_rate = \
+                    float(new_problem.pass_user) / len(self.usernames) * 100
+                new_problem.not_pass_rate = 100 - new_problem.pass_rate
+            else:
+                new_problem.pass_rate = 0
+                new_problem.not_pass_rate = 100
+                new_problem.no_submission = True
+            self.problems.append(new_problem)
+
+    @property
+    def users(self):
+        return [MatrixUser(self, i) for i in self.order]
+
+    def get_problem(self, problem_id):
+        for scoreboard_problem in self.problems:
+            if (scoreboard_problem.id == problem_id):
+                return scoreboard_problem
+
+    # sort by solved descending. if same sort by penalty.
+    # both sorts are stable, as those of Scoreboard
+    def sort_users_by_penalty(self):
+        self.sort_users(self.penalty)
+        self.sort_users(-self.solved)
+
+    def sort_users_by_solved_testcases(self):
+        self.sort_users(-self.testcases_solved)
+
+    def sort_users(self, keys):
+        self.order = self.order[
+            numpy.argsort(keys[self.order], kind='mergesort')]
+
+
+class MatrixUser(object):
+
+    def __init__(self, scoreboard, index):
+        self.scoreboard = scoreboard
+        self.index = index
+        self.username = scoreboard.usernames[index]
+
+    @property
+    def problems(self):
+        return [MatrixUserProblem(self.scoreboard, self.index, j)
+                for j in xrange(len(self.scoreboard.problems))]
+
+    @property
+    def solved(self):
+        return self.get_solved()
+
+    @property
+    def penalty(self):
+        return display(self.get_penalty(self.scoreboard.start_time))
+
+    @property
+    def testcases_solved(self):
+        return self.get_testcases_solved()
+
+    def get_solved(self):
+        return int(self.scoreboard.solved[self.index])
+
+    def get_testcases_solved(self):
+        return int(self.scoreboard.testcases_solved[self.index])
+
+    def get_penalty(self, start_time):
+        return int(self.scoreboard.penalty[self.index])
+
+
+class MatrixUserProblem(object):
+
+    def __init__(self, scoreboard, user_index, problem_index):
+        self.scoreboard = scoreboard
+        self.cell = (user_index, problem_index)
+        self.id = scoreboard.problems[problem_index].id
+        self.total_testcases = int(
+            scoreboard.total_testcases[problem_index])
+
+    @property
+    def submit_times(self):
+        return display(int(self.scoreboard.attempts[self.cell]))
+
+    @property
+    def AC_time(self):
+        if not self.is_solved():
+            return '--'
+        return int(self.scoreboard.ac_minutes[self.cell])
+
+    @property
+    def penalty(self):
+        return display(self.get_penalty(self.scoreboard.start_time))
+
+    @property
+    def solved(self):
+        return self.is_solved()
+
+    @property
+    def testcases_solved(self):
+        return self.get_testcases_solved()
+
+    def is_solved(self):
+        return bool(self.scoreboard.solved_matrix[self.cell])
+
+    def get_testcases_solved(self):
+        return int(self.scoreboard.passed[self.cell])
+
+    def get_penalty(self, start_time):
+        return int(self.scoreboard.penalty_matrix[self.cell])
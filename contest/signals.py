@@ -0,0 +1,151 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from django.db.models.signals import post_init, pre_save, post_save, \
+    post_delete
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from contest.models import Contest
+from contest.models import Contestant
+from contest.contest_result import refresh_results
+from contest.contest_result import refresh_submission_results
+from contest.contest_result import refresh_problem_results
+from contest.contest_result import rebuild_results
+from contest.contest_version import bump_data_version
+from contest.active_contests import invalidate_active_contest_index
+
+from problem.models import Problem
+from problem.models import Submission
+from problem.models import SubmissionDetail
+from problem.models import Testcase
+from problem.submission_count import rebuild_contest_counts
+from problem.submission_count import delete_contest_counts
+
+# keep the stored contest results up to date
+
+
+@receiver(pre_save, sender=Submission)
+def submission_saving(sender, instance, **kwargs):
+    # the saved status is scored by submission_saved
+    if 'status' in instance.__dict__:
+        instance.scored_status = instance.status
+
+
+@receiver(post_save, sender=Submission)
+def submission_saved(sender, instance, **kwargs):
+    refresh_submission_results(instance)
+
+
+@receiver(post_save, sender=SubmissionDetail)
+def submission_detail_saved(sender, instance, **kwargs):
+    refresh_submission_results(instance.sid)
+
+
+@receiver(post_save, sender=Testcase)
+def testcase_saved(sender, instance, created, **kwargs):
+    if created:
+        refresh_problem_results(instance.problem)
+
+
+@receiver(post_delete, sender=Testcase)
+def testcase_deleted(sender, instance, **kwargs):
+    try:
+        problem = instance.problem
+    except Problem.DoesNotExist:
+        # deleted along with its problem
+        return
+    refresh_problem_results(problem)
+
+
+def get_contest_times(contest):
+    # the fields the stored results and submission counts depend on
+    return (contest.start_time, contest.end_time, contest.freeze_time,
+            contest.owner_id)
+
+
+@receiver(post_init, sender=Contest)
+def contest_loaded(sender, instance, **kwargs):
+    instance._counted_times = \
+        get_contest_times(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Contest)
+def contest_saved(sender, instance, created, **kwargs):
+    invalidate_active_contest_index()
+    old_times = instance._counted_times
+    new_times = get_contest_times(instance)
+    instance._counted_times = new_times
+    # a new contest has no problems and contestants yet, they are
+    # handled by the signals below
+    if created or old_times == new_times:
+        return
+    if old_times is None or old_times[:3] != new_times[:3]:
+        rebuild_results(instance)
+    rebuild_contest_counts(instance)
+
+
+@receiver(post_delete, sender=Contest)
+def contest_deleted(sender, instance, **kwargs):
+    invalidate_active_contest_index()
+    delete_contest_counts(instance)
+
+
+@receiver(m2m_changed, sender=Contest.coowner.through)
+def contest_coowner_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    invalidate_active_contest_index()
+    if not reverse:
+        rebuild_contest_counts(instance)
+    elif pk_set:
+        for contest in Contest.objects.filter(pk__in=pk_set):
+            rebuild_contest_counts(contest)
+
+
+@receiver(m2m_changed, sender=Contest.problem.through)
+def contest_problem_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    invalidate_active_contest_index()
+    if not reverse:
+        rebuild_results(instance)
+        rebuild_contest_counts(instance)
+    elif pk_set:
+        for contest in Contest.objects.filter(pk__in=pk_set):
+            rebuild_results(contest)
+            rebuild_contest_counts(contest)
+
+
+@receiver(post_save, sender=Contestant)
+def contestant_saved(sender, instance, **kwargs):
+    invalidate_active_contest_index()
+    refresh_results(instance.contest, users=[instance.user_id])
+    bump_data_version(instance.contest, reset=True)
+    rebuild_contest_counts(instance.contest)
+
+
+@receiver(post_delete, sender=Contestant)
+def contestant_deleted(sender, instance, **kwargs):
+    invalidate_active_contest_index()
+    # the contest may be being deleted along with its contestants
+    for contest in Contest.objects.filter(pk=instance.contest_id):
+        bump_data_version(contest, reset=True)
+        rebuild_contest_counts(contest)
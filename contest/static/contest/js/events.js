@@ -0,0 +1,72 @@
+/*
+The MIT License (MIT)
+Copyright (c) 2014 NTHUOJ team
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+// refresh the parts of the contest page the push server tells changed
+var refreshTimers = {};
+
+// run a refresh once for all the events arriving within the delay, so
+// that a burst of events costs one request
+function refreshLater(name, delay, refresh) {
+    if (refreshTimers[name]) {
+        return;
+    }
+    refreshTimers[name] = setTimeout(function() {
+        refreshTimers[name] = null;
+        refresh();
+    }, delay);
+}
+
+function refreshScoreboard() {
+    $('.scoreboard-page').each(function() {
+        loadScoreboard($(this), $(this).data('url'));
+    });
+}
+
+function refreshContestStatus() {
+    var container = $('.contest-status-page');
+    // the status panel is not loaded until its tab is shown
+    if (container.data('loaded')) {
+        loadContestStatus(container, container.data('url'));
+    }
+}
+
+function refreshClarifications() {
+    $('#contest_clarification').load(
+        window.location.pathname + ' #contest_clarification > *');
+}
+
+$(document).ready(function() {
+    var url = $('#contest-events').data('url');
+    if (!url || !window.EventSource) {
+        return;
+    }
+    // without the push server the request fails and is not retried
+    var source = new EventSource(url);
+    source.addEventListener('scoreboard', function() {
+        refreshLater('scoreboard', 3000, refreshScoreboard);
+    });
+    $.each(['submission', 'verdict'], function(i, name) {
+        source.addEventListener(name, function() {
+            refreshLater('status', 1000, refreshContestStatus);
+        });
+    });
+    source.addEventListener('clarification', function() {
+        refreshLater('clarification', 1000, refreshClarifications);
+    });
+});
@@ -17,7 +17,31 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 */
+function loadScoreboard(container, url) {
+    // kept so that the page shown is the one refreshed on changes
+    container.data('url', url);
+    container.load(url, function() {
+        container.find('[data-toggle="tooltip"]').tooltip({
+            'placement': 'top'
+        });
+    });
+}
+
 $(document).ready(function() {
+    // scoreboard pages are loaded into the tab of their ordering
+    $('.scoreboard-page').each(function() {
+        loadScoreboard($(this), $(this).data('url'));
+    });
+    $(document).on('click', 'a.scoreboard-link', function(e) {
+        e.preventDefault();
+        var container = $(this).closest('.tab-pane').find('.scoreboard-page');
+        loadScoreboard(container, $(this).attr('href'));
+    });
+    $('.scoreboard-search').submit(function(e) {
+        e.preventDefault();
+        var container = $(this).closest('.tab-pane').find('.scoreboard-page');
+        loadScoreboard(container, $(this).attr('action') + '?' + $(this).serialize());
+    });
     $("b").tooltip({
         placement: 'top'
     });
@@ -0,0 +1,39 @@
+/*
+The MIT License (MIT)
+Copyright (c) 2014 NTHUOJ team
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+function loadContestStatus(container, url) {
+    // kept so that the page shown is the one refreshed on changes
+    container.data('url', url);
+    container.load(url);
+}
+
+$(document).ready(function() {
+    // the status panel is loaded when its tab is shown for the first time
+    $('a[href="#status"]').on('shown.bs.tab', function() {
+        var container = $('.contest-status-page');
+        if (!container.data('loaded')) {
+            container.data('loaded', true);
+            loadContestStatus(container, container.data('url'));
+        }
+    });
+    $(document).on('click', 'a.contest-status-link', function(e) {
+        e.preventDefault();
+        loadContestStatus($('.contest-status-page'), $(this).attr('href'));
+    });
+});
@@ -0,0 +1,325 @@
+import asyncore
+import resource
+import socket
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from contest.contest_info import get_freeze_time_datetime
+from contest.models import Clarification
+from contest.push_server import EventConnection, EventTailer, PushServer, \
+    Subscriber
+from contest.push_server import format_event, get_request_user
+from problem.models import Submission
+from users.models import User
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Complex01
+from utils.test_helper import *
+
+
+class Tester_Contest_push_server(NTHUOJ_TestCase_Complex01):
+    """ test module 'contest.push_server' """
+
+    def setUp(self):
+        super(Tester_Contest_push_server, self).setUp()
+        self.CONTEST.freeze_time = 60
+        self.CONTEST.save()
+        self.tailer = EventTailer()
+        self.contest = self.tailer.get_contest(self.CONTEST.id)
+        self.tailer.poll()
+
+    def submit(self, user, minutes=10, status=Submission.WAIT):
+        return Submission.objects.create(
+            problem=self.CONTEST_PROBLEMS[0], user=user, status=status,
+            submit_time=self.CONTEST.start_time + timedelta(minutes=minutes))
+
+    def get_kinds(self, events):
+        return [event['event'] for event in events]
+
+    def test_01_submission_and_verdict(self):
+        # 1.new submissions and their verdicts are tailed
+        submission = self.submit(self.CONTEST_CONTESTANTS[0])
+        events = self.tailer.poll()
+        self.assertIn('submission', self.get_kinds(events))
+        # a problem without testcase is solved by any submission
+        self.assertIn('scoreboard', self.get_kinds(events))
+        self.assertEqual(self.tailer.poll(), [])
+        submission.status = Submission.ACCEPTED
+        submission.save()
+        events = self.tailer.poll()
+        self.assertEqual(self.get_kinds(events), ['verdict'])
+        verdict = [event for event in events if event['event'] == 'verdict']
+        self.assertEqual(verdict[0]['data']['status'], Submission.ACCEPTED)
+        self.assertIn('event: verdict\n', format_event(verdict[0]))
+
+    def test_02_not_in_contest(self):
+        # 2.submissions of users not attending the contest are left out
+        self.submit(self.ADMIN_USER)
+        self.assertEqual(self.tailer.poll(), [])
+
+    def test_03_freeze(self):
+        # 3.other contestants' submissions after freeze time and owners'
+        #   submissions are only pushed to privileged subscribers
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        freeze_time = get_freeze_time_datetime(self.CONTEST)
+        minutes = (freeze_time - self.CONTEST.start_time).seconds / 60 + 10
+        self.submit(user_a, minutes)
+        self.submit(self.CONTEST_OWNER)
+        events = [event for event in self.tailer.poll()
+                  if event['event'] == 'submission']
+        self.assertEqual(len(events), 2)
+        subscriber_a = Subscriber(user_a, self.contest, False)
+        subscriber_b = Subscriber(user_b, self.contest, False)
+        owner = Subscriber(self.CONTEST_COOWNERS[0], self.contest, True)
+        self.assertEqual([subscriber_a.can_receive(e) for e in events],
+                         [True, False])
+        self.assertEqual([subscriber_b.can_receive(e) for e in events],
+                         [False, False])
+        self.assertEqual([owner.can_receive(e) for e in events],
+                         [True, True])
+
+    def test_04_clarification(self):
+        # 4.replies are pushed to the asker, or everyone if replied to all
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        clarification = create_clarification(
+            self.CONTEST, self.CONTEST_PROBLEMS[0], user_a)
+        clarification.reply = 'reply'
+        clarification.reply_time = datetime.now() + timedelta(seconds=1)
+        clarification.save()
+        events = self.tailer.poll()
+        self.assertEqual(self.get_kinds(events), ['clarification'])
+        self.assertTrue(Subscriber(user_a, self.contest, False).can_receive(
+            events[0]))
+        self.assertFalse(Subscriber(user_b, self.contest, False).can_receive(
+            events[0]))
+
+    def test_05_subscribe(self):
+        # 5.subscribers get an event stream after authenticating
+        #   with their session cookie
+        session_key = self.NORMAL_CLIENT.cookies[
+            settings.SESSION_COOKIE_NAME].value
+        headers = {'cookie': '%s=%s' % (
+            settings.SESSION_COOKIE_NAME, session_key)}
+        self.assertEqual(get_request_user(headers), self.NORMAL_USER)
+        self.assertFalse(get_request_user({}).username)
+
+        server = PushServer('127.0.0.1', 0)
+        client = socket.create_connection(server.socket.getsockname())
+        try:
+            client.sendall('GET /contest/%d/events/ HTTP/1.1\r\n'
+                           'Cookie: %s\r\n\r\n' %
+                           (self.CONTEST.id, headers['cookie']))
+            # the steps of the connection and the database threads
+            # are run in turn here
+            self.loop()
+            server.serve_tasks()
+            server.dispatch()
+            self.assertEqual(len(server.subscriptions[self.CONTEST.id]), 1)
+            self.submit(self.NORMAL_USER)
+            server.poll()
+            server.dispatch()
+            self.loop()
+            client.settimeout(1)
+            response = client.recv(4096)
+            self.assertTrue(response.startswith('HTTP/1.1 200 OK'))
+            self.assertIn('text/event-stream', response)
+            self.assertIn('event: submission', response)
+        finally:
+            client.close()
+            for connection in asyncore.socket_map.values():
+                connection.close()
+
+    def test_06_rejected(self):
+        # 6.contests of rejected or closed subscriptions are not polled
+        self.CONTEST.start_time = datetime.now() + timedelta(hours=1)
+        self.CONTEST.end_time = datetime.now() + timedelta(hours=2)
+        self.CONTEST.save()
+        server = PushServer('127.0.0.1', 0)
+        try:
+            connection = FakeConnection()
+            server.request_subscription(connection, self.CONTEST.id, {})
+            server.serve_tasks()
+            self.assertEqual(server.tailer.contests, {})
+            server.dispatch()
+            self.assertEqual(connection.status, '403 Forbidden')
+
+            server.request_subscription(
+                connection, self.CONTEST.id,
+                self.get_session_headers(self.ADMIN_CLIENT))
+            server.serve_tasks()
+            connection.closed = True
+            server.dispatch()
+            server.serve_tasks()
+            self.assertEqual(server.tailer.contests, {})
+        finally:
+            server.close()
+
+    def test_07_held_scoreboard(self):
+        # 7.scoreboard events during the freeze are held back from
+        #   unprivileged subscribers until the contest ends
+        event = self.tailer.new_event(
+            self.CONTEST.id, 'scoreboard', {'version': 1})
+        subscriber = Subscriber(self.CONTEST_CONTESTANTS[0], self.contest,
+                                False)
+        owner = Subscriber(self.CONTEST_OWNER, self.contest, True)
+        self.contest.freeze_time = datetime.now() - timedelta(minutes=1)
+        self.contest.end_time = datetime.now() + timedelta(minutes=1)
+        self.assertFalse(subscriber.can_receive(event))
+        self.assertTrue(owner.can_receive(event))
+        self.assertIsNone(subscriber.release_held_event())
+        self.contest.end_time = datetime.now() - timedelta(seconds=1)
+        self.assertEqual(subscriber.release_held_event(), event)
+        self.assertIsNone(subscriber.release_held_event())
+
+    def test_08_same_reply_time(self):
+        # 8.replies sharing a reply time are all pushed
+        reply_time = datetime.now().replace(microsecond=0) + \
+            timedelta(seconds=2)
+        for i in xrange(2):
+            clarification = create_clarification(
+                self.CONTEST, self.CONTEST_PROBLEMS[0],
+                self.CONTEST_CONTESTANTS[0])
+            Clarification.objects.filter(pk=clarification.pk).update(
+                reply='reply', reply_all=True, reply_time=reply_time)
+            events = self.tailer.poll()
+            self.assertEqual(self.get_kinds(events), ['clarification'])
+            self.assertEqual(events[0]['data']['id'], clarification.pk)
+
+    def test_09_pending_wait(self):
+        # 9.pending waits are answered once a status changes, with one
+        #   query for the submissions of all waiters
+        submission = self.submit(self.NORMAL_USER)
+        hidden = self.submit(self.ADMIN_USER)
+        headers = self.get_session_headers(self.NORMAL_CLIENT)
+        server = PushServer('127.0.0.1', 0)
+        try:
+            connection = FakeConnection()
+            server.request_wait(
+                connection, {submission.id: Submission.WAIT,
+                             hidden.id: Submission.WAIT}, 30, headers)
+            server.serve_tasks()
+            server.dispatch()
+            # submissions the user can't view are not watched
+            self.assertEqual(server.waiter_counts, {submission.id: 1})
+            server.poll()
+            server.dispatch()
+            self.assertIsNone(connection.data)
+            Submission.objects.filter(pk=hidden.pk).update(
+                status=Submission.ACCEPTED)
+            Submission.objects.filter(pk=submission.pk).update(
+                status=Submission.ACCEPTED)
+            server.poll()
+            server.dispatch()
+            self.assertEqual(connection.data, {'sids': [submission.id]})
+            server.serve_tasks()
+            self.assertEqual(server.waiter_counts, {})
+            # 10.changed statuses are answered at once, unchanged ones
+            #   once the wait times out
+            changed = FakeConnection()
+            server.request_wait(
+                changed, {submission.id: Submission.WAIT}, 30, headers)
+            unchanged = FakeConnection()
+            server.request_wait(
+                unchanged, {submission.id: Submission.ACCEPTED}, 0, headers)
+            server.serve_tasks()
+            server.dispatch()
+            self.assertEqual(changed.data, {'sids': [submission.id]})
+            self.assertIsNone(unchanged.data)
+            server.expire_waits()
+            self.assertEqual(unchanged.data, {'sids': []})
+            server.serve_tasks()
+            self.assertEqual(server.waiter_counts, {})
+        finally:
+            server.close()
+
+    def get_session_headers(self, client):
+        session_key = client.cookies[
+            settings.SESSION_COOKIE_NAME].value
+        return {'cookie': '%s=%s' % (
+            settings.SESSION_COOKIE_NAME, session_key)}
+
+    def loop(self):
+        for i in xrange(5):
+            asyncore.loop(timeout=0.1, count=1)
+
+
+class Tester_Contest_push_server_sockets(SimpleTestCase):
+    """ test serving more connections than select() can watch """
+
+    SOCKETS = 1100
+
+    def setUp(self):
+        # a client and a server socket per connection
+        needed = self.SOCKETS * 2 + 100
+        self.limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+        soft, hard = self.limits
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            if hard != resource.RLIM_INFINITY and hard < needed:
+                self.skipTest('at most %d file descriptors' % hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+        self.server = PushServer('127.0.0.1', 0)
+        self.port = self.server.socket.getsockname()[1]
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        for connection in self.get_connections():
+            connection.close()
+        self.server.close()
+        resource.setrlimit(resource.RLIMIT_NOFILE, self.limits)
+
+    def get_connections(self):
+        return [dispatcher for dispatcher in asyncore.socket_map.values()
+                if isinstance(dispatcher, EventConnection)]
+
+    def serve_until(self, condition):
+        for i in xrange(1000):
+            if condition():
+                return
+            self.server.serve_connections()
+        self.fail('condition not met')
+
+    def test_01_many_sockets(self):
+        # 1.descriptors beyond 1024 are served like the others
+        for i in xrange(self.SOCKETS):
+            self.clients.append(
+                socket.create_connection(('127.0.0.1', self.port)))
+            if len(self.clients) % 100 == 0:
+                self.serve_until(
+                    lambda: len(self.get_connections()) == len(self.clients))
+        self.serve_until(
+            lambda: len(self.get_connections()) == len(self.clients))
+        self.assertGreater(max(connection.socket.fileno()
+                               for connection in self.get_connections()),
+                           1024)
+        client = self.clients[-1]
+        client.sendall('GET /unknown HTTP/1.1\r\n\r\n')
+        client.settimeout(0)
+        response = []
+
+        def responded():
+            try:
+                response.append(client.recv(1024))
+            except socket.error:
+                pass
+            return '404 Not Found' in ''.join(response)
+        self.serve_until(responded)
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.closed = False
+        self.status = None
+        self.waiter = None
+        self.data = None
+
+    def respond_error(self, status):
+        self.status = status
+
+    def accept(self, subscriber):
+        self.subscriber = subscriber
+
+    def respond_json(self, data):
+        self.data = data
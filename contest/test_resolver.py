@@ -0,0 +1,107 @@
+import random
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+
+from contest.contest_info import build_object_scoreboard
+from contest import resolver
+from contest.resolver import resolve
+from contest.scoreboard import ScoreboardProblem
+from utils.test_helper import random_scoreboard_results
+
+
+class Tester_Contest_resolver(TestCase):
+    """ test function 'resolver.resolve' """
+
+    def setUp(self):
+        self.start_time = datetime(2015, 1, 1)
+        self.freeze_time = self.start_time + timedelta(hours=4)
+
+    def at(self, minutes):
+        return self.start_time + timedelta(minutes=minutes)
+
+    def build(self, usernames, problems, total_testcases, results):
+        return build_object_scoreboard(
+            self.start_time, usernames, problems, total_testcases, results)
+
+    def freeze(self, results):
+        # results after freeze time are hidden, with a few more attempts
+        frozen_results = {}
+        for key, result in results.items():
+            attempts, ac_time, passed = result
+            if ac_time is not None and ac_time > self.freeze_time:
+                frozen_results[key] = (attempts - 1, None, 0)
+            elif ac_time is None and random.randint(0, 1):
+                frozen_results[key] = (attempts - 1, None, passed)
+            else:
+                frozen_results[key] = result
+        return frozen_results
+
+    def random_contest(self, user_count, problem_count):
+        usernames = ['user%d' % i for i in xrange(user_count)]
+        problems = [ScoreboardProblem(i, 'problem%d' % i, 0)
+                    for i in xrange(1, problem_count + 1)]
+        total_testcases = dict((problem.id, 10) for problem in problems)
+        results = random_scoreboard_results(
+            usernames, problems, total_testcases, self.start_time)
+        final = self.build(usernames, problems, total_testcases, results)
+        frozen = self.build(
+            usernames, problems, total_testcases, self.freeze(results))
+        return frozen, final
+
+    def test_01_bottom_up(self):
+        # 1.the lowest ranked contestant with hidden results goes first
+        usernames = ['a', 'b', 'c']
+        problems = [ScoreboardProblem(1, 'p1', 0)]
+        total_testcases = {1: 1}
+        frozen = self.build(usernames, problems, total_testcases, {
+            ('a', 1): (1, self.at(10), 1),
+            ('b', 1): (1, None, 0),
+            ('c', 1): (1, None, 0),
+        })
+        final = self.build(usernames, problems, total_testcases, {
+            ('a', 1): (1, self.at(10), 1),
+            ('b', 1): (2, None, 0),
+            ('c', 1): (2, self.at(250), 1),
+        })
+        events = resolve(frozen, final)
+        self.assertEqual(
+            [(event['username'], event['old_rank'], event['new_rank'])
+             for event in events],
+            [('c', 3, 2), ('b', 3, 3)])
+        self.assertEqual(events[0]['penalty'], 270)
+        self.assertEqual(events[0]['AC_time'], 250)
+
+    def test_02_final_ranking(self):
+        # 2.revealing every event ends in the final ranking
+        frozen, final = self.random_contest(100, 8)
+        events = resolve(frozen, final)
+        frozen.sort_users_by_penalty()
+        ranking = [user.username for user in frozen.users]
+        for event in events:
+            self.assertEqual(ranking[event['old_rank'] - 1], event['username'])
+            self.assertLessEqual(event['new_rank'], event['old_rank'])
+            ranking.remove(event['username'])
+            ranking.insert(event['new_rank'] - 1, event['username'])
+        final.sort_users_by_penalty()
+        self.assertEqual(ranking, [user.username for user in final.users])
+
+    def test_03_cost(self):
+        # 3.each event moves one contestant with a few binary searches
+        #   instead of sorting everyone again
+        frozen, final = self.random_contest(2000, 10)
+        calls = []
+
+        def counted(function):
+            def wrapper(*args, **kwargs):
+                calls.append(function.__name__)
+                return function(*args, **kwargs)
+            return wrapper
+        original = resolver.bisect_left, resolver.insort
+        resolver.bisect_left, resolver.insort = map(counted, original)
+        try:
+            events = resolve(frozen, final)
+        finally:
+            resolver.bisect_left, resolver.insort = original
+        self.assertTrue(events)
+        self.assertEqual(len(calls), 3 * len(events))
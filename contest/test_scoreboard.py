@@ -0,0 +1,697 @@
+import csv
+import json
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from django.apps import apps
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from contest.contest_info import get_scoreboard, get_freeze_time_datetime
+from contest.contest_info import get_scoreboard_cache_timeout
+from contest.contest_info import SCOREBOARD_CACHE_TIMEOUT
+from contest.contest_info import build_object_scoreboard
+from contest.contest_version import get_data_version
+from contest.contest_version import bump_data_version
+from contest.contest_version import get_reset_version
+from contest.contest_result import RESULT_FIELDS
+from contest.models import ContestResult
+from contest.models import ScoreboardSnapshot
+from contest.register_contest import add_contestants
+from contest.scoreboard import ScoreboardProblem
+from contest.scoreboard_matrix import MatrixScoreboard
+from contest.scoreboard_index import PAGE_SIZE
+from problem.models import Submission, SubmissionDetail
+from users.models import User
+from utils.rejudge import rejudge_submission, rejudge_contest_problem
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Complex01
+from utils.test_helper import *
+
+
+class Scoreboard_TestCase(NTHUOJ_TestCase_Complex01):
+
+    def setUp(self):
+        super(Scoreboard_TestCase, self).setUp()
+        self.CONTEST.freeze_time = 60
+        self.CONTEST.save()
+        self.TESTCASES = {}
+        for problem in self.CONTEST_PROBLEMS:
+            self.TESTCASES[problem.pk] = [
+                create_testcase(problem, local_files=False) for i in xrange(2)]
+
+    def submit(self, user, problem, minutes, passed, status=None):
+        testcases = self.TESTCASES[problem.pk]
+        if status is None:
+            if passed == len(testcases):
+                status = Submission.ACCEPTED
+            else:
+                status = Submission.NOT_ACCEPTED
+        submit_time = self.CONTEST.start_time + timedelta(minutes=minutes)
+        submission = Submission.objects.create(
+            problem=problem, user=user, status=status, submit_time=submit_time)
+        for i, testcase in enumerate(testcases):
+            if i < passed:
+                verdict = SubmissionDetail.AC
+            else:
+                verdict = SubmissionDetail.WA
+            create_submission_detail(submission, testcase, verdict)
+        return submission
+
+    def get_user(self, scoreboard, user):
+        for scoreboard_user in scoreboard.users:
+            if scoreboard_user.username == user.username:
+                return scoreboard_user
+
+
+class Tester_Contest_scoreboard(Scoreboard_TestCase):
+    """ test function 'contest_info.get_scoreboard' """
+
+    def test_01_penalty(self):
+        # 1.penalty is 20 minutes per wrong try plus the minutes to AC,
+        #   judge error submissions are ignored
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        problem_0, problem_1 = self.CONTEST_PROBLEMS
+        self.submit(user_a, problem_0, 1, 0, status=Submission.JUDGE_ERROR)
+        self.submit(user_a, problem_0, 10, 1)
+        self.submit(user_a, problem_0, 30, 2)
+        self.submit(user_a, problem_0, 40, 0)
+        self.submit(user_a, problem_1, 20, 1)
+        self.submit(user_b, problem_0, 5, 2)
+
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        result_a = self.get_user(scoreboard, user_a)
+        self.assertEqual(result_a.solved, 1)
+        self.assertEqual(result_a.penalty, 50)
+        self.assertEqual(result_a.testcases_solved, 3)
+        self.assertEqual(result_a.problems[0].submit_times, 2)
+        self.assertEqual(result_a.problems[0].AC_time, 30)
+        self.assertEqual(result_a.problems[1].submit_times, 1)
+        self.assertEqual(result_a.problems[1].AC_time, '--')
+        result_b = self.get_user(scoreboard, user_b)
+        self.assertEqual(result_b.penalty, 5)
+        self.assertEqual(result_b.problems[1].submit_times, '--')
+
+        self.assertEqual(scoreboard.problems[0].pass_user, 2)
+        self.assertEqual(scoreboard.problems[0].total_solved, 4)
+        self.assertEqual(scoreboard.problems[1].pass_user, 0)
+        self.assertEqual(scoreboard.problems[1].total_solved, 1)
+        self.assertFalse(scoreboard.problems[1].no_submission)
+
+        scoreboard.sort_users_by_penalty()
+        self.assertEqual(
+            [user.username for user in scoreboard.users],
+            [user_b.username, user_a.username])
+        scoreboard.sort_users_by_solved_testcases()
+        self.assertEqual(
+            [user.username for user in scoreboard.users],
+            [user_a.username, user_b.username])
+
+    def test_02_freeze(self):
+        # 2.submissions after freeze time are hidden unless the user
+        #   has contest ownership
+        user_a = self.CONTEST_CONTESTANTS[0]
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        freeze_time = get_freeze_time_datetime(self.CONTEST)
+        minutes = (freeze_time - self.CONTEST.start_time).seconds / 60 + 10
+        self.submit(user_a, problem_0, minutes, 2)
+
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user_a).solved, 0)
+        self.assertTrue(scoreboard.problems[0].no_submission)
+        for user in [self.CONTEST_OWNER] + self.CONTEST_COOWNERS:
+            scoreboard = get_scoreboard(user, self.CONTEST)
+            self.assertEqual(self.get_user(scoreboard, user_a).solved, 1)
+            self.assertEqual(
+                self.get_user(scoreboard, user_a).problems[0].AC_time, minutes)
+
+    def test_03_query_count(self):
+        # 3.the number of queries does not grow with contestants
+        for user in self.CONTEST_CONTESTANTS:
+            for problem in self.CONTEST_PROBLEMS:
+                self.submit(user, problem, 10, 1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        query_count = len(context.captured_queries)
+
+        new_contestants = []
+        for i in xrange(10):
+            new_contestants.append(
+                User.objects.create_user('scoreboard%d' % i, 'scoreboard'))
+        add_contestants(new_contestants, self.CONTEST)
+        for user in new_contestants:
+            for problem in self.CONTEST_PROBLEMS:
+                self.submit(user, problem, 10, 1)
+                self.submit(user, problem, 20, 2)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(len(scoreboard.users), 12)
+        self.assertEqual(len(context.captured_queries), query_count)
+
+
+class Tester_Contest_result(Scoreboard_TestCase):
+    """ test stored contest results """
+
+    def get_result(self, user, problem):
+        return ContestResult.objects.get(
+            contest=self.CONTEST, user=user, problem=problem)
+
+    def test_01_verdict(self):
+        # 1.results are updated when submissions are judged
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        self.submit(user, problem, 10, 1)
+        submission = create_submission(
+            problem, user, Submission.WAIT,
+            self.CONTEST.start_time + timedelta(minutes=20))
+        result = self.get_result(user, problem)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(result.passed_testcases, 1)
+        self.assertIsNone(result.ac_time)
+        for testcase in self.TESTCASES[problem.pk]:
+            create_submission_detail(
+                submission, testcase, SubmissionDetail.AC)
+        result = self.get_result(user, problem)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(result.passed_testcases, 2)
+        self.assertEqual(result.ac_time, submission.submit_time)
+        self.assertEqual(result.frozen_ac_time, submission.submit_time)
+
+    def test_02_rejudge(self):
+        # 2.results are updated when submissions are rejudged
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        submission = self.submit(user, problem, 10, 2)
+        rejudge_submission(submission)
+        result = self.get_result(user, problem)
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(result.passed_testcases, 0)
+        self.assertIsNone(result.ac_time)
+
+    def test_03_rebuild(self):
+        # 3.results changed behind the models are fixed by rebuilding
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        submission = self.submit(user, problem, 10, 2)
+        SubmissionDetail.objects.filter(sid=submission).update(
+            verdict=SubmissionDetail.WA)
+        self.assertIsNotNone(self.get_result(user, problem).ac_time)
+        call_command('rebuild_scoreboard', str(self.CONTEST.pk))
+        result = self.get_result(user, problem)
+        self.assertIsNone(result.ac_time)
+        self.assertEqual(result.passed_testcases, 0)
+
+    def test_04_sync(self):
+        # 4.verdicts written behind the models, e.g. by the judge,
+        #   are synced when the scoreboard is read
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        submission = self.submit(user, problem, 10, 0, Submission.WAIT)
+
+        def judge(submission, status, verdict):
+            # details first, then the verdict, none through the models
+            SubmissionDetail.objects.filter(sid=submission).delete()
+            SubmissionDetail.objects.bulk_create([
+                SubmissionDetail(sid=submission, tid=testcase,
+                                 verdict=verdict)
+                for testcase in self.TESTCASES[problem.pk]])
+            Submission.objects.filter(pk=submission.pk).update(status=status)
+        judge(submission, Submission.ACCEPTED, SubmissionDetail.AC)
+        cache.clear()
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 1)
+        self.assertEqual(self.get_result(user, problem).ac_time,
+                         submission.submit_time)
+        # 5.only the results of the judged submissions are recomputed
+        other = self.submit(self.CONTEST_CONTESTANTS[1], problem, 20, 0,
+                            Submission.WAIT)
+        ContestResult.objects.filter(user=user).update(attempts=5)
+        judge(other, Submission.ACCEPTED, SubmissionDetail.AC)
+        cache.clear()
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(
+            self.get_user(scoreboard, self.CONTEST_CONTESTANTS[1]).solved, 1)
+        self.assertEqual(self.get_result(user, problem).attempts, 5)
+        # 6.a rejudged submission is synced again once judged, even if
+        #   the statuses of the contest are swapped around
+        rejudge_submission(Submission.objects.get(pk=submission.pk))
+        rejudge_submission(Submission.objects.get(pk=other.pk))
+        judge(submission, Submission.NOT_ACCEPTED, SubmissionDetail.WA)
+        judge(other, Submission.ACCEPTED, SubmissionDetail.AC)
+        cache.clear()
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 0)
+        self.assertEqual(
+            self.get_user(scoreboard, self.CONTEST_CONTESTANTS[1]).solved, 1)
+
+    def test_05_contest_saved(self):
+        # 5.saving a contest only rebuilds the results if its times change
+        version = get_data_version(self.CONTEST)
+        self.CONTEST.cname = 'renamed'
+        self.CONTEST.save()
+        self.assertEqual(get_data_version(self.CONTEST), version)
+        self.CONTEST.freeze_time = 30
+        self.CONTEST.save()
+        self.assertGreater(get_data_version(self.CONTEST), version)
+
+    def test_06_migration(self):
+        # 6.the results of contests before the migrations are backfilled
+        #   as they are stored on verdicts
+        length = (self.CONTEST.end_time - self.CONTEST.start_time)
+        after_freeze = length.total_seconds() / 60 - 30
+        user = self.CONTEST_CONTESTANTS[0]
+        self.submit(user, self.CONTEST_PROBLEMS[0], 10, 1)
+        self.submit(user, self.CONTEST_PROBLEMS[0], 20, 2)
+        self.submit(user, self.CONTEST_PROBLEMS[1], 10, 1)
+        self.submit(user, self.CONTEST_PROBLEMS[1], after_freeze, 2)
+        self.submit(self.CONTEST_CONTESTANTS[1], self.CONTEST_PROBLEMS[0],
+                    30, 0)
+        stored = ContestResult.objects.filter(contest=self.CONTEST)
+        fields = ('user', 'problem') + RESULT_FIELDS
+        results = set(stored.values_list(*fields))
+        version = get_data_version(self.CONTEST)
+        stored.delete()
+        migration = import_module('contest.migrations.0003_backfill_results')
+        migration.backfill_results(apps, None)
+        self.assertEqual(set(stored.values_list(*fields)), results)
+        self.assertGreater(get_data_version(self.CONTEST), version)
+        self.assertEqual(get_reset_version(self.CONTEST),
+                         get_data_version(self.CONTEST))
+
+    def test_07_testcase_deleted(self):
+        # 7.deleting a testcase outside the views, e.g. in the admin,
+        #   recomputes the results of its problem
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        submission = self.submit(user, problem, 10, 1)
+        self.assertIsNone(self.get_result(user, problem).ac_time)
+        self.TESTCASES[problem.pk][1].delete()
+        self.assertEqual(self.get_result(user, problem).ac_time,
+                         submission.submit_time)
+
+
+class Tester_Contest_scoreboard_cache(Scoreboard_TestCase):
+    """ test caching of function 'contest_info.get_scoreboard' """
+
+    def test_01_cached(self):
+        # 1.scoreboards are built once per contest data version
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        self.submit(user, problem, 10, 1)
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        with CaptureQueriesContext(connection) as context:
+            scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        for query in context.captured_queries:
+            self.assertNotIn('contestresult', query['sql'])
+        self.assertEqual(self.get_user(scoreboard, user).testcases_solved, 1)
+
+        version = get_data_version(self.CONTEST)
+        self.submit(user, problem, 20, 2)
+        self.assertGreater(get_data_version(self.CONTEST), version)
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 1)
+
+    def test_02_view(self):
+        # 2.frozen and full scoreboards are cached separately
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        freeze_time = get_freeze_time_datetime(self.CONTEST)
+        minutes = (freeze_time - self.CONTEST.start_time).seconds / 60 + 10
+        self.submit(user, problem, minutes, 2)
+        scoreboard = get_scoreboard(self.CONTEST_OWNER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 1)
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 0)
+
+    def test_03_rejudge(self):
+        # 3.rejudging bumps the contest data version
+        user = self.CONTEST_CONTESTANTS[0]
+        problem = self.CONTEST_PROBLEMS[0]
+        self.submit(user, problem, 10, 2)
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 1)
+        rejudge_contest_problem(self.CONTEST, problem)
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, user).solved, 0)
+
+    def test_04_timeout(self):
+        # 4.cached scoreboards expire at the freeze time and the end time
+        now = datetime.now()
+        self.CONTEST.end_time = now + timedelta(minutes=90)
+        self.CONTEST.save()
+        timeout = get_scoreboard_cache_timeout(self.CONTEST)
+        self.assertLessEqual(timeout, 30 * 60)
+        self.CONTEST.freeze_time = 0
+        self.CONTEST.end_time = now + timedelta(seconds=30)
+        self.CONTEST.save()
+        self.assertLessEqual(get_scoreboard_cache_timeout(self.CONTEST), 30)
+        self.CONTEST.end_time = now - timedelta(minutes=1)
+        self.CONTEST.save()
+        self.assertEqual(get_scoreboard_cache_timeout(self.CONTEST),
+                         SCOREBOARD_CACHE_TIMEOUT)
+
+
+class Tester_Contest_scoreboard_snapshot(Scoreboard_TestCase):
+    """ test final scoreboard snapshots of ended contests """
+
+    def setUp(self):
+        super(Tester_Contest_scoreboard_snapshot, self).setUp()
+        self.USER = self.CONTEST_CONTESTANTS[0]
+        self.PROBLEM = self.CONTEST_PROBLEMS[0]
+        self.submit(self.USER, self.PROBLEM, 10, 2)
+        self.CONTEST.end_time = datetime.now() - timedelta(minutes=1)
+        self.CONTEST.save()
+
+    def test_01_snapshot(self):
+        # 1.scoreboards of ended contests are read from a snapshot
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        snapshot = ScoreboardSnapshot.objects.get(contest=self.CONTEST)
+        self.assertEqual(snapshot.version, get_data_version(self.CONTEST))
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        for query in context.captured_queries:
+            self.assertNotIn('contestresult', query['sql'])
+        self.assertEqual(self.get_user(scoreboard, self.USER).solved, 1)
+
+    def test_02_rejudge(self):
+        # 2.the snapshot is stored again once rejudged submissions
+        #   are judged
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        rejudge_contest_problem(self.CONTEST, self.PROBLEM)
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, self.USER).solved, 0)
+        snapshot = ScoreboardSnapshot.objects.get(contest=self.CONTEST)
+        self.assertLess(snapshot.version, get_data_version(self.CONTEST))
+
+        submission = Submission.objects.get(user=self.USER)
+        for testcase in self.TESTCASES[self.PROBLEM.pk]:
+            create_submission_detail(
+                submission, testcase, SubmissionDetail.AC)
+        Submission.objects.filter(pk=submission.pk).update(
+            status=Submission.ACCEPTED)
+        cache.clear()
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, self.USER).solved, 1)
+        snapshot = ScoreboardSnapshot.objects.get(contest=self.CONTEST)
+        self.assertEqual(snapshot.version, get_data_version(self.CONTEST))
+        self.assertIn(self.USER.username, json.loads(snapshot.scoreboard)[
+            'usernames'])
+
+    def test_03_outdated(self):
+        # 3.snapshots of an older data version or unreadable are rebuilt
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        ScoreboardSnapshot.objects.filter(contest=self.CONTEST).update(
+            scoreboard='broken')
+        cache.clear()
+        scoreboard = get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        self.assertEqual(self.get_user(scoreboard, self.USER).solved, 1)
+        bump_data_version(self.CONTEST)
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        snapshot = ScoreboardSnapshot.objects.get(contest=self.CONTEST)
+        self.assertEqual(snapshot.version, get_data_version(self.CONTEST))
+
+    def test_04_running(self):
+        # 4.running contests have no snapshot
+        self.CONTEST.end_time = datetime.now() + timedelta(hours=1)
+        self.CONTEST.save()
+        get_scoreboard(self.CONTEST_OWNER, self.CONTEST)
+        self.assertFalse(ScoreboardSnapshot.objects.filter(
+            contest=self.CONTEST).exists())
+
+
+class Tester_Contest_scoreboard_matrix(TestCase):
+    """ test class 'scoreboard_matrix.MatrixScoreboard' """
+
+    def setUp(self):
+        self.start_time = datetime(2015, 1, 1)
+        self.usernames = ['user%d' % i for i in xrange(50)]
+        self.problems = [ScoreboardProblem(i, 'problem%d' % i, 0)
+                         for i in xrange(1, 6)]
+        self.total_testcases = dict(
+            (problem.id, problem.id - 1) for problem in self.problems)
+        self.results = random_scoreboard_results(
+            self.usernames, self.problems, self.total_testcases,
+            self.start_time)
+
+    def build(self, engine):
+        return engine(self.start_time, self.usernames, self.problems,
+                      self.total_testcases, self.results)
+
+    def assertSameUsers(self, users, expected_users):
+        self.assertEqual([user.username for user in users],
+                         [user.username for user in expected_users])
+        for user, expected in zip(users, expected_users):
+            self.assertEqual(user.solved, expected.solved)
+            self.assertEqual(user.penalty, expected.penalty)
+            self.assertEqual(user.testcases_solved, expected.testcases_solved)
+            for problem, expected_problem in zip(
+                    user.problems, expected.problems):
+                for attr in ('id', 'total_testcases', 'submit_times',
+                             'AC_time', 'penalty', 'solved',
+                             'testcases_solved'):
+                    self.assertEqual(getattr(problem, attr),
+                                     getattr(expected_problem, attr))
+
+    def test_01_same_as_object_engine(self):
+        # 1.matrix scoreboard shows the same as the object scoreboard,
+        #   including the orders of sorting both ways in a row
+        scoreboard = self.build(MatrixScoreboard)
+        expected = self.build(build_object_scoreboard)
+        self.assertSameUsers(scoreboard.users, expected.users)
+        for attr in ('id', 'pname', 'total_testcase', 'pass_user',
+                     'total_solved', 'pass_rate', 'not_pass_rate',
+                     'no_submission'):
+            self.assertEqual(
+                [getattr(problem, attr) for problem in scoreboard.problems],
+                [getattr(problem, attr) for problem in expected.problems])
+
+        scoreboard.sort_users_by_solved_testcases()
+        expected.sort_users_by_solved_testcases()
+        self.assertSameUsers(scoreboard.users, expected.users)
+        scoreboard.sort_users_by_penalty()
+        expected.sort_users_by_penalty()
+        self.assertSameUsers(scoreboard.users, expected.users)
+
+    def test_02_no_contestant(self):
+        # 2.problems of a contest without contestant have no submission
+        self.usernames = []
+        scoreboard = self.build(MatrixScoreboard)
+        self.assertEqual(scoreboard.users, [])
+        for problem in scoreboard.problems:
+            self.assertTrue(problem.no_submission)
+            self.assertEqual(problem.pass_rate, 0)
+
+
+class Tester_Contest_scoreboard_csv(Scoreboard_TestCase):
+    """ test downloading scoreboard csv """
+
+    def download(self, client, scoreboard_type):
+        response = client.post(reverse('contest:download'), {
+            'type': 'scoreboard', 'scoreboard_type': scoreboard_type,
+            'contest': self.CONTEST.id})
+        self.assertTrue(response.streaming)
+        content = ''.join(response.streaming_content)
+        return list(csv.reader(content.splitlines()))
+
+    def test_01_penalty(self):
+        # 1.penalty csv is sorted by solved then penalty,
+        #   frozen unless the user has contest ownership
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        freeze_time = get_freeze_time_datetime(self.CONTEST)
+        minutes = (freeze_time - self.CONTEST.start_time).seconds / 60 + 10
+        self.submit(user_a, problem_0, 10, 2)
+        self.submit(user_b, problem_0, minutes, 2)
+        rows = self.download(self.NORMAL_CLIENT, 'penalty')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1], ['1', user_a.username, '1/10', '--/--', '10'])
+        self.assertEqual(rows[2], ['2', user_b.username, '--/--', '--/--', '0'])
+        self.assertEqual(rows[3], ['Passed', '', '1', '0'])
+        rows = self.download(self.JUDGE_CLIENTS[0], 'penalty')
+        self.assertEqual(rows[3], ['Passed', '', '2', '0'])
+
+    def test_02_testcases(self):
+        # 2.testcases csv is sorted by solved testcases
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        self.submit(user_a, problem_0, 10, 1)
+        self.submit(user_b, problem_0, 10, 2)
+        rows = self.download(self.NORMAL_CLIENT, 'testcases')
+        self.assertEqual(rows[1], ['1', user_b.username, '2/2', '0/2', '2'])
+        self.assertEqual(rows[2], ['2', user_a.username, '1/2', '0/2', '1'])
+        self.assertEqual(rows[3], ['Passed Testcases', '', '3', '0'])
+
+    def test_03_cached(self):
+        # 3.the scoreboard already built is reused
+        get_scoreboard(self.NORMAL_USER, self.CONTEST)
+        with CaptureQueriesContext(connection) as context:
+            self.download(self.NORMAL_CLIENT, 'penalty')
+        for query in context.captured_queries:
+            self.assertNotIn('contestresult', query['sql'])
+
+
+class Tester_Contest_scoreboard_delta(Scoreboard_TestCase):
+    """ test view 'contest.views.scoreboard_delta' """
+
+    def get_delta(self, client, version):
+        response = client.get(reverse(
+            'contest:scoreboard_delta', args=[self.CONTEST.id]),
+            {'version': version})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_01_changed_rows(self):
+        # 1.rows changed after the given version are returned with their
+        #   current ranks, all rows are returned for version 0
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        self.submit(user_a, problem_0, 10, 1)
+        delta = self.get_delta(self.NORMAL_CLIENT, 0)
+        self.assertTrue(delta['full'])
+        self.assertEqual([row['username'] for row in delta['rows']],
+                         [user_a.username, user_b.username])
+        self.assertEqual(delta['view'], 'frozen')
+        version = delta['version']
+
+        delta = self.get_delta(self.NORMAL_CLIENT, version)
+        self.assertEqual(delta['version'], version)
+        self.assertEqual(delta['rows'], [])
+
+        self.submit(user_b, problem_0, 20, 2)
+        delta = self.get_delta(self.NORMAL_CLIENT, version)
+        self.assertFalse(delta['full'])
+        self.assertEqual([row['username'] for row in delta['rows']],
+                         [user_b.username, user_a.username])
+        row = delta['rows'][0]
+        self.assertEqual(row['rank'], 1)
+        self.assertEqual(row['testcases_rank'], 1)
+        self.assertEqual(row['solved'], 1)
+        self.assertEqual(row['penalty'], 20)
+        self.assertEqual(row['problems'][0]['AC_time'], 20)
+        self.assertEqual(row['problems'][1]['submit_times'], '--')
+        # the rank of user_a moved without its results changing
+        self.assertEqual(delta['rows'][1]['rank'], 2)
+
+    def test_02_freeze(self):
+        # 2.submissions after freeze time do not change frozen rows
+        user_a = self.CONTEST_CONTESTANTS[0]
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        version = self.get_delta(self.NORMAL_CLIENT, 0)['version']
+        freeze_time = get_freeze_time_datetime(self.CONTEST)
+        minutes = (freeze_time - self.CONTEST.start_time).seconds / 60 + 10
+        self.submit(user_a, problem_0, minutes, 2)
+        delta = self.get_delta(self.NORMAL_CLIENT, version)
+        self.assertGreater(delta['version'], version)
+        self.assertEqual(delta['rows'], [])
+        delta = self.get_delta(self.JUDGE_CLIENTS[0], version)
+        self.assertEqual(delta['view'], 'full')
+        self.assertEqual(delta['rows'][0]['solved'], 1)
+
+    def test_03_reset(self):
+        # 3.all rows are returned once rows can not be told apart
+        user_a, user_b = self.CONTEST_CONTESTANTS
+        problem_0 = self.CONTEST_PROBLEMS[0]
+        self.submit(user_a, problem_0, 10, 2)
+        version = self.get_delta(self.NORMAL_CLIENT, 0)['version']
+        create_testcase(problem_0, local_files=False)
+        delta = self.get_delta(self.NORMAL_CLIENT, version)
+        self.assertTrue(delta['full'])
+        self.assertEqual(len(delta['rows']), 2)
+        self.assertEqual(
+            delta['rows'][0]['problems'][0]['total_testcases'], 3)
+
+        version = delta['version']
+        self.submit(user_b, problem_0, 20, 1)
+        cache.clear()
+        delta = self.get_delta(self.NORMAL_CLIENT, version)
+        self.assertTrue(delta['full'])
+        self.assertEqual(len(delta['rows']), 2)
+
+    def test_04_not_started(self):
+        # 4.contest not started can not be polled by contestants
+        self.CONTEST.start_time = datetime.now() + timedelta(hours=1)
+        self.CONTEST.end_time = datetime.now() + timedelta(hours=2)
+        self.CONTEST.save()
+        response = self.NORMAL_CLIENT.get(reverse(
+            'contest:scoreboard_delta', args=[self.CONTEST.id]))
+        self.assertEqual(response.status_code, 403)
+        self.get_delta(self.JUDGE_CLIENTS[0], 0)
+
+
+class Tester_Contest_scoreboard_page(Scoreboard_TestCase):
+    """ test view 'contest.views.scoreboard' """
+
+    def setUp(self):
+        super(Tester_Contest_scoreboard_page, self).setUp()
+        users = []
+        for i in xrange(PAGE_SIZE + 10):
+            create_test_user('page%02d' % i, 'page', User.USER)
+            users.append(User.objects.get(username='page%02d' % i))
+        add_contestants(users, self.CONTEST)
+        # page00 ranks first, page59 last
+        problem = self.CONTEST_PROBLEMS[0]
+        for i, user in enumerate(users):
+            self.submit(user, problem, i + 1, 2)
+        self.USERS = users
+
+    def get_page(self, client, **data):
+        response = client.get(reverse(
+            'contest:scoreboard', args=[self.CONTEST.id]), data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_usernames(self, response):
+        return [row['username'] for row in response.context['rows']]
+
+    def test_01_page(self):
+        # 1.contestants are shown by page in rank order
+        response = self.get_page(self.NORMAL_CLIENT, type='penalty')
+        usernames = self.get_usernames(response)
+        self.assertEqual(len(usernames), PAGE_SIZE)
+        self.assertEqual(usernames[0], 'page00')
+        response = self.get_page(self.NORMAL_CLIENT, type='penalty', page=2)
+        rows = response.context['rows']
+        self.assertEqual(rows[0]['rank'], PAGE_SIZE + 1)
+        self.assertEqual(rows[0]['username'], 'page%02d' % PAGE_SIZE)
+        # 2 contestants of the fixture solve nothing
+        self.assertEqual(len(rows), 12)
+
+    def test_02_cost(self):
+        # 2.once indexed, a page is read without the scoreboard
+        self.get_page(self.NORMAL_CLIENT, type='testcases')
+        with CaptureQueriesContext(connection) as context:
+            self.get_page(self.NORMAL_CLIENT, type='testcases', page=2)
+        for query in context.captured_queries:
+            self.assertNotIn('contestresult', query['sql'])
+
+    def test_03_my_rank(self):
+        # 3.users can jump to the page of their rank
+        client = Client()
+        self.assertTrue(client.login(username='page55', password='page'))
+        response = self.get_page(client, type='penalty', mine=1)
+        self.assertEqual(response.context['rows'].number, 2)
+        self.assertIn('page55', self.get_usernames(response))
+
+    def test_04_search(self):
+        # 4.contestants can be searched by username
+        response = self.get_page(
+            self.NORMAL_CLIENT, type='penalty', search='page5')
+        self.assertEqual(self.get_usernames(response),
+                         ['page5%d' % i for i in xrange(10)])
+        response = self.get_page(
+            self.NORMAL_CLIENT, type='penalty', search='nobody')
+        self.assertEqual(self.get_usernames(response), [])
+
+    def test_05_contest_page(self):
+        # 5.contest page shows problem statistics of the scoreboard
+        response = self.NORMAL_CLIENT.get(
+            reverse('contest:contest', args=[self.CONTEST.id]))
+        problems = response.context['scoreboard_problems']
+        self.assertEqual(problems[0].pass_user, PAGE_SIZE + 10)
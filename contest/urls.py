@@ -35,6 +35,10 @@ urlpatterns = patterns('contest.views',
     url(r'^delete/(?P<cid>\d+)/$',views.delete,name='delete'),
     #detail of contest
     url(r'^(?P<cid>\d+)/$',views.contest,name='contest'),
+    #a page of scoreboard
+    url(r'^(?P<cid>\d+)/scoreboard/$',views.scoreboard,name='scoreboard'),
+    #scoreboard rows changed since a version
+    url(r'^(?P<cid>\d+)/scoreboard/delta/$',views.scoreboard_delta,name='scoreboard_delta'),
     #user register contest
     url(r'^register/(?P<cid>\d+)/$',views.register,name='register'),
     #user create new clarification
@@ -17,6 +17,8 @@
     OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
     SOFTWARE.
     '''
+import json
+
 from django.http import HttpResponseRedirect
 from django.http import HttpResponse
 from django.utils.http import urlencode
@@ -24,10 +26,10 @@ from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
 from datetime import datetime
 from django.shortcuts import redirect
+from django.shortcuts import render
 from django.forms.models import model_to_dict
 from django.contrib import messages
 
-from contest.contest_info import get_scoreboard
 from contest.contest_info import get_scoreboard_csv
 from contest.contest_info import get_public_user_password_csv
 from contest.contest_info import get_clarifications
@@ -37,6 +39,13 @@ from contest.contest_info import can_create_contest
 from contest.contest_info import can_edit_contest
 from contest.contest_info import can_delete_contest
 from contest.contest_info import get_contest_or_404
+from contest.scoreboard_index import get_scoreboard_delta
+from contest.scoreboard_index import get_scoreboard_rows
+from contest.scoreboard_index import get_scoreboard_problems
+from contest.scoreboard_index import get_rank_page
+from contest.scoreboard_index import search_scoreboard_rows
+from contest.scoreboard_index import ORDERINGS as SCOREBOARD_ORDERINGS
+from contest.scoreboard_index import PAGE_SIZE as SCOREBOARD_PAGE_SIZE
 from contest.contest_archive import get_owned_or_attended_contests
 from contest.contest_archive import get_contests
 from contest.contest_archive import add_contestants
@@ -137,8 +146,7 @@ def contest(request, cid):
             problem.testcase = get_testcase(problem)
             problem = verify_problem_code(problem)
             problem.in_contest = check_in_contest(problem)
-        scoreboard = get_scoreboard(user, contest)
-        status = contest_status(request, contest)
+        scoreboard_problems = get_scoreboard_problems(user, contest)
         clarifications = get_clarifications(user, contest)
 
         initial_form = {'contest': contest, 'asker': user}
@@ -149,9 +157,54 @@ def contest(request, cid):
         return render_index(request, 'contest/contest.html',
                             {'contest': contest, 'clarifications': clarifications,
                              'form': form, 'reply_form': reply_form,
-                             'scoreboard': scoreboard, 'status': status})
+                             'scoreboard_problems': scoreboard_problems})
+    else:
+        raise PermissionDenied
+
+# a page of the scoreboard, loaded into the contest page
+
+
+def scoreboard(request, cid):
+    user = user_info.validate_user(request.user)
+    contest = get_contest_or_404(cid)
+    if not ((contest.start_time < datetime.now()) or
+            user_info.has_contest_ownership(user, contest) or
+            user.has_admin_auth()):
+        raise PermissionDenied
+    ordering = request.GET.get('type')
+    if ordering not in SCOREBOARD_ORDERINGS:
+        ordering = 'testcases'
+    rows = get_scoreboard_rows(user, contest, ordering)
+    keyword = request.GET.get('search', '').strip()
+    render_data = {'contest': contest, 'ordering': ordering,
+                   'keyword': keyword,
+                   'problems': get_scoreboard_problems(user, contest)}
+    if keyword:
+        render_data['rows'] = search_scoreboard_rows(rows, keyword)
     else:
+        page = None
+        # jump to the page of the user's rank
+        if request.GET.get('mine') and user.username:
+            page = get_rank_page(rows, user.username)
+        render_data['rows'] = get_current_page(
+            request, rows, slice=SCOREBOARD_PAGE_SIZE, page=page)
+    return render(request, 'contest/scoreboardTable.html', render_data)
+
+# scoreboard rows changed since the version a polling client has seen
+
+
+def scoreboard_delta(request, cid):
+    user = user_info.validate_user(request.user)
+    contest = get_contest_or_404(cid)
+    if not ((contest.start_time < datetime.now()) or
+            user_info.has_contest_ownership(user, contest) or
+            user.has_admin_auth()):
         raise PermissionDenied
+    version = request.GET.get('version', '0')
+    if not is_integer(version):
+        raise Http404('Invalid scoreboard version')
+    delta = get_scoreboard_delta(user, contest, int(version))
+    return HttpResponse(json.dumps(delta), content_type="application/json")
 
 
 @login_required
@@ -400,7 +453,7 @@ def download(request):
         if what == 'scoreboard':
             scoreboard_type = request.POST.get('scoreboard_type')
             cid = request.POST.get('contest')
-            scoreboard_file = get_scoreboard_csv(cid, scoreboard_type)
+            scoreboard_file = get_scoreboard_csv(user, cid, scoreboard_type)
             return scoreboard_file
         elif what == 'public_user_password':
             cid = request.POST.get('contest')
@@ -63,6 +63,31 @@ yeti = Yeti
 
 [session_expiry]
 expiry = 5
+
+[scoreboard]
+engine = object
+
+[push]
+host = 127.0.0.1
+port = 8001
+interval = 1
+
+[problem_counter]
+shards = 0
+
+[judge_queue]
+token =
+code_files = 0
+lease = 60
+max_attempts = 3
+
+[admission]
+user_rate = 0.2
+user_burst = 5
+contest_rate = 5
+contest_burst = 100
+max_waiting = 500
+retry_after = 30
 """
 
 
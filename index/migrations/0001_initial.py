@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import datetime
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Announcement',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('content', models.TextField(default=None)),
+                ('start_time', models.DateTimeField(default=datetime.datetime.now)),
+                ('end_time', models.DateTimeField(default=datetime.datetime.now)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -86,7 +86,7 @@ if prompt('Install static file by `bower install`?'):
     django_manage('bower install')
 
 # Database Migratinos
+# the migrations ship with each app, see Upgrading in README.md
 django_manage('syncdb')
 
-django_manage('makemigrations')
 django_manage('migrate')
@@ -83,6 +83,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.7/topics/cache/
+# scoreboard indexes of big contests take hundreds of entries
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 # Custom User auth
 
 AUTH_USER_MODEL = 'users.User'
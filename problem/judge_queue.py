@@ -0,0 +1,323 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+import uuid
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import F
+
+from problem.models import JudgeTask
+from problem.models import Submission
+from problem.models import SubmissionDetail
+from problem.models import Testcase
+from problem.problem_info import add_problem_counts
+from problem.submission_count import count_submission
+from problem.submission_count import get_counted_fields
+from problem.submission_count import get_submission_contests
+from utils import config_info
+from utils.code_store import read_code
+from utils.log_info import get_logger
+
+logger = get_logger()
+
+PENDING_STATUSES = (Submission.WAIT, Submission.JUDGING)
+JUDGE_RESULTS = (
+    Submission.ACCEPTED, Submission.NOT_ACCEPTED, Submission.COMPILE_ERROR,
+    Submission.RESTRICTED_FUNCTION, Submission.JUDGE_ERROR)
+# submissions a judge can claim at once at most
+CLAIM_MAX = 50
+DEFAULT_LEASE_TIME = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def get_queue_config(option, default):
+    try:
+        return max(int(config_info.get_config('judge_queue', option)), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_judge_token():
+    """Return the token judges use the queue with, set in nthuoj.cfg.
+    The queue can't be used without it."""
+    return config_info.get_config('judge_queue', 'token') or ''
+
+
+def is_judge_queue_enabled():
+    """Return whether judges use the queue. Without a token no judge can
+    claim from it, so nothing is enqueued; fill_judge_queue enqueues the
+    pending submissions once a token is set."""
+    return bool(get_judge_token())
+
+
+def writes_code_files():
+    """Return whether submitted code is also written to its <sid>.<ext>
+    file, which the external judge reads when it doesn't use the queue.
+    Set code_files = 1 under [judge_queue] in nthuoj.cfg to keep writing
+    them along with the queue."""
+    if not is_judge_queue_enabled():
+        return True
+    try:
+        return bool(int(config_info.get_config('judge_queue', 'code_files')))
+    except (TypeError, ValueError):
+        return False
+
+
+def get_lease_time():
+    """Return the seconds a lease lasts unless renewed."""
+    return get_queue_config('lease', DEFAULT_LEASE_TIME)
+
+
+def get_max_attempts():
+    """Return the number of leases a submission may expire before it is
+    given up as a judge error."""
+    return get_queue_config('max_attempts', DEFAULT_MAX_ATTEMPTS)
+
+
+def get_submission_priority(submission, rejudged):
+    if rejudged:
+        return JudgeTask.REJUDGE
+    if get_submission_contests(submission):
+        return JudgeTask.CONTEST
+    return JudgeTask.NORMAL
+
+
+def enqueue_submission(submission, rejudged=False):
+    """Put a waiting submission into the queue, taking it back from the
+    judge holding it if any."""
+    priority = get_submission_priority(submission, rejudged)
+    requeued = JudgeTask.objects.filter(submission=submission.pk).update(
+        priority=priority, judge='', lease='', lease_expire=None, attempts=0)
+    if not requeued:
+        JudgeTask.objects.create(submission_id=submission.pk,
+                                 priority=priority)
+
+
+def fill_judge_queue():
+    """Enqueue the pending submissions not in the queue, e.g. those
+    submitted before the queue. Return the number of them."""
+    submissions = Submission.objects.filter(
+        status__in=PENDING_STATUSES, judgetask__isnull=True).order_by('id')
+    count = 0
+    for submission in submissions:
+        enqueue_submission(submission)
+        count += 1
+    return count
+
+
+def set_pending_status(submission, status):
+    """Switch a submission between the pending statuses. Contest results
+    don't tell the pending statuses apart, so only the submission counts
+    are updated along."""
+    old_fields = get_counted_fields(submission)
+    with transaction.atomic():
+        changed = Submission.objects.filter(
+            pk=submission.pk, status=submission.status,
+            counted_status=submission.counted_status).update(
+            status=status, counted_status=status)
+        if not changed:
+            return
+        submission.status = status
+        submission.counted_status = status
+        new_fields = get_counted_fields(submission)
+        count_submission(old_fields, new_fields)
+    submission._counted_fields = new_fields
+    submission._loaded_status = status
+
+
+def get_submission_details(submission, details):
+    """Return unsaved SubmissionDetail of a submission from the results of
+    its testcases given by a judge, dicts of tid, verdict and optionally
+    cpu and memory. Raise ValueError if a result is invalid."""
+    verdicts = [verdict for verdict, name in SubmissionDetail.VERDICT_CHOICE]
+    tids = set(Testcase.objects.filter(
+        problem=submission.problem_id).values_list('id', flat=True))
+    submission_details = []
+    for detail in details:
+        try:
+            tid = int(detail['tid'])
+            verdict = detail['verdict']
+            cpu = float(detail.get('cpu', 0))
+            memory = int(detail.get('memory', 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError('Invalid detail %r' % (detail,))
+        if tid not in tids:
+            raise ValueError('Testcase %s is not of problem %s' %
+                             (tid, submission.problem_id))
+        if verdict not in verdicts:
+            raise ValueError('Invalid verdict %s' % verdict)
+        submission_details.append(SubmissionDetail(
+            tid_id=tid, sid_id=submission.pk, cpu=cpu, memory=memory,
+            verdict=verdict))
+    if len(set(detail.tid_id for detail in submission_details)) != \
+            len(submission_details):
+        raise ValueError('Duplicate testcases')
+    return submission_details
+
+
+def finish_submission(task, status, error_msg=None, details=None):
+    """Save the result of the submission of a task and drop the task. The
+    given SubmissionDetail replace those of the submission."""
+    submission = task.submission
+    submission.status = status
+    if error_msg is not None:
+        submission.error_msg = error_msg
+    with transaction.atomic():
+        task.delete()
+        if details is not None:
+            # saved before the submission so that contest results see them
+            SubmissionDetail.objects.filter(sid=submission.pk).delete()
+            SubmissionDetail.objects.bulk_create(details)
+        submission.save()
+        # last, so that the counter row is locked only until the commit
+        if status == Submission.ACCEPTED:
+            add_problem_counts(submission.problem_id, ac_count=1)
+
+
+def return_task(task):
+    """Put the submission of a task whose lease is released back to the
+    queue, or give it up as a judge error after too many attempts."""
+    submission = task.submission
+    if submission.status not in PENDING_STATUSES:
+        # judged without completing the task
+        task.delete()
+    elif task.attempts >= get_max_attempts():
+        finish_submission(
+            task, Submission.JUDGE_ERROR,
+            'Judging did not finish in %d attempts' % task.attempts)
+    else:
+        set_pending_status(submission, Submission.WAIT)
+
+
+def requeue_expired_tasks():
+    """Put the submissions of expired leases back to the queue, or give
+    them up as judge errors after too many attempts. Return the number of
+    expired leases."""
+    tasks = JudgeTask.objects.filter(
+        lease_expire__lt=datetime.now()).select_related('submission')
+    expired = 0
+    for task in tasks:
+        # the lease may be renewed, completed or requeued meanwhile
+        requeued = JudgeTask.objects.filter(
+            pk=task.pk, lease=task.lease,
+            lease_expire__lt=datetime.now()).update(
+            judge='', lease='', lease_expire=None)
+        if not requeued:
+            continue
+        expired += 1
+        logger.warning('Judge %s lost the lease of submission %s' %
+                       (task.judge, task.submission_id))
+        return_task(task)
+    return expired
+
+
+def claim_submissions(judge, limit, lease_time=None):
+    """Lease up to limit waiting submissions to a judge, those of higher
+    priority first. Return the claimed tasks, all under one lease."""
+    if lease_time is None:
+        lease_time = get_lease_time()
+    requeue_expired_tasks()
+    lease = uuid.uuid4().hex
+    lease_expire = datetime.now() + timedelta(seconds=lease_time)
+    # spare candidates for those other judges claim meanwhile
+    candidates = list(JudgeTask.objects.filter(lease='').order_by(
+        '-priority', 'id').values_list('id', flat=True)[:limit * 2])
+    claimed = 0
+    for task_id in candidates:
+        if claimed >= limit:
+            break
+        claimed += JudgeTask.objects.filter(id=task_id, lease='').update(
+            judge=judge, lease=lease, lease_expire=lease_expire,
+            attempts=F('attempts') + 1)
+    tasks = []
+    for task in JudgeTask.objects.filter(lease=lease).select_related(
+            'submission').order_by('-priority', 'id'):
+        if task.submission.status in PENDING_STATUSES:
+            set_pending_status(task.submission, Submission.JUDGING)
+            tasks.append(task)
+        else:
+            # judged without going through the queue
+            task.delete()
+    if tasks:
+        logger.info('Judge %s claimed submissions %s' %
+                    (judge, ', '.join(str(t.submission_id) for t in tasks)))
+    return tasks
+
+
+def renew_lease(lease, sids, lease_time=None):
+    """Extend the lease of the given submissions. Return the ids of those
+    still held under the lease."""
+    if lease_time is None:
+        lease_time = get_lease_time()
+    tasks = JudgeTask.objects.filter(lease=lease, submission__in=sids)
+    tasks.update(lease_expire=datetime.now() + timedelta(seconds=lease_time))
+    return list(tasks.values_list('submission', flat=True))
+
+
+def complete_submission(lease, sid, status=None, error_msg=None,
+                        details=None):
+    """Remove a submission held under the lease from the queue and save its
+    result, along with the results of its testcases if given as for
+    get_submission_details. Without a result a submission still pending is
+    put back to the queue. Return False if the lease of it is lost. Raise
+    ValueError if the result is invalid."""
+    if status is not None and status not in JUDGE_RESULTS:
+        raise ValueError('Invalid status %s' % status)
+    if details is not None and status is None:
+        raise ValueError('Details are given without a status')
+    try:
+        task = JudgeTask.objects.select_related('submission').get(
+            lease=lease, submission=sid)
+    except JudgeTask.DoesNotExist:
+        return False
+    if details is not None:
+        details = get_submission_details(task.submission, details)
+    with transaction.atomic():
+        # release the lease first so that it can't be requeued meanwhile
+        released = JudgeTask.objects.filter(pk=task.pk, lease=lease).update(
+            judge='', lease='', lease_expire=None)
+        if not released:
+            return False
+        if status is None:
+            return_task(task)
+        else:
+            finish_submission(task, status, error_msg, details)
+    logger.info('Judge %s completed submission %s' % (task.judge, sid))
+    return True
+
+
+def get_task_data(task):
+    """Return what a judge needs to judge the submission of a task."""
+    submission = task.submission
+    try:
+        code = read_code(submission)
+    except IOError:
+        logger.warning('Code of submission %s not found' % submission.id)
+        code = None
+    return {
+        'sid': submission.id,
+        'pid': submission.problem_id,
+        'language': submission.language,
+        'code': code,
+        'priority': task.priority,
+        'attempts': task.attempts,
+        'lease': task.lease,
+        'lease_expire': task.lease_expire.isoformat(),
+    }
@@ -0,0 +1,44 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from problem.problem_info import fold_problem_counters
+from problem.problem_info import reconcile_all_problem_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute ac_count and total_submission of every problem from ' \
+        'its submissions batch by batch, e.g. for existing data or after ' \
+        'verdicts are written without going through Django'
+    option_list = BaseCommand.option_list + (
+        make_option('--fold', action='store_true', dest='fold',
+                    default=False,
+                    help='Only fold the counter shards into their problems'),
+    )
+
+    def handle(self, *args, **options):
+        if options['fold']:
+            changed = fold_problem_counters()
+            self.stdout.write('%d problems folded' % changed)
+            return
+        changed = reconcile_all_problem_counters()
+        self.stdout.write('%d problems corrected' % changed)
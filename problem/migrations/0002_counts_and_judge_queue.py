@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JudgeTask',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('priority', models.IntegerField(default=1)),
+                ('judge', models.CharField(max_length=50, blank=True)),
+                ('lease', models.CharField(max_length=32, blank=True)),
+                ('lease_expire', models.DateTimeField(db_index=True, null=True, blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('submission', models.OneToOneField(to='problem.Submission')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ProblemCounterShard',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('shard', models.IntegerField()),
+                ('ac_count', models.IntegerField(default=0)),
+                ('total_submission', models.IntegerField(default=0)),
+                ('problem', models.ForeignKey(to='problem.Problem')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='SubmissionCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('facet', models.CharField(max_length=7, choices=[(b'all', b'All'), (b'problem', b'Problem'), (b'user', b'User'), (b'contest', b'Contest')])),
+                ('key', models.CharField(max_length=15, blank=True)),
+                ('status', models.CharField(max_length=25, choices=[(b'WAIT', b'Being Judged'), (b'JUDGING', b'Judging'), (b'AC', b'All Accepted'), (b'NA', b'Not Accepted'), (b'CE', b'Compile Error'), (b'RF', b'Restricted Function'), (b'JE', b'Judge Error')])),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='submissioncount',
+            unique_together=set([('facet', 'key', 'status')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='problemcountershard',
+            unique_together=set([('problem', 'shard')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='judgetask',
+            index_together=set([('lease', 'priority')]),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='testcase_count',
+            field=models.IntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='code_hash',
+            field=models.CharField(default=b'', max_length=64, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='counted_status',
+            field=models.CharField(default=b'', max_length=25, db_index=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='status_version',
+            field=models.IntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='status',
+            field=models.CharField(default=b'WAIT', max_length=25, db_index=True, choices=[(b'WAIT', b'Being Judged'), (b'JUDGING', b'Judging'), (b'AC', b'All Accepted'), (b'NA', b'Not Accepted'), (b'CE', b'Compile Error'), (b'RF', b'Restricted Function'), (b'JE', b'Judge Error')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='submission',
+            index_together=set([('problem', 'submit_time'), ('problem', 'status'), ('user', 'status'), ('user', 'problem', 'submit_time')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='submissiondetail',
+            index_together=set([('sid', 'verdict')]),
+        ),
+    ]
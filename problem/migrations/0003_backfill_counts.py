@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def backfill_counts(apps, schema_editor):
+    """Fill the columns added by 0002 for existing data. The submission
+    counts themselves are rebuilt by the rebuild_submission_counts
+    command."""
+    Problem = apps.get_model('problem', 'Problem')
+    Testcase = apps.get_model('problem', 'Testcase')
+    Submission = apps.get_model('problem', 'Submission')
+    counts = Testcase.objects.order_by().values('problem').annotate(
+        count=models.Count('id'))
+    for row in counts:
+        Problem.objects.filter(pk=row['problem']).update(
+            testcase_count=row['count'])
+    Submission.objects.update(counted_status=models.F('status'))
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0002_counts_and_judge_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counts, noop),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def backfill_scored_status(apps, schema_editor):
+    """contest.0003_backfill_results computes the existing results from
+    the current statuses."""
+    Submission = apps.get_model('problem', 'Submission')
+    Submission.objects.update(scored_status=models.F('status'))
+
+
+def restore_index_together(apps, schema_editor):
+    """Django 1.7 adds a column on SQLite by copying the table, which
+    drops the indexes of index_together, so they are created again."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Submission = apps.get_model('problem', 'Submission')
+    schema_editor.alter_index_together(
+        Submission, [], Submission._meta.index_together)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0003_backfill_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='scored_status',
+            field=models.CharField(default=b'', max_length=25, db_index=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(restore_index_together, noop),
+        migrations.RunPython(backfill_scored_status, noop),
+    ]
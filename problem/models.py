@@ -94,11 +94,29 @@ class Problem(models.Model):
         max_length=11, choices=LANGUAGE_CHOICE, default=CPP)
     ac_count = models.IntegerField(default=0)
     total_submission = models.IntegerField(default=0)
+    # maintained by problem.signals
+    testcase_count = models.IntegerField(default=0)
 
     def __unicode__(self):
         return '%d - %s' % (self.id, self.pname)
 
 
+class ProblemCounterShard(models.Model):
+    """Part of the ac_count/total_submission increments of a problem not yet
+    folded into it. Concurrent submissions to a problem update different
+    shards instead of waiting for one another on the problem row."""
+    problem = models.ForeignKey(Problem)
+    shard = models.IntegerField()
+    ac_count = models.IntegerField(default=0)
+    total_submission = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('problem', 'shard'),)
+
+    def __unicode__(self):
+        return '%d shard %d' % (self.problem_id, self.shard)
+
+
 class Testcase(models.Model):
     problem = models.ForeignKey(Problem)
     description = models.TextField(blank=True)
@@ -141,11 +159,37 @@ class Submission(models.Model):
     team = models.ForeignKey(Team, blank=True, null=True)
     submit_time = models.DateTimeField(default=datetime.now)
     error_msg = models.TextField(blank=True)
+    # indexed alone for the waiting submissions of the admission check
     status = models.CharField(
-        max_length=25, choices=STATUS_CHOICE, default=WAIT)
+        max_length=25, choices=STATUS_CHOICE, default=WAIT, db_index=True)
+    # the status the submission is counted under in SubmissionCount, behind
+    # status until a verdict the judge writes directly is reconciled
+    counted_status = models.CharField(
+        max_length=25, blank=True, default='', db_index=True)
+    # the status the stored contest results were last computed from,
+    # behind status until a verdict the judge writes directly is synced
+    scored_status = models.CharField(
+        max_length=25, blank=True, default='', db_index=True)
     language = models.CharField(
         max_length=5, choices=LANGUAGE_CHOICE, default=C)
     other_judge_sid = models.IntegerField(blank=True, null=True)
+    # bumped on every rejudge, rendered status rows are cached per version
+    status_version = models.IntegerField(default=0)
+    # sha256 of the code in utils.code_store, blank for legacy code files
+    code_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        # shapes of the hot queries, checked by problem.test_query_plan
+        index_together = (
+            # contest submissions, rejudging a contest problem
+            ('problem', 'submit_time'),
+            # contest results of a contestant, visibility rules
+            ('user', 'problem', 'submit_time'),
+            # user statistics, pending submissions of a user
+            ('user', 'status'),
+            # status filters by problem and status
+            ('problem', 'status'),
+        )
 
     def __unicode__(self):
         return str(self.id)
@@ -176,6 +220,65 @@ class SubmissionDetail(models.Model):
 
     class Meta:
         unique_together = (('tid', 'sid'),)
+        # passed testcases of submissions
+        index_together = (('sid', 'verdict'),)
 
     def __unicode__(self):
         return 'sid %d, tid %d' % (self.sid.id, self.tid.id)
+
+
+class SubmissionCount(models.Model):
+    """Number of submissions of each status, over all submissions and
+    per problem, user and contest. Maintained by problem.signals and
+    reconciled with the verdicts the judge writes by
+    problem.submission_count.sync_submission_counts."""
+    ALL = 'all'
+    PROBLEM = 'problem'
+    USER = 'user'
+    CONTEST = 'contest'
+    FACET_CHOICE = (
+        (ALL, 'All'),
+        (PROBLEM, 'Problem'),
+        (USER, 'User'),
+        (CONTEST, 'Contest'),
+    )
+
+    facet = models.CharField(max_length=7, choices=FACET_CHOICE)
+    # problem id, username or contest id, or for all submissions one of
+    # the shards spreading the updates over several rows
+    key = models.CharField(max_length=15, blank=True)
+    status = models.CharField(
+        max_length=25, choices=Submission.STATUS_CHOICE)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('facet', 'key', 'status'),)
+
+    def __unicode__(self):
+        return '%s %s %s: %d' % (self.facet, self.key, self.status, self.count)
+
+
+class JudgeTask(models.Model):
+    """A submission in the judge queue. Judges claim tasks with time-limited
+    leases through problem.judge_queue and the tasks of expired leases are
+    claimed again."""
+    # claimed in order of priority, then of arrival
+    REJUDGE = 0
+    NORMAL = 1
+    CONTEST = 2
+
+    submission = models.OneToOneField(Submission)
+    priority = models.IntegerField(default=NORMAL)
+    # name of the judge holding the lease, blank while waiting
+    judge = models.CharField(max_length=50, blank=True)
+    # token of the current lease, blank while waiting
+    lease = models.CharField(max_length=32, blank=True)
+    lease_expire = models.DateTimeField(blank=True, null=True, db_index=True)
+    # number of leases taken on the task
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        index_together = (('lease', 'priority'),)
+
+    def __unicode__(self):
+        return '%d (priority %d)' % (self.submission_id, self.priority)
@@ -1,12 +1,19 @@
 import os.path
+import random
 from utils import config_info
-from problem.models import Problem, Testcase
-from django.db.models import Q
+from problem.models import Problem, Testcase, Submission, SubmissionDetail, \
+    ProblemCounterShard
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F, Count, Sum
 from datetime import datetime
 
 SPECIAL_PATH = config_info.get_config('path', 'special_judge_path')
 PARTIAL_PATH = config_info.get_config('path', 'partial_judge_path')
 TESTCASE_PATH = config_info.get_config('path', 'testcase_path')
+# submission counters of a problem
+COUNTER_FIELDS = ('ac_count', 'total_submission')
+# problems whose counters are reconciled per transaction
+COUNTER_BATCH_SIZE = 100
 
 
 def get_testcase(problem):
@@ -64,3 +71,172 @@ def check_in_contest(problem):
     contest = problem.contest_set.filter(
         Q(start_time__lt=datetime.now()) & Q(end_time__gt=datetime.now()))
     return len(contest) > 0
+
+
+def add_testcase_count(problem_id, delta):
+    Problem.objects.filter(pk=problem_id).update(
+        testcase_count=F('testcase_count') + delta)
+
+
+def get_testcase_counts_map(submission_ids):
+    """Return a dict mapping each of the given submission ids to its
+    (passed testcases, total testcases) counted from its details with
+    one query. Submissions without details are left out."""
+    counts = {}
+    details = SubmissionDetail.objects.filter(
+        sid__in=submission_ids
+    ).values('sid', 'verdict').annotate(count=Count('id')).order_by()
+    for detail in details:
+        passed, total = counts.get(detail['sid'], (0, 0))
+        if detail['verdict'] == SubmissionDetail.AC:
+            passed += detail['count']
+        counts[detail['sid']] = (passed, total + detail['count'])
+    return counts
+
+
+def refresh_problem_testcases():
+    """Recompute the testcase count of every problem.
+    Return the number of problems changed."""
+    counts = Testcase.objects.values('problem').annotate(count=Count('id'))
+    counts = dict((count['problem'], count['count']) for count in counts)
+    changed = 0
+    for pid, testcase_count in Problem.objects.values_list(
+            'id', 'testcase_count'):
+        if counts.get(pid, 0) != testcase_count:
+            Problem.objects.filter(pk=pid).update(
+                testcase_count=counts.get(pid, 0))
+            changed += 1
+    return changed
+
+
+def get_counter_shards():
+    """Return the number of counter shards of a problem set in nthuoj.cfg,
+    0 (update the problem row itself) by default."""
+    try:
+        return max(int(config_info.get_config('problem_counter', 'shards')), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_counter_updates(deltas):
+    return dict((field, F(field) + delta)
+                for field, delta in deltas.items() if delta)
+
+
+def add_problem_counts(problem_id, **deltas):
+    """Add to the submission counters of a problem, e.g.
+    add_problem_counts(pid, total_submission=1), with an UPDATE of only
+    those columns. If counter shards are set in nthuoj.cfg, a random shard
+    of the problem is updated instead and folded back on read."""
+    updates = get_counter_updates(deltas)
+    if not updates:
+        return
+    shards = get_counter_shards()
+    if not shards:
+        Problem.objects.filter(pk=problem_id).update(**updates)
+        return
+    shard = random.randrange(shards)
+    counters = ProblemCounterShard.objects.filter(
+        problem=problem_id, shard=shard)
+    if counters.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            ProblemCounterShard.objects.create(
+                problem_id=problem_id, shard=shard, **deltas)
+        return
+    except IntegrityError:
+        # created by another submission meanwhile
+        pass
+    counters.update(**updates)
+
+
+def get_shard_count_map(problem_ids):
+    """Return a dict mapping problem id to the summed counters of its
+    shards. Problems without shards are left out."""
+    shards = ProblemCounterShard.objects.filter(
+        problem__in=problem_ids).values('problem').annotate(
+        *[Sum(field) for field in COUNTER_FIELDS])
+    return dict((shard['problem'], dict(
+        (field, shard[field + '__sum']) for field in COUNTER_FIELDS))
+        for shard in shards)
+
+
+def add_shard_counts(problems):
+    """Add the counts of unfolded shards to the counters of the given
+    problems, in one query. Return the problems as a list."""
+    problems = list(problems)
+    shards = get_shard_count_map([problem.id for problem in problems])
+    for problem in problems:
+        for field, count in shards.get(problem.id, {}).items():
+            setattr(problem, field, getattr(problem, field) + count)
+    return problems
+
+
+def fold_problem_counters():
+    """Move the counts of all shards into their problems.
+    Return the number of problems changed."""
+    problem_ids = list(ProblemCounterShard.objects.values_list(
+        'problem', flat=True).distinct())
+    for problem_id in problem_ids:
+        with transaction.atomic():
+            shards = list(ProblemCounterShard.objects.select_for_update(
+            ).filter(problem=problem_id))
+            deltas = dict((field, sum(getattr(shard, field)
+                                      for shard in shards))
+                          for field in COUNTER_FIELDS)
+            ProblemCounterShard.objects.filter(
+                id__in=[shard.id for shard in shards]).delete()
+            updates = get_counter_updates(deltas)
+            if updates:
+                Problem.objects.filter(pk=problem_id).update(**updates)
+    return len(problem_ids)
+
+
+def get_problem_count_map(submissions):
+    """Return a dict mapping problem id to its number of submissions in
+    the given querySet of submissions."""
+    counts = submissions.values('problem').annotate(count=Count('id'))
+    return dict((count['problem'], count['count']) for count in counts)
+
+
+def reconcile_problem_counters(problem_ids):
+    """Recompute ac_count and total_submission of the given problems from
+    their submissions and fold their shards away.
+    Return the number of problems whose counts were wrong."""
+    changed = 0
+    with transaction.atomic():
+        # submissions counted meanwhile wait for the locked rows
+        problems = list(Problem.objects.select_for_update().filter(
+            id__in=problem_ids).values_list('id', *COUNTER_FIELDS))
+        shards = get_shard_count_map(problem_ids)
+        ProblemCounterShard.objects.filter(problem__in=problem_ids).delete()
+        submissions = Submission.objects.filter(problem__in=problem_ids)
+        totals = get_problem_count_map(submissions)
+        accepted = get_problem_count_map(
+            submissions.filter(status=Submission.ACCEPTED))
+        for pid, ac_count, total_submission in problems:
+            counts = (accepted.get(pid, 0), totals.get(pid, 0))
+            if counts != (ac_count, total_submission):
+                Problem.objects.filter(pk=pid).update(
+                    ac_count=counts[0], total_submission=counts[1])
+            shard = shards.get(pid, {})
+            if counts != (ac_count + shard.get('ac_count', 0),
+                          total_submission + shard.get('total_submission', 0)):
+                changed += 1
+    return changed
+
+
+def reconcile_all_problem_counters():
+    """Reconcile the submission counters of every problem batch by batch.
+    Return the number of problems changed."""
+    changed = 0
+    last_id = 0
+    while True:
+        problem_ids = list(Problem.objects.filter(
+            id__gt=last_id).order_by('id').values_list(
+            'id', flat=True)[:COUNTER_BATCH_SIZE])
+        if not problem_ids:
+            return changed
+        changed += reconcile_problem_counters(problem_ids)
+        last_id = problem_ids[-1]
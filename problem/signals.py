@@ -0,0 +1,82 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from django.db.models.signals import post_init, pre_save, post_save, \
+    post_delete
+from django.dispatch import receiver
+
+from problem.models import Submission
+from problem.models import Testcase
+from problem.judge_queue import enqueue_submission
+from problem.judge_queue import is_judge_queue_enabled
+from problem.problem_info import add_testcase_count
+from problem.submission_count import count_submission
+from problem.submission_count import get_counted_fields
+
+# keep the testcase counts of problems
+# and the submission counts of each status up to date,
+# and put the submissions to judge into the judge queue if it is used
+
+
+@receiver(post_save, sender=Testcase)
+def testcase_saved(sender, instance, created, **kwargs):
+    if created:
+        add_testcase_count(instance.problem_id, 1)
+
+
+@receiver(post_delete, sender=Testcase)
+def testcase_deleted(sender, instance, **kwargs):
+    add_testcase_count(instance.problem_id, -1)
+
+
+@receiver(post_init, sender=Submission)
+def submission_loaded(sender, instance, **kwargs):
+    # the fields the submission is counted by in the database
+    instance._counted_fields = \
+        get_counted_fields(instance) if instance.pk else None
+    instance._loaded_status = \
+        instance.__dict__.get('status') if instance.pk else None
+
+
+@receiver(pre_save, sender=Submission)
+def submission_saving(sender, instance, **kwargs):
+    # a status saved through Django is counted along
+    if 'status' in instance.__dict__:
+        instance.counted_status = instance.status
+
+
+@receiver(post_save, sender=Submission)
+def submission_saved(sender, instance, created, **kwargs):
+    old_fields = None if created else instance._counted_fields
+    new_fields = get_counted_fields(instance)
+    # deferred fields are not saved and leave the counts as they are
+    if created or old_fields is not None:
+        count_submission(old_fields, new_fields)
+    instance._counted_fields = new_fields
+    # new and rejudged submissions wait for judging
+    loaded_status = instance._loaded_status
+    if instance.status == Submission.WAIT and is_judge_queue_enabled() and \
+            (created or loaded_status not in (None, Submission.WAIT)):
+        enqueue_submission(instance, rejudged=not created)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, **kwargs):
+    count_submission(instance._counted_fields, None)
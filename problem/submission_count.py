@@ -0,0 +1,235 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+import random
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Sum
+
+from contest.models import Contest
+from contest.models import Contestant
+from problem.models import Submission
+from problem.models import SubmissionCount
+from utils.log_info import get_logger
+
+logger = get_logger()
+
+# submission fields the facets other than all and contest are keyed by
+FACET_FIELDS = (
+    (SubmissionCount.PROBLEM, 'problem'),
+    (SubmissionCount.USER, 'user'),
+)
+# submission fields deciding under which counts it is
+COUNTED_FIELDS = ('counted_status', 'problem_id', 'user_id', 'submit_time')
+# rows the counts of all submissions are spread over, so that concurrent
+# submissions don't all wait for the lock of a single row
+ALL_COUNT_SHARDS = 16
+# statuses the judge moves submissions from without going through Django
+PENDING_STATUSES = (Submission.WAIT, Submission.JUDGING)
+# seconds between reconciling the counts with the verdicts of the judge
+SUBMISSION_COUNT_SYNC_INTERVAL = 5
+SUBMISSION_COUNT_SYNC_KEY = 'submission_count_sync'
+
+
+def get_submission_contests(submission):
+    """Return the ids of the contests a submission is counted in, i.e. the
+    contests having its problem whose contestants, owner or coowners
+    include its submitter, running at its submit time."""
+    user = submission.user_id
+    return set(Contest.objects.filter(
+        Q(contestant__user=user) | Q(owner=user) | Q(coowner=user),
+        problem=submission.problem_id,
+        start_time__lte=submission.submit_time,
+        end_time__gte=submission.submit_time
+    ).values_list('id', flat=True))
+
+
+def get_submission_keys(submission):
+    """Return the (facet, key) pairs a submission is counted under.
+    Only the sum of the shards of all submissions matters, so any of them
+    will do."""
+    shard = random.randrange(ALL_COUNT_SHARDS)
+    keys = [(SubmissionCount.ALL, unicode(shard))]
+    for facet, field in FACET_FIELDS:
+        keys.append((facet, unicode(getattr(submission, field + '_id'))))
+    for contest in get_submission_contests(submission):
+        keys.append((SubmissionCount.CONTEST, unicode(contest)))
+    return keys
+
+
+def add_submission_count(facet, key, status, delta):
+    counts = SubmissionCount.objects.filter(
+        facet=facet, key=key, status=status)
+    if counts.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            SubmissionCount.objects.create(
+                facet=facet, key=key, status=status, count=delta)
+        return
+    except IntegrityError:
+        # created by another submission meanwhile
+        pass
+    counts.update(count=F('count') + delta)
+
+
+def get_counted_fields(submission):
+    """Return the fields a submission is counted by, None if some of them
+    are deferred."""
+    fields = {}
+    for field in COUNTED_FIELDS:
+        if field not in submission.__dict__:
+            return None
+        fields[field] = submission.__dict__[field]
+    return fields
+
+
+def count_submission(old_fields, new_fields):
+    """Move a submission from the counts of its old counted fields to those
+    of its new ones, None standing for not being counted."""
+    if old_fields == new_fields:
+        return
+    with transaction.atomic():
+        for fields, delta in ((old_fields, -1), (new_fields, 1)):
+            if fields is None:
+                continue
+            fields = dict(fields)
+            status = fields.pop('counted_status')
+            for facet, key in get_submission_keys(Submission(**fields)):
+                add_submission_count(facet, key, status, delta)
+
+
+def get_submission_counts(facet, key=''):
+    """Return a dict mapping each status to its number of submissions
+    under the given facet and key. Statuses without any are left out."""
+    counts = SubmissionCount.objects.filter(facet=facet)
+    if facet != SubmissionCount.ALL:
+        counts = counts.filter(key=unicode(key))
+    counts = counts.order_by().values('status').annotate(total=Sum('count'))
+    return dict((row['status'], row['total'])
+                for row in counts if row['total'] > 0)
+
+
+def reconcile_submission(row):
+    """Move a submission the judge has written a verdict of to the counts
+    of it. Return False if it is reconciled or changed meanwhile."""
+    old_fields = dict((field, row[field]) for field in COUNTED_FIELDS)
+    new_fields = dict(old_fields, counted_status=row['status'])
+    with transaction.atomic():
+        changed = Submission.objects.filter(
+            pk=row['id'], status=row['status'],
+            counted_status=row['counted_status']).update(
+            counted_status=row['status'])
+        if not changed:
+            return False
+        count_submission(old_fields, new_fields)
+    return True
+
+
+def sync_submission_counts(force=False):
+    """Reconcile the counts with the statuses the judge writes without
+    going through Django, at most once every SUBMISSION_COUNT_SYNC_INTERVAL
+    seconds unless forced. Only submissions counted as pending can be
+    behind, so an indexed query over those finds them. Return the number
+    of submissions reconciled."""
+    if not force and not cache.add(SUBMISSION_COUNT_SYNC_KEY, True,
+                                   SUBMISSION_COUNT_SYNC_INTERVAL):
+        return 0
+    rows = Submission.objects.filter(
+        counted_status__in=PENDING_STATUSES
+    ).exclude(status=F('counted_status')).values(
+        'id', 'status', *COUNTED_FIELDS)
+    reconciled = 0
+    for row in rows:
+        if reconcile_submission(row):
+            reconciled += 1
+    if reconciled:
+        logger.info('%d submission counts reconciled' % reconciled)
+    return reconciled
+
+
+def get_contest_count_submissions(contest):
+    """Return the submissions counted in a contest, over the whole contest
+    regardless of its freeze time."""
+    users = Contestant.objects.filter(contest=contest).values('user')
+    return Submission.objects.filter(
+        Q(user__in=users) | Q(user=contest.owner_id) | Q(
+            user__in=contest.coowner.all()),
+        problem__in=contest.problem.all(),
+        submit_time__gte=contest.start_time,
+        submit_time__lte=contest.end_time)
+
+
+def get_status_count_rows(facet, submissions, field=None, key=''):
+    """Return unsaved counts of the given submissions per counted status
+    under the key, or per value of the field as key if one is given."""
+    if field is None:
+        groups = submissions.order_by().values('counted_status')
+    else:
+        groups = submissions.order_by().values(field, 'counted_status')
+    rows = []
+    for group in groups.annotate(count=Count('id')):
+        if field is not None:
+            key = unicode(group[field])
+        rows.append(SubmissionCount(
+            facet=facet, key=key, status=group['counted_status'],
+            count=group['count']))
+    return rows
+
+
+def rebuild_contest_counts(contest):
+    """Recount the submissions of a contest, e.g. after its problems,
+    contestants or time change."""
+    rows = get_status_count_rows(
+        SubmissionCount.CONTEST, get_contest_count_submissions(contest),
+        key=unicode(contest.id))
+    with transaction.atomic():
+        delete_contest_counts(contest)
+        SubmissionCount.objects.bulk_create(rows)
+
+
+def delete_contest_counts(contest):
+    SubmissionCount.objects.filter(
+        facet=SubmissionCount.CONTEST, key=unicode(contest.id)).delete()
+
+
+def rebuild_submission_counts():
+    """Recount all the submissions. Return the number of counts stored."""
+    submissions = Submission.objects.all()
+    with transaction.atomic():
+        submissions.exclude(counted_status=F('status')).update(
+            counted_status=F('status'))
+        rows = get_status_count_rows(SubmissionCount.ALL, submissions,
+                                     key=u'0')
+        for facet, field in FACET_FIELDS:
+            rows += get_status_count_rows(facet, submissions, field)
+        for contest in Contest.objects.all():
+            rows += get_status_count_rows(
+                SubmissionCount.CONTEST,
+                get_contest_count_submissions(contest),
+                key=unicode(contest.id))
+        SubmissionCount.objects.all().delete()
+        SubmissionCount.objects.bulk_create(rows)
+    logger.info('Submission counts rebuilt!')
+    return len(rows)
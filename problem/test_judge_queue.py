@@ -0,0 +1,275 @@
+import json
+from datetime import datetime, timedelta
+
+from django.core.urlresolvers import reverse
+from django.test import Client
+
+from problem import judge_queue
+from problem.models import JudgeTask, Problem, Submission, SubmissionDetail
+from problem.problem_info import add_shard_counts
+from problem.submission_count import get_submission_counts
+from problem.models import SubmissionCount
+from users.forms import CodeSubmitForm
+from utils import code_store
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Basic
+from utils.rejudge import rejudge_submission
+from utils.test_helper import *
+
+TOKEN = 'judge-token'
+
+
+class FakeJudge(object):
+    """An in-process judge worker using the judge queue API."""
+
+    def __init__(self, name, token=TOKEN):
+        self.name = name
+        self.client = Client()
+        self.headers = {'HTTP_X_JUDGE_TOKEN': token}
+
+    def post(self, name, data):
+        response = self.client.post(reverse('problem:' + name), data,
+                                    **self.headers)
+        if response['Content-Type'] == 'application/json':
+            response.data = json.loads(response.content)
+        return response
+
+    def claim(self, limit=1):
+        return self.post('judge_claim', {'judge': self.name, 'limit': limit})
+
+    def renew(self, lease, sids):
+        return self.post('judge_renew', {'lease': lease, 'sid': sids})
+
+    def complete(self, lease, sid, status=None, details=None):
+        data = {'lease': lease, 'sid': sid}
+        if status:
+            data['status'] = status
+        if details is not None:
+            data['details'] = json.dumps(details)
+        return self.post('judge_complete', data)
+
+    def judge(self, limit=1, status=Submission.ACCEPTED):
+        """Claim and judge submissions, return their ids."""
+        sids = []
+        for task in self.claim(limit).data['submissions']:
+            self.complete(task['lease'], task['sid'], status)
+            sids.append(task['sid'])
+        return sids
+
+
+class Tester_Judge_queue(NTHUOJ_TestCase_Basic):
+    """ test the judge queue and its API """
+
+    def setUp(self):
+        super(Tester_Judge_queue, self).setUp()
+        self.PROBLEM = create_problem(self.ADMIN_USER, visible=True)
+        self.get_judge_token = judge_queue.get_judge_token
+        judge_queue.get_judge_token = lambda: TOKEN
+        self.CODE_PATH = code_store.CODE_PATH
+        code_store.CODE_PATH = TEST_PATH
+
+    def tearDown(self):
+        judge_queue.get_judge_token = self.get_judge_token
+        code_store.CODE_PATH = self.CODE_PATH
+        super(Tester_Judge_queue, self).tearDown()
+
+    def submit(self, user=None, problem=None, code='int main(){}'):
+        form = CodeSubmitForm(user=user or self.NORMAL_USER)
+        form.cleaned_data = {'pid': (problem or self.PROBLEM).pk,
+                             'code': code, 'language': Submission.C}
+        form.submit()
+        return Submission.objects.order_by('-id')[0]
+
+    def expire_leases(self):
+        JudgeTask.objects.exclude(lease='').update(
+            lease_expire=datetime.now() - timedelta(seconds=1))
+
+    def test_01_token(self):
+        # 1.the API is refused without the right token
+        # Expectation: error 403
+        self.submit()
+        for token in ['', 'wrong']:
+            response = FakeJudge('judge', token).claim()
+            self.assertEqual(response.status_code, 403)
+        # 2.the API is off while no token is set
+        judge_queue.get_judge_token = lambda: ''
+        response = FakeJudge('judge', '').claim()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(JudgeTask.objects.exclude(lease='').count(), 0)
+
+    def test_02_claim(self):
+        submission = self.submit(code='int main(){return 1;}')
+        # 1.a submission is enqueued once and claimed with its code
+        judge = FakeJudge('judge')
+        response = judge.claim(limit=5)
+        self.assertEqual(response.status_code, 200)
+        tasks = response.data['submissions']
+        self.assertEqual([task['sid'] for task in tasks], [submission.pk])
+        self.assertEqual(tasks[0]['code'], 'int main(){return 1;}')
+        self.assertEqual(tasks[0]['attempts'], 1)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.JUDGING)
+        counts = get_submission_counts(SubmissionCount.ALL)
+        self.assertEqual(counts, {Submission.JUDGING: 1})
+        # 2.a claimed submission is not claimed again
+        self.assertEqual(FakeJudge('other').claim().data['submissions'], [])
+        # 3.the result is saved and the submission leaves the queue
+        response = judge.complete(tasks[0]['lease'], submission.pk,
+                                  Submission.ACCEPTED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.ACCEPTED)
+        self.assertFalse(JudgeTask.objects.exists())
+        counts = get_submission_counts(SubmissionCount.ALL)
+        self.assertEqual(counts, {Submission.ACCEPTED: 1})
+        # 4.invalid results are refused
+        # Expectation: error 400
+        submission = self.submit()
+        task = judge.claim().data['submissions'][0]
+        response = judge.complete(task['lease'], submission.pk, 'WAIT')
+        self.assertEqual(response.status_code, 400)
+
+    def test_03_judges_share_queue(self):
+        submissions = [self.submit() for i in xrange(10)]
+        # 1.judges take turns to claim without overlapping
+        judges = [FakeJudge('judge%d' % i) for i in xrange(3)]
+        judged = []
+        while len(judged) < len(submissions):
+            for judge in judges:
+                judged.extend(judge.judge(limit=2))
+        self.assertEqual(sorted(judged),
+                         sorted(submission.pk for submission in submissions))
+        self.assertEqual(
+            Submission.objects.filter(status=Submission.ACCEPTED).count(), 10)
+
+    def test_04_priority(self):
+        normal = self.submit()
+        # a submission to a running contest comes before earlier ones
+        contest = create_contest(self.ADMIN_USER, contestants=[self.NORMAL_USER],
+                                 problems=[self.PROBLEM])
+        in_contest = self.submit()
+        # a rejudged submission comes after new ones
+        judged = create_submission(self.PROBLEM, self.NORMAL_USER,
+                                   Submission.ACCEPTED)
+        rejudge_submission(judged)
+        self.submit(user=self.JUDGE_USER)
+        later = Submission.objects.order_by('-id')[0]
+        sids = [task['sid'] for task in
+                FakeJudge('judge').claim(limit=10).data['submissions']]
+        self.assertEqual(sids, [in_contest.pk, normal.pk, later.pk, judged.pk])
+
+    def test_05_expired_lease(self):
+        submission = self.submit()
+        lost = FakeJudge('lost')
+        lost_task = lost.claim().data['submissions'][0]
+        # 1.a renewed lease does not expire
+        response = lost.renew(lost_task['lease'], [submission.pk])
+        self.assertEqual(response.data['renewed'], [submission.pk])
+        self.assertEqual(FakeJudge('other').claim().data['submissions'], [])
+        # 2.an expired lease is requeued and claimed by another judge
+        self.expire_leases()
+        judge = FakeJudge('judge')
+        task = judge.claim().data['submissions'][0]
+        self.assertEqual(task['sid'], submission.pk)
+        self.assertEqual(task['attempts'], 2)
+        # 3.the judge losing the lease can't renew or complete it
+        # Expectation: error 409 on completing
+        response = lost.renew(lost_task['lease'], [submission.pk])
+        self.assertEqual(response.data['renewed'], [])
+        response = lost.complete(lost_task['lease'], submission.pk,
+                                 Submission.NOT_ACCEPTED)
+        self.assertEqual(response.status_code, 409)
+        judge.complete(task['lease'], submission.pk, Submission.ACCEPTED)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.ACCEPTED)
+
+    def test_06_max_attempts(self):
+        # 1.a submission no judge finishes ends as judge error
+        submission = self.submit()
+        judge = FakeJudge('judge')
+        for i in xrange(judge_queue.DEFAULT_MAX_ATTEMPTS):
+            self.assertEqual(len(judge.claim().data['submissions']), 1)
+            self.expire_leases()
+        self.assertEqual(judge.claim().data['submissions'], [])
+        submission = Submission.objects.get(pk=submission.pk)
+        self.assertEqual(submission.status, Submission.JUDGE_ERROR)
+        self.assertFalse(JudgeTask.objects.exists())
+
+    def test_07_judged_elsewhere(self):
+        # 1.submissions judged without the queue are dropped from it
+        submission = self.submit()
+        Submission.objects.filter(pk=submission.pk).update(
+            status=Submission.ACCEPTED)
+        self.assertEqual(FakeJudge('judge').claim().data['submissions'], [])
+        self.assertFalse(JudgeTask.objects.exists())
+        # 2.pending submissions before the queue can be enqueued
+        submission = self.submit()
+        JudgeTask.objects.all().delete()
+        self.assertEqual(judge_queue.fill_judge_queue(), 1)
+        self.assertEqual(FakeJudge('judge').judge(), [submission.pk])
+
+    def test_08_details(self):
+        testcases = [create_testcase(self.PROBLEM, local_files=False)
+                     for i in xrange(2)]
+        other = create_testcase(create_problem(self.ADMIN_USER),
+                                local_files=False)
+        submission = self.submit()
+        judge = FakeJudge('judge')
+        task = judge.claim().data['submissions'][0]
+        # 1.details of unknown testcases or verdicts are refused
+        # Expectation: error 400
+        for details in [[{'tid': other.pk, 'verdict': 'AC'}],
+                        [{'tid': testcases[0].pk, 'verdict': 'OK'}],
+                        [{'verdict': 'AC'}], 'AC']:
+            response = judge.complete(task['lease'], submission.pk,
+                                      Submission.ACCEPTED, details)
+            self.assertEqual(response.status_code, 400)
+        self.assertTrue(JudgeTask.objects.filter(lease=task['lease']))
+        # 2.the details are saved with the result, an AC is counted
+        details = [{'tid': testcase.pk, 'verdict': 'AC', 'cpu': 0.5,
+                    'memory': 1024} for testcase in testcases]
+        response = judge.complete(task['lease'], submission.pk,
+                                  Submission.ACCEPTED, details)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(SubmissionDetail.objects.filter(
+            sid=submission).values_list('tid', 'verdict', 'cpu', 'memory')),
+            set((testcase.pk, 'AC', 0.5, 1024) for testcase in testcases))
+        problem = add_shard_counts(
+            Problem.objects.filter(pk=self.PROBLEM.pk))[0]
+        self.assertEqual(problem.ac_count, 1)
+        # 3.rejudging takes the AC back
+        rejudge_submission(Submission.objects.get(pk=submission.pk))
+        problem = add_shard_counts(
+            Problem.objects.filter(pk=self.PROBLEM.pk))[0]
+        self.assertEqual(problem.ac_count, 0)
+
+    def test_09_no_token(self):
+        # 1.nothing is enqueued while no token is set
+        judge_queue.get_judge_token = lambda: ''
+        submission = self.submit()
+        self.assertFalse(JudgeTask.objects.exists())
+        # 2.and the pending submissions are once it is
+        judge_queue.get_judge_token = lambda: TOKEN
+        self.assertEqual(judge_queue.fill_judge_queue(), 1)
+        self.assertEqual(FakeJudge('judge').judge(), [submission.pk])
+
+    def test_10_returned(self):
+        # 1.a submission completed without a result is judged again
+        submission = self.submit()
+        judge = FakeJudge('judge')
+        task = judge.claim().data['submissions'][0]
+        response = judge.complete(task['lease'], submission.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.WAIT)
+        self.assertEqual(FakeJudge('other').judge(), [submission.pk])
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.ACCEPTED)
+        # 2.one judged without the queue is just dropped from it
+        submission = self.submit()
+        task = judge.claim().data['submissions'][0]
+        Submission.objects.filter(pk=submission.pk).update(
+            status=Submission.NOT_ACCEPTED)
+        judge.complete(task['lease'], submission.pk)
+        self.assertFalse(JudgeTask.objects.exists())
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status,
+                         Submission.NOT_ACCEPTED)
@@ -0,0 +1,112 @@
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from problem import problem_info
+from problem.models import Problem, ProblemCounterShard, Submission
+from problem.problem_info import add_problem_counts, add_shard_counts, \
+    fold_problem_counters
+from users.forms import CodeSubmitForm
+from utils import code_store
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Basic
+from utils.rejudge import rejudge_submission
+from utils.test_helper import *
+
+
+class Tester_Problem_counter(NTHUOJ_TestCase_Basic):
+    """ test submission counters of problems """
+
+    def setUp(self):
+        super(Tester_Problem_counter, self).setUp()
+        self.PROBLEM = create_problem(self.ADMIN_USER, visible=True)
+        self.get_counter_shards = problem_info.get_counter_shards
+        self.CODE_PATH = code_store.CODE_PATH
+        code_store.CODE_PATH = TEST_PATH
+
+    def tearDown(self):
+        problem_info.get_counter_shards = self.get_counter_shards
+        code_store.CODE_PATH = self.CODE_PATH
+        super(Tester_Problem_counter, self).tearDown()
+
+    def set_shards(self, shards):
+        problem_info.get_counter_shards = lambda: shards
+
+    def get_counts(self):
+        problem = add_shard_counts(
+            Problem.objects.filter(pk=self.PROBLEM.pk))[0]
+        return (problem.ac_count, problem.total_submission)
+
+    def submit(self):
+        form = CodeSubmitForm(user=self.NORMAL_USER)
+        form.cleaned_data = {'pid': self.PROBLEM.pk, 'code': 'int main(){}',
+                             'language': Submission.C}
+        form.submit()
+        return Submission.objects.filter(
+            problem=self.PROBLEM).order_by('-id')[0]
+
+    def test_01_field_scoped(self):
+        # 1.counters are updated in place without rewriting the problem
+        with CaptureQueriesContext(connection) as context:
+            add_problem_counts(self.PROBLEM.pk, total_submission=1)
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql'].lower()
+        self.assertIn('update', sql)
+        self.assertIn('total_submission', sql)
+        self.assertNotIn('description', sql)
+        self.assertEqual(self.get_counts(), (0, 1))
+
+    def test_02_submit_rejudge(self):
+        # 2.submitting counts a submission, rejudging an AC uncounts it
+        submission = self.submit()
+        self.submit()
+        self.assertEqual(self.get_counts(), (0, 2))
+        Problem.objects.filter(pk=self.PROBLEM.pk).update(ac_count=1)
+        submission.status = Submission.ACCEPTED
+        submission.save()
+        rejudge_submission(Submission.objects.get(pk=submission.pk))
+        self.assertEqual(self.get_counts(), (0, 2))
+
+    def test_03_shards(self):
+        # 3.sharded counts are folded back on read and by folding
+        self.set_shards(4)
+        for i in xrange(20):
+            add_problem_counts(self.PROBLEM.pk, total_submission=1)
+        add_problem_counts(self.PROBLEM.pk, ac_count=1, total_submission=1)
+        self.assertTrue(ProblemCounterShard.objects.count() <= 4)
+        problem = Problem.objects.get(pk=self.PROBLEM.pk)
+        self.assertEqual((problem.ac_count, problem.total_submission), (0, 0))
+        self.assertEqual(self.get_counts(), (1, 21))
+        self.assertEqual(fold_problem_counters(), 1)
+        self.assertFalse(ProblemCounterShard.objects.exists())
+        problem = Problem.objects.get(pk=self.PROBLEM.pk)
+        self.assertEqual((problem.ac_count, problem.total_submission),
+                         (1, 21))
+
+    def test_04_problem_list(self):
+        # 4.the problem list shows folded counts
+        self.set_shards(2)
+        add_problem_counts(self.PROBLEM.pk, ac_count=1, total_submission=4)
+        response = self.ADMIN_CLIENT.get(reverse('problem:problem'))
+        problem = [p for p in response.context['all_problem']
+                   if p.pk == self.PROBLEM.pk][0]
+        self.assertEqual(problem.pass_rate, '25.00')
+
+    def test_05_reconcile(self):
+        # 5.the reconcile command recounts from submissions
+        for status in [Submission.ACCEPTED, Submission.ACCEPTED,
+                       Submission.NOT_ACCEPTED]:
+            create_submission(self.PROBLEM, self.NORMAL_USER, status)
+        other = create_problem(self.ADMIN_USER)
+        create_submission(other, self.NORMAL_USER, Submission.ACCEPTED)
+        Problem.objects.filter(pk=self.PROBLEM.pk).update(
+            ac_count=5, total_submission=1)
+        self.set_shards(2)
+        add_problem_counts(self.PROBLEM.pk, total_submission=1)
+        call_command('reconcile_problem_counters',
+                     stdout=open(os.devnull, 'w'))
+        self.assertFalse(ProblemCounterShard.objects.exists())
+        problem = Problem.objects.get(pk=self.PROBLEM.pk)
+        self.assertEqual((problem.ac_count, problem.total_submission), (2, 3))
+        other = Problem.objects.get(pk=other.pk)
+        self.assertEqual((other.ac_count, other.total_submission), (1, 1))
@@ -0,0 +1,171 @@
+import re
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from contest.contest_info import get_contest_submissions
+from problem.models import Problem, Submission, SubmissionDetail
+from utils.test_helper import *
+
+SUBMISSION_TABLE = Submission._meta.db_table
+DETAIL_TABLE = SubmissionDetail._meta.db_table
+PRIMARY_KEY = 'PRIMARY'
+SQLITE_STEP = re.compile(
+    r'(?:SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS \w+)?'
+    r'(?: USING (?:COVERING )?INDEX (\w+)| USING INTEGER (PRIMARY) KEY)?')
+
+
+def get_table_accesses(queryset, table):
+    """Return the indexes each step of the query plan of a querySet reads
+    the table through, None for a step scanning the whole table.
+    Return None if the database can't explain the query."""
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    accesses = []
+    if connection.vendor == 'sqlite':
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        for row in cursor.fetchall():
+            step = SQLITE_STEP.match(row[-1])
+            if step and step.group(1) == table:
+                accesses.append(step.group(2) or step.group(3))
+    elif connection.vendor == 'mysql':
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor.fetchall():
+            step = dict(zip(columns, row))
+            if step['table'] == table:
+                accesses.append(step['key'])
+    else:
+        return None
+    return accesses
+
+
+def get_index_columns(table, index):
+    """Return the columns of an index of the table in index order."""
+    if index == PRIMARY_KEY:
+        return ['id']
+    cursor = connection.cursor()
+    if connection.vendor == 'sqlite':
+        cursor.execute('PRAGMA index_info(%s)' % connection.ops.quote_name(index))
+        # rows of (rank in index, rank in table, column)
+        return [row[2] for row in sorted(cursor.fetchall())]
+    cursor.execute('SHOW INDEX FROM %s WHERE Key_name = %%s'
+                   % connection.ops.quote_name(table), [index])
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return [row['Column_name']
+            for row in sorted(rows, key=lambda row: row['Seq_in_index'])]
+
+
+class Tester_Problem_query_plan(TestCase):
+    """ test that hot submission queries keep searching by the composite
+        indexes instead of scanning whole tables """
+
+    def setUp(self):
+        create_test_normal_user(10)
+        self.USERS = [get_test_normal_user(i) for i in xrange(10)]
+        self.PROBLEMS = [create_problem(self.USERS[0], visible=True)
+                         for i in xrange(10)]
+        testcase = create_testcase(self.PROBLEMS[0], local_files=False)
+        now = datetime.now()
+        submissions = []
+        for i in xrange(500):
+            submissions.append(Submission(
+                problem=self.PROBLEMS[i % 10], user=self.USERS[i / 50],
+                status=Submission.STATUS_CHOICE[i % 7][0],
+                submit_time=now - timedelta(minutes=i)))
+        Submission.objects.bulk_create(submissions)
+        SubmissionDetail.objects.bulk_create([
+            SubmissionDetail(sid=submission, tid=testcase,
+                             verdict=SubmissionDetail.VERDICT_CHOICE[i % 6][0])
+            for i, submission in enumerate(Submission.objects.all())])
+        self.START_TIME = now - timedelta(hours=2)
+        self.CONTEST = create_contest(
+            self.USERS[0], start_time=self.START_TIME,
+            contestants=self.USERS[1:4], problems=self.PROBLEMS[:3])
+
+    def assertSearchedBy(self, queryset, table, columns):
+        """Assert that the query reads the table only through indexes
+        leading with the given columns."""
+        accesses = get_table_accesses(queryset, table)
+        if accesses is None:
+            self.skipTest('no query plan for %s' % connection.vendor)
+        self.assertTrue(accesses, str(queryset.query))
+        for index in accesses:
+            self.assertIsNotNone(
+                index, 'full scan of %s: %s' % (table, queryset.query))
+            index_columns = get_index_columns(table, index)
+            self.assertEqual(index_columns[:len(columns)], columns,
+                             '%s %s: %s' % (index, index_columns, queryset.query))
+
+    def test_01_contest(self):
+        # 1.contest submissions and results
+        self.assertSearchedBy(
+            get_contest_submissions(self.CONTEST, Submission.objects.all()),
+            SUBMISSION_TABLE, ['problem_id', 'submit_time'])
+        self.assertSearchedBy(
+            Submission.objects.filter(
+                problem__in=self.PROBLEMS[:3],
+                submit_time__lte=self.CONTEST.end_time,
+                submit_time__gte=self.START_TIME,
+                user__in=self.USERS[1:4]
+            ).exclude(
+                status=Submission.JUDGE_ERROR
+            ).order_by('submit_time', 'id').values('id', 'user', 'problem'),
+            SUBMISSION_TABLE, ['user_id', 'problem_id', 'submit_time'])
+        details = SubmissionDetail.objects.filter(
+            sid__problem__in=self.PROBLEMS[:3],
+            sid__submit_time__gte=self.START_TIME,
+            sid__user__in=self.USERS[1:4],
+            verdict=SubmissionDetail.AC).values('sid')
+        self.assertSearchedBy(details, SUBMISSION_TABLE,
+                              ['user_id', 'problem_id', 'submit_time'])
+        self.assertSearchedBy(details, DETAIL_TABLE, ['sid_id', 'verdict'])
+
+    def test_02_status(self):
+        # 2.status filters and details of a page
+        submissions = Submission.objects.order_by('-id')
+        self.assertSearchedBy(
+            submissions.filter(user=self.USERS[0]),
+            SUBMISSION_TABLE, ['user_id'])
+        self.assertSearchedBy(
+            submissions.filter(
+                problem=self.PROBLEMS[0], status=Submission.ACCEPTED),
+            SUBMISSION_TABLE, ['problem_id', 'status'])
+        self.assertSearchedBy(
+            SubmissionDetail.objects.filter(
+                sid__in=range(1, 26)).order_by('tid'),
+            DETAIL_TABLE, ['sid_id'])
+
+    def test_03_user(self):
+        # 3.user statistics and pending submissions
+        self.assertSearchedBy(
+            Submission.objects.filter(
+                user=self.USERS[0], status=Submission.COMPILE_ERROR),
+            SUBMISSION_TABLE, ['user_id', 'status'])
+        self.assertSearchedBy(
+            Submission.objects.filter(
+                user=self.USERS[0],
+                status__in=(Submission.WAIT, Submission.JUDGING)),
+            SUBMISSION_TABLE, ['user_id', 'status'])
+        self.assertSearchedBy(
+            SubmissionDetail.objects.filter(
+                sid__in=range(1, 50), verdict=SubmissionDetail.AC),
+            DETAIL_TABLE, ['sid_id', 'verdict'])
+
+    def test_04_rejudge(self):
+        # 4.rejudging a contest problem
+        self.assertSearchedBy(
+            Submission.objects.filter(
+                problem=self.PROBLEMS[0],
+                submit_time__gte=self.START_TIME,
+                submit_time__lte=self.CONTEST.end_time,
+                user__in=self.USERS[1:4]),
+            SUBMISSION_TABLE, ['user_id', 'problem_id', 'submit_time'])
+
+    def test_05_waiting(self):
+        # 5.waiting submissions of the admission check
+        self.assertSearchedBy(
+            Submission.objects.filter(status=Submission.WAIT),
+            SUBMISSION_TABLE, ['status'])
@@ -0,0 +1,138 @@
+from django.core.management import call_command
+
+from problem.models import Submission, SubmissionCount
+from problem.submission_count import ALL_COUNT_SHARDS
+from problem.submission_count import get_submission_counts
+from problem.submission_count import sync_submission_counts
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Complex01
+from utils.rejudge import rejudge_submission
+from utils.test_helper import *
+
+
+class Tester_Problem_submission_count(NTHUOJ_TestCase_Complex01):
+    """ test maintained submission counts of each status """
+
+    def setUp(self):
+        super(Tester_Problem_submission_count, self).setUp()
+        self.PROBLEM = self.CONTEST_PROBLEMS[0]
+        self.CONTESTANT = self.CONTEST_CONTESTANTS[0]
+
+    def get_counts(self):
+        """Return the counts of all submissions and those of the problem,
+        the contestant and the contest."""
+        return [
+            get_submission_counts(SubmissionCount.ALL),
+            get_submission_counts(SubmissionCount.PROBLEM, self.PROBLEM.id),
+            get_submission_counts(SubmissionCount.USER, self.CONTESTANT),
+            get_submission_counts(SubmissionCount.CONTEST, self.CONTEST.id),
+        ]
+
+    def test_01_submit(self):
+        # 1.new submissions are counted under every facet
+        create_submission(self.PROBLEM, self.CONTESTANT, Submission.WAIT)
+        create_submission(self.PROBLEM, self.CONTESTANT, Submission.WAIT)
+        self.assertEqual(self.get_counts(), [{Submission.WAIT: 2}] * 4)
+
+    def test_02_verdict(self):
+        # 2.a verdict moves the submission to its status
+        submission = create_submission(
+            self.PROBLEM, self.CONTESTANT, Submission.WAIT)
+        submission = Submission.objects.get(pk=submission.pk)
+        submission.status = Submission.ACCEPTED
+        submission.save()
+        self.assertEqual(self.get_counts(), [{Submission.ACCEPTED: 1}] * 4)
+        # saving again counts nothing twice
+        submission.save()
+        self.assertEqual(self.get_counts(), [{Submission.ACCEPTED: 1}] * 4)
+
+    def test_03_rejudge(self):
+        # 3.rejudging moves the submission back to waiting
+        submission = create_submission(
+            self.PROBLEM, self.CONTESTANT, Submission.ACCEPTED)
+        create_submission(self.PROBLEM, self.CONTESTANT, Submission.ACCEPTED)
+        rejudge_submission(Submission.objects.get(pk=submission.pk))
+        self.assertEqual(
+            self.get_counts(),
+            [{Submission.WAIT: 1, Submission.ACCEPTED: 1}] * 4)
+
+    def test_04_delete(self):
+        # 4.deleted submissions are not counted
+        submission = create_submission(
+            self.PROBLEM, self.CONTESTANT, Submission.NOT_ACCEPTED)
+        Submission.objects.get(pk=submission.pk).delete()
+        self.assertEqual(self.get_counts(), [{}] * 4)
+
+    def test_05_contest(self):
+        # 5.contest counts follow its contestants and problems
+        create_submission(self.PROBLEM, self.NORMAL_USER, Submission.WAIT)
+        create_submission(self.PROBLEM, self.JUDGE_USERS[4], Submission.WAIT)
+
+        def contest_counts():
+            return get_submission_counts(
+                SubmissionCount.CONTEST, self.CONTEST.id)
+        # the problem owner does not attend the contest
+        self.assertEqual(contest_counts(), {Submission.WAIT: 1})
+        create_contest(self.JUDGE_USERS[0], problems=[self.PROBLEM])
+        self.assertEqual(contest_counts(), {Submission.WAIT: 1})
+        self.CONTEST.coowner.add(self.JUDGE_USERS[4])
+        self.assertEqual(contest_counts(), {Submission.WAIT: 2})
+        self.CONTEST.problem.remove(self.PROBLEM)
+        self.assertEqual(contest_counts(), {})
+        self.CONTEST.problem.add(self.PROBLEM)
+        self.CONTEST.delete()
+        self.assertFalse(SubmissionCount.objects.filter(
+            facet=SubmissionCount.CONTEST, key=unicode(self.CONTEST.id)))
+
+    def get_all_counts(self):
+        """Return the counts under every facet and key, the shards of all
+        submissions summed up."""
+        counts = dict(((facet, key), get_submission_counts(facet, key))
+                      for facet, key in SubmissionCount.objects.exclude(
+                          facet=SubmissionCount.ALL).values_list(
+                          'facet', 'key'))
+        counts[SubmissionCount.ALL] = get_submission_counts(
+            SubmissionCount.ALL)
+        return counts
+
+    def test_06_rebuild(self):
+        # 6.the rebuild command reproduces the maintained counts
+        self.all_submisions_when_contest_running()
+        rejudge_submission(Submission.objects.all()[0])
+        counts = self.get_all_counts()
+        SubmissionCount.objects.all().delete()
+        call_command('rebuild_submission_counts',
+                     stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.get_all_counts(), counts)
+
+    def test_07_submit_time(self):
+        # 7.a submission moved out of the contest is not counted in it
+        submission = create_submission(
+            self.PROBLEM, self.CONTESTANT, Submission.WAIT,
+            submit_time=self.CONTEST.start_time - timedelta(minutes=1))
+        self.assertEqual(self.get_counts()[3], {})
+        submission.submit_time = self.CONTEST.start_time
+        submission.save()
+        self.assertEqual(self.get_counts()[3], {Submission.WAIT: 1})
+
+    def test_08_judge_verdict(self):
+        # 8.verdicts written by the judge are reconciled
+        submission = create_submission(
+            self.PROBLEM, self.CONTESTANT, Submission.WAIT)
+        Submission.objects.filter(pk=submission.pk).update(
+            status=Submission.ACCEPTED)
+        self.assertEqual(self.get_counts(), [{Submission.WAIT: 1}] * 4)
+        self.assertEqual(sync_submission_counts(force=True), 1)
+        self.assertEqual(self.get_counts(), [{Submission.ACCEPTED: 1}] * 4)
+        self.assertEqual(sync_submission_counts(force=True), 0)
+        # rejudged through Django after that
+        rejudge_submission(Submission.objects.get(pk=submission.pk))
+        self.assertEqual(self.get_counts(), [{Submission.WAIT: 1}] * 4)
+
+    def test_09_shards(self):
+        # 9.the counts of all submissions are spread over several rows
+        for i in range(ALL_COUNT_SHARDS * 2):
+            create_submission(self.PROBLEM, self.CONTESTANT, Submission.WAIT)
+        self.assertGreater(SubmissionCount.objects.filter(
+            facet=SubmissionCount.ALL).count(), 1)
+        self.assertEqual(get_submission_counts(SubmissionCount.ALL),
+                         {Submission.WAIT: ALL_COUNT_SHARDS * 2})
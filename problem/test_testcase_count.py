@@ -0,0 +1,76 @@
+from django.core.management import call_command
+
+from problem.models import Problem, Submission, SubmissionDetail
+from problem.problem_info import get_testcase_counts_map
+from status.templatetags.status_filters import show_passed_testcase
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Basic
+from utils.rejudge import rejudge_submission
+from utils.test_helper import *
+
+
+class Tester_Problem_testcase_count(NTHUOJ_TestCase_Basic):
+    """ test testcase counts of problems and submissions """
+
+    def setUp(self):
+        super(Tester_Problem_testcase_count, self).setUp()
+        self.PROBLEM = create_problem(self.ADMIN_USER)
+        self.TESTCASES = [create_testcase(self.PROBLEM, local_files=False)
+                          for i in xrange(3)]
+        self.SUBMISSION = create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.NOT_ACCEPTED)
+
+    def get_counts(self):
+        counts = get_testcase_counts_map([self.SUBMISSION.pk])
+        return counts.get(self.SUBMISSION.pk, (0, 0))
+
+    def judge(self, verdicts):
+        return [create_submission_detail(self.SUBMISSION, testcase, verdict)
+                for testcase, verdict in zip(self.TESTCASES, verdicts)]
+
+    def test_01_problem(self):
+        # 1.testcase count follows added and deleted testcases
+        problem = Problem.objects.get(pk=self.PROBLEM.pk)
+        self.assertEqual(problem.testcase_count, 3)
+        self.TESTCASES[0].delete()
+        problem = Problem.objects.get(pk=self.PROBLEM.pk)
+        self.assertEqual(problem.testcase_count, 2)
+
+    def test_02_submission(self):
+        # 2.passed and total counts follow the details, however written
+        details = self.judge([SubmissionDetail.AC, SubmissionDetail.WA,
+                              SubmissionDetail.AC])
+        self.assertEqual(self.get_counts(), (2, 3))
+        SubmissionDetail.objects.filter(pk=details[1].pk).update(
+            verdict=SubmissionDetail.AC)
+        self.assertEqual(self.get_counts(), (3, 3))
+        details[0].delete()
+        self.assertEqual(self.get_counts(), (2, 2))
+        # deleting a testcase deletes its details
+        self.TESTCASES[2].delete()
+        self.assertEqual(self.get_counts(), (1, 1))
+
+    def test_03_rejudge(self):
+        # 3.rejudging clears the counts
+        self.judge([SubmissionDetail.AC, SubmissionDetail.WA])
+        submission = Submission.objects.get(pk=self.SUBMISSION.pk)
+        rejudge_submission(submission)
+        self.assertEqual(self.get_counts(), (0, 0))
+
+    def test_04_refresh(self):
+        # 4.counts of existing data are recomputed by the backfill command
+        Problem.objects.update(testcase_count=0)
+        call_command('refresh_testcase_counts', stdout=open(os.devnull, 'w'))
+        self.assertEqual(
+            Problem.objects.get(pk=self.PROBLEM.pk).testcase_count, 3)
+
+    def test_05_status(self):
+        # 5.status rows count the testcases from the details
+        submission = Submission.objects.get(pk=self.SUBMISSION.pk)
+        self.assertEqual(show_passed_testcase({'grouper': submission}), '')
+        self.judge([SubmissionDetail.AC, SubmissionDetail.WA])
+        # details written by the judge behind the models
+        SubmissionDetail.objects.filter(sid=self.SUBMISSION).update(
+            verdict=SubmissionDetail.AC)
+        with self.assertNumQueries(1):
+            text = show_passed_testcase({'grouper': submission})
+        self.assertEqual(text, '(2/2)')
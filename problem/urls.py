@@ -51,4 +51,10 @@ urlpatterns = patterns('',
     url(r'^partial/(?P<filename>.+)/$', views.download_partial, name="download_partial"),
     url(r'^special/(?P<filename>.+)/$', views.download_special, name="download_special"),
     url(r'^rejudge/$', views.rejudge, name="rejudge"),
+    url(r'^judge/claim/$', views.judge_claim, name='judge_claim'),
+    # post /problem/judge/claim: lease waiting submissions to a judge
+    url(r'^judge/renew/$', views.judge_renew, name='judge_renew'),
+    # post /problem/judge/renew: extend the lease of submissions
+    url(r'^judge/complete/$', views.judge_complete, name='judge_complete'),
+    # post /problem/judge/complete: report the result of a submission
 )
@@ -29,6 +29,8 @@ from django.contrib.auth.decorators import login_required
 from django.core.servers.basehttp import FileWrapper
 from django.utils import timezone
 from django.contrib import messages
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from utils.render_helper import render_index
 from utils.user_info import validate_user, has_problem_auth, has_problem_ownership
@@ -37,9 +39,12 @@ from problem.models import Problem, Tag, Testcase
 from problem.forms import ProblemForm, TagForm, TagFilter
 from utils import log_info, config_info
 from problem.problem_info import *
+from problem.judge_queue import CLAIM_MAX, claim_submissions, \
+    renew_lease, complete_submission, get_task_data
 from utils import log_info
 from utils.render_helper import render_index, get_current_page
 from utils.rejudge import rejudge_problem
+from utils.decorators import judge_token_required
 from subprocess import check_call
 import os
 import json
@@ -67,6 +72,7 @@ def problem(request):
             for p in problem_list:
                 p.in_contest = check_in_contest(p)
         problems = get_current_page(request, problem_list, slice=15)
+        problems.object_list = add_shard_counts(problems.object_list)
         for p in problems:
             if p.total_submission != 0:
                 p.pass_rate = float(p.ac_count) / float(p.total_submission) * 100.0
@@ -404,3 +410,59 @@ def rejudge(request):
         except Problem.DoesNotExist:
             raise Http404()
     return redirect('/problem/')
+
+
+@csrf_exempt
+@require_POST
+@judge_token_required
+def judge_claim(request):
+    judge = request.POST.get('judge', '')
+    if not judge or len(judge) > 50:
+        return HttpResponseBadRequest('judge must be a name of 1-50 characters')
+    try:
+        limit = int(request.POST.get('limit', 1))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return HttpResponseBadRequest('limit must be a positive integer')
+    tasks = claim_submissions(judge, min(limit, CLAIM_MAX))
+    data = {'submissions': [get_task_data(task) for task in tasks]}
+    return HttpResponse(json.dumps(data), content_type='application/json')
+
+
+@csrf_exempt
+@require_POST
+@judge_token_required
+def judge_renew(request):
+    lease = request.POST.get('lease', '')
+    sids = request.POST.getlist('sid')
+    if not lease or not all(sid.isdigit() for sid in sids):
+        return HttpResponseBadRequest('lease and sids are required')
+    data = {'renewed': renew_lease(lease, sids)}
+    return HttpResponse(json.dumps(data), content_type='application/json')
+
+
+@csrf_exempt
+@require_POST
+@judge_token_required
+def judge_complete(request):
+    lease = request.POST.get('lease', '')
+    sid = request.POST.get('sid', '')
+    if not lease or not sid.isdigit():
+        return HttpResponseBadRequest('lease and sid are required')
+    # results of the testcases as a json list of tid, verdict, cpu, memory
+    details = request.POST.get('details')
+    try:
+        if details is not None:
+            details = json.loads(details)
+            if not isinstance(details, list):
+                raise ValueError('details must be a list')
+        completed = complete_submission(
+            lease, sid, request.POST.get('status'),
+            request.POST.get('error_msg'), details)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    # the submission is leased to another judge or judged already
+    return HttpResponse(json.dumps({'completed': completed}),
+                        content_type='application/json',
+                        status=200 if completed else 409)
@@ -0,0 +1,130 @@
+'''
+    Benchmark of the submission visibility policy, not run with the test suite:
+
+        python manage.py test status.bench_visibility
+    '''
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from contest.contest_info import get_freeze_time_datetime, get_contestant
+from contest.models import Contest
+from problem.models import Problem, Submission
+from status.status_info import get_visible_submission
+from users.models import User
+from utils.test_helper import create_contest, create_problem
+from utils.test_helper import create_test_normal_user, get_test_normal_user
+from utils.user_info import has_contest_ownership
+
+ACTIVE_CONTESTS = (10, 20, 40)
+PROBLEMS_PER_CONTEST = 3
+CONTESTANTS_PER_CONTEST = 20
+SUBMISSIONS = 2000
+
+
+def get_visible_submission_chained(user):
+    """The former implementation adding excludes contest by contest,
+    kept as the reference of the benchmark."""
+    submissions = Submission.objects.all()
+    submissions = submissions.exclude(
+        user__in=User.objects.filter(user_level=User.ADMIN)
+    )
+    invisible_problem = Problem.objects.filter(
+        visible=False
+    ).exclude(
+        owner=user
+    )
+    contests = Contest.objects.filter(
+        is_homework=False,
+        end_time__gte=datetime.now()
+    )
+    for contest in contests:
+        if not has_contest_ownership(user, contest):
+            submissions = submissions.exclude(
+                Q(user__in=contest.coowner.all()) | Q(user=contest.owner),
+                problem__in=contest.problem.all(),
+                submit_time__gte=contest.creation_time
+            )
+            submissions = submissions.exclude(
+                user__in=get_contestant(contest).exclude(
+                    username=user.username),
+                problem__in=contest.problem.all(),
+                submit_time__gte=get_freeze_time_datetime(contest)
+            )
+        else:
+            invisible_problem = invisible_problem.exclude(
+                id__in=contest.problem.filter(
+                    visible=False).values_list('id', flat=True)
+            )
+    submissions = submissions.exclude(
+        problem__in=invisible_problem
+    )
+    return submissions
+
+
+class Bench_Status_visibility(TestCase):
+    """ compare the chained excludes and the compiled visibility policy """
+
+    def setUp(self):
+        random.seed(0)
+        create_test_normal_user(CONTESTANTS_PER_CONTEST + 1)
+        self.users = [get_test_normal_user(i)
+                      for i in xrange(CONTESTANTS_PER_CONTEST + 1)]
+        self.viewer = self.users[-1]
+        self.contests = []
+        self.problems = []
+
+    def add_contests(self, count):
+        now = datetime.now()
+        for i in xrange(count):
+            problems = [create_problem(random.choice(self.users),
+                                       visible=random.randint(0, 1))
+                        for j in xrange(PROBLEMS_PER_CONTEST)]
+            self.problems += problems
+            contest = create_contest(
+                random.choice(self.users),
+                start_time=now - timedelta(hours=1),
+                end_time=now + timedelta(hours=random.randint(1, 4)),
+                coowners=random.sample(self.users, 2),
+                contestants=self.users[:CONTESTANTS_PER_CONTEST],
+                problems=problems)
+            contest.freeze_time = 60
+            contest.save()
+            self.contests.append(contest)
+        submissions = []
+        for i in xrange(SUBMISSIONS / len(ACTIVE_CONTESTS)):
+            submissions.append(Submission(
+                problem=random.choice(self.problems),
+                user=random.choice(self.users),
+                submit_time=now - timedelta(minutes=random.randint(0, 60))))
+        Submission.objects.bulk_create(submissions)
+
+    def run_policy(self, get_submissions):
+        start = time.time()
+        with CaptureQueriesContext(connection) as context:
+            ids = set(get_submissions(self.viewer).values_list(
+                'id', flat=True))
+        sql_length = max(len(query['sql'])
+                         for query in context.captured_queries)
+        return time.time() - start, sql_length, ids
+
+    def test_policies(self):
+        print
+        for count in ACTIVE_CONTESTS:
+            self.add_contests(count - len(self.contests))
+            cache.clear()
+            chained = self.run_policy(get_visible_submission_chained)
+            compiled = self.run_policy(get_visible_submission)
+            cached = self.run_policy(get_visible_submission)
+            print '%d active contests, %d submissions' % (
+                count, Submission.objects.count())
+            print 'chained excludes: %.3fs, %d chars of SQL' % chained[:2]
+            print 'compiled policy: %.3fs (%.3fs with cached index), ' \
+                '%d chars of SQL' % (compiled[0], cached[0], compiled[1])
+            self.assertEqual(chained[2], compiled[2])
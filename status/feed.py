@@ -0,0 +1,106 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import json
+from collections import OrderedDict
+
+from problem.problem_info import get_testcase_counts_map
+
+# fields of the submission feed and the submission columns they are read
+# from, testcase counts are counted from the details of each batch
+FEED_FIELDS = OrderedDict([
+    ('sid', 'id'),
+    ('user', 'user'),
+    ('pid', 'problem'),
+    ('status', 'status'),
+    ('language', 'language'),
+    ('submit_time', 'submit_time'),
+    ('passed', None),
+    ('total', None),
+])
+TESTCASE_FIELDS = ('passed', 'total')
+# submissions read from the database per query
+FEED_BATCH_SIZE = 500
+# submissions returned by one request at most
+FEED_MAX_LIMIT = 10000
+
+
+def parse_feed_fields(value):
+    """Return the list of feed fields named in a comma separated string,
+    all fields if it is empty. The sid always comes first as it is the
+    cursor of the feed. Raise ValueError on an unknown field."""
+    if not value:
+        return FEED_FIELDS.keys()
+    fields = ['sid']
+    for field in value.split(','):
+        field = field.strip()
+        if field not in FEED_FIELDS:
+            raise ValueError('Unknown field %s' % field)
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def format_feed_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def get_feed_lines(submissions, fields, after=None, before=None,
+                   limit=FEED_MAX_LIMIT):
+    """Yield the submissions of a querySet as NDJSON lines holding the
+    given fields. Submissions are read in batches by sid as plain values:
+    in ascending order after the `after` sid, or in descending order
+    before the `before` sid. The sid of the last line is the cursor of
+    the next request."""
+    column_fields = [field for field in fields
+                     if field not in TESTCASE_FIELDS]
+    columns = [FEED_FIELDS[field] for field in column_fields]
+    counted = [field for field in fields if field in TESTCASE_FIELDS]
+    if before is not None:
+        submissions = submissions.order_by('-id')
+        lookup = 'id__lt'
+        cursor = before
+    else:
+        submissions = submissions.order_by('id')
+        lookup = 'id__gt'
+        cursor = after or 0
+    while limit > 0:
+        size = min(FEED_BATCH_SIZE, limit)
+        batch = list(submissions.filter(
+            **{lookup: cursor}).values_list(*columns)[:size])
+        if counted:
+            counts = get_testcase_counts_map([row[0] for row in batch])
+        for row in batch:
+            values = dict(zip(column_fields, row))
+            if counted:
+                values['passed'], values['total'] = \
+                    counts.get(row[0], (0, 0))
+            line = OrderedDict(
+                (field, format_feed_value(values[field])) for field in fields)
+            yield json.dumps(line) + '\n'
+        if len(batch) < size:
+            return
+        cursor = batch[-1][0]
+        limit -= size
@@ -0,0 +1,84 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from problem.models import Submission, SubmissionDetail
+from status.row_cache import render_status_rows
+from status.status_info import regroup_submission
+
+PENDING_STATUSES = (Submission.WAIT, Submission.JUDGING)
+# seconds a client waits before asking again when the push server does
+# not serve its waits, requests to Django never block so that they do
+# not hold a worker while submissions are being judged
+PENDING_POLL_INTERVAL = 3
+# seconds the push server holds a wait for status changes at most
+PENDING_MAX_WAIT = 30
+# submissions a request can ask for at most
+PENDING_MAX_SUBMISSIONS = 100
+
+
+def parse_statuses(value):
+    """Return the statuses the client shows keyed by sid, given as
+    `12:WAIT,13:JUDGING`. A sid without a status is mapped to ''.
+    Raise ValueError if a sid is not a number."""
+    statuses = {}
+    for item in value.split(',')[:PENDING_MAX_SUBMISSIONS]:
+        if item:
+            sid, _, status = item.partition(':')
+            statuses[int(sid)] = status
+    return statuses
+
+
+def get_changed_sids(statuses, current):
+    """Return the sids whose current status differs from the status the
+    client knows, in ascending order. A sid without a known status is
+    taken as unchanged."""
+    return sorted(sid for sid in statuses
+                  if sid in current and statuses[sid] and
+                  current[sid] != statuses[sid])
+
+
+def get_pending_rows(request, submissions, sids, query=''):
+    """Return the state of the given submissions as a list of dicts
+    holding the status, the passed and total testcases counted from the
+    details, and the rendered status row, so that a client replaces its
+    row as the status page would render it. Rejudge links in the rows
+    keep the given query string."""
+    if not sids:
+        return []
+    groups = regroup_submission(
+        submissions.filter(id__in=sids).order_by('id'), request.user)
+    render_status_rows(request, groups, query=query)
+    rows = []
+    for group in groups:
+        submission = group['grouper']
+        passed = len([detail for detail in group['list']
+                      if detail.verdict == SubmissionDetail.AC])
+        rows.append({
+            'sid': submission.id,
+            'status': submission.status,
+            'status_display': submission.get_status_display(),
+            'passed': passed,
+            'total': len(group['list']),
+            'row': group['row'],
+        })
+    return rows
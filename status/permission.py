@@ -0,0 +1,148 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from contest.contest_info import get_running_contests
+from contest.models import Contest
+from contest.models import Contestant
+from team.models import TeamMember
+from utils.user_info import validate_user
+
+
+class ContestRules(object):
+    """What the permission rules need to know about a contest."""
+
+    def __init__(self, contest, owners, problems):
+        self.id = contest.id
+        self.owners = owners
+        self.problems = problems
+        self.creation_time = contest.creation_time
+        self.end_time = contest.end_time
+        self.contestants = set()
+
+
+def get_contest_rules(user, submissions):
+    """Return the running contests and the contests the submissions may
+    have been submitted to as (running contests, contests) lists of
+    ContestRules. Contestants are only loaded for contests the user owns,
+    as they are never needed otherwise."""
+    problems = set(submission.problem_id for submission in submissions)
+    running = set(get_running_contests().values_list('id', flat=True))
+    contest_filter = Q(id__in=running)
+    if submissions:
+        contest_filter |= Q(
+            problem__in=problems,
+            end_time__gte=min(s.submit_time for s in submissions),
+            creation_time__lte=max(s.submit_time for s in submissions))
+    contests = list(Contest.objects.filter(contest_filter).distinct())
+    contest_ids = [contest.id for contest in contests]
+
+    owners = defaultdict(set)
+    for contest in contests:
+        owners[contest.id].add(contest.owner_id)
+    for contest_id, username in Contest.coowner.through.objects.filter(
+            contest__in=contest_ids).values_list('contest', 'user'):
+        owners[contest_id].add(username)
+    contest_problems = defaultdict(set)
+    for contest_id, problem_id in Contest.problem.through.objects.filter(
+            contest__in=contest_ids,
+            problem__in=problems).values_list('contest', 'problem'):
+        contest_problems[contest_id].add(problem_id)
+
+    rules = dict((contest.id, ContestRules(
+        contest, owners[contest.id], contest_problems[contest.id]))
+        for contest in contests)
+    owned = [contest_id for contest_id in contest_ids
+             if user.username in owners[contest_id]]
+    for contest_id, username in Contestant.objects.filter(
+            contest__in=owned).values_list('contest', 'user'):
+        rules[contest_id].contestants.add(username)
+
+    return ([rules[contest_id] for contest_id in contest_ids
+             if contest_id in running],
+            [rules[contest_id] for contest_id in contest_ids])
+
+
+def show_contest_submission(submission, user, contests):
+    for contest in contests:
+        if user.username not in contest.owners:
+            continue
+        if submission.user_id in contest.owners or \
+                submission.user_id in contest.contestants:
+            return True
+    return False
+
+
+def get_permission_matrix(user, submissions):
+    """Evaluate status_filters.show_detail and can_rejudge of a user for
+    a page of submissions at once. Contests, ownerships, contestants and
+    team memberships are loaded in bulk, so the number of queries does not
+    depend on the number of submissions.
+
+    Returns a dict mapping submission id to a (show_detail, can_rejudge)
+    tuple.
+    """
+    user = validate_user(user)
+    submissions = list(submissions)
+    if user.has_admin_auth():
+        return dict((submission.id, (True, True))
+                    for submission in submissions)
+
+    running_contests, contests = get_contest_rules(user, submissions)
+    teams = set(TeamMember.objects.filter(
+        team__in=set(s.team_id for s in submissions if s.team_id),
+        member=user.username).values_list('team', flat=True))
+
+    matrix = {}
+    for submission in submissions:
+        # contests which may hold the submission, see status_filters
+        submission_contests = [
+            contest for contest in contests
+            if submission.problem_id in contest.problems and
+            contest.end_time >= submission.submit_time and
+            contest.creation_time <= submission.submit_time]
+        problem_owner = submission.problem.owner_id == user.username
+        can_rejudge = problem_owner or any(
+            user.username in contest.owners
+            for contest in submission_contests)
+
+        if submission.user.has_admin_auth():
+            show_detail = False
+        elif running_contests:
+            show_detail = show_contest_submission(submission, user, [
+                contest for contest in running_contests
+                if submission.problem_id in contest.problems and
+                contest.creation_time <= submission.submit_time])
+        else:
+            show_detail = submission.user_id == user.username or \
+                problem_owner or \
+                show_contest_submission(
+                    submission, user, submission_contests) or \
+                (submission.team_id is not None and (
+                    submission.team_id in teams or
+                    submission.team.leader_id == user.username))
+        matrix[submission.id] = (show_detail, can_rejudge)
+    return matrix
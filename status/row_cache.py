@@ -0,0 +1,81 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from problem.models import Submission
+
+# statuses a submission keeps until it is rejudged
+FINAL_STATUSES = (
+    Submission.ACCEPTED, Submission.NOT_ACCEPTED, Submission.COMPILE_ERROR,
+    Submission.RESTRICTED_FUNCTION, Submission.JUDGE_ERROR,
+)
+# problem, user and team names in a row may still change
+STATUS_ROW_TIMEOUT = 60 * 60
+
+
+def get_status_row_key(group, query):
+    """Return the cache key of the rendered row of a regrouped submission,
+    or None if the row is not to be cached.
+
+    A row is cached once its status is final, under its status version
+    and what the viewer may do with it. Rejudge links keep the query
+    string of the page, so rows with them are cached per query string."""
+    submission = group['grouper']
+    if submission.status not in FINAL_STATUSES:
+        return None
+    permission_class = '%d%d' % (group['show_detail'], group['can_rejudge'])
+    key = 'status_row:%d:%d:%s:%d:%s' % (
+        submission.id, submission.status_version, submission.status,
+        len(group['list']), permission_class)
+    if group['can_rejudge']:
+        key += ':' + hashlib.md5(query).hexdigest()
+    return key
+
+
+def render_status_rows(request, submission_groups, query=None):
+    """Set 'row' of each submission group from status_info.regroup_submission
+    to its rendered <tr> of the status table. Rows of finalized submissions
+    are read from the cache in one go, those missing are rendered and
+    cached. Rejudge links keep the given query string, that of the request
+    by default."""
+    if query is None:
+        query = request.GET.urlencode()
+    keys = [get_status_row_key(group, query) for group in submission_groups]
+    cached_rows = cache.get_many([key for key in keys if key])
+    new_rows = {}
+    for key, group in zip(keys, submission_groups):
+        if key in cached_rows:
+            group['row'] = mark_safe(cached_rows[key])
+            continue
+        group['row'] = render_to_string('status/statusRow.html', {
+            'submission': group, 'query': query})
+        if key:
+            new_rows[key] = group['row']
+    if new_rows:
+        cache.set_many(new_rows, STATUS_ROW_TIMEOUT)
+    return submission_groups
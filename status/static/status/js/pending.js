@@ -0,0 +1,85 @@
+/*
+The MIT License (MIT)
+Copyright (c) 2014 NTHUOJ team
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+// 'sid:status' of the pending submissions of the status table
+function getPendingSids() {
+    return $('tr[data-status="WAIT"], tr[data-status="JUDGING"]').map(function() {
+        return $(this).attr('data-sid') + ':' + $(this).attr('data-status');
+    }).get().join(',');
+}
+
+// replace the rows of the given submissions whose status changed
+function updatePending(url, query, sids) {
+    return $.getJSON(url, {'sids': sids, 'query': query}).done(function(data) {
+        $.each(data.submissions, function(i, submission) {
+            // the row is rendered as the status page renders it, so that
+            // error message links and details are kept
+            var row = $(submission.row);
+            $('tr[data-sid="' + submission.sid + '"]').replaceWith(row);
+            row.find('.ajax-popup-link').magnificPopup({
+                removalDelay: 500,
+                mainClass: 'mmfp-fade',
+                type: 'ajax',
+                midClick: true
+            });
+        });
+    });
+}
+
+// wait at the push server until a pending submission changes status
+function waitPending(url, query) {
+    var sids = getPendingSids();
+    if (!sids) {
+        return;
+    }
+    $.getJSON(url + 'wait/', {'sids': sids}).done(function(data) {
+        if (!data.sids.length) {
+            waitPending(url, query);
+            return;
+        }
+        updatePending(url, query, sids).always(function() {
+            waitPending(url, query);
+        });
+    }).fail(function() {
+        // no push server serves the waits, ask Django at intervals
+        pollPending(url, query);
+    });
+}
+
+// poll for pending submissions of the status table to be judged
+function pollPending(url, query) {
+    var sids = getPendingSids();
+    if (!sids) {
+        return;
+    }
+    updatePending(url, query, sids).done(function(data) {
+        setTimeout(function() {
+            pollPending(url, query);
+        }, data.poll_interval * 1000);
+    }).fail(function() {
+        setTimeout(function() {
+            pollPending(url, query);
+        }, 5000);
+    });
+}
+
+$(function() {
+    waitPending($('#list').data('pending-url'),
+                window.location.search.replace(/^\?/, ''));
+});
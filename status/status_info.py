@@ -1,27 +1,124 @@
+from collections import defaultdict
 from datetime import datetime
-from django.db.models import Q
 
-from contest.contest_info import get_running_contests, \
-    get_freeze_time_datetime, get_contestant
+from django.db.models import Count
+
+from contest.contest_info import get_contest_submissions
+from contest.contest_info import get_freeze_time_datetime
+from contest.contest_info import is_ended
 from contest.models import Contest
-from problem.models import Problem, Submission, SubmissionDetail
-from users.models import User
-from utils.user_info import validate_user, has_contest_ownership
+from problem.models import Submission, SubmissionDetail, SubmissionCount
+from problem.submission_count import get_submission_counts
+from problem.submission_count import sync_submission_counts
+from status.permission import get_permission_matrix
+from status.visibility import get_hidden_submission_filter
+from utils.user_info import validate_user
+
+
+def regroup_submission(submissions, user=None):
+    """Pair each submission with its details and its "(passed/total)"
+    summary. Details of all the submissions are loaded in one query.
+    If a user is given, whether they can see the details of and rejudge
+    each submission is evaluated as well."""
+    if hasattr(submissions, 'select_related'):
+        submissions = submissions.select_related('user', 'problem', 'team')
+    submissions = list(submissions)
+    details = defaultdict(list)
+    for detail in SubmissionDetail.objects.filter(
+        sid__in=[submission.id for submission in submissions]
+    ).order_by('tid'):
+        details[detail.sid_id].append(detail)
 
+    if user is not None:
+        permissions = get_permission_matrix(user, submissions)
 
-def regroup_submission(submissions):
     submission_groups = []
     for submission in submissions:
-        submission_groups.append({
+        submission_details = details[submission.id]
+        passed = len([detail for detail in submission_details
+                      if detail.verdict == SubmissionDetail.AC])
+        group = {
             'grouper': submission,
-            'list': SubmissionDetail.objects.filter(
-                sid=submission.id
-            ).order_by('tid')
-        })
+            'list': submission_details,
+            'summary': get_testcase_summary(passed, len(submission_details))
+        }
+        if user is not None:
+            group['show_detail'], group['can_rejudge'] = \
+                permissions[submission.id]
+        submission_groups.append(group)
 
     return submission_groups
 
 
+def get_testcase_summary(passed, total):
+    if total:
+        return '(%d/%d)' % (passed, total)
+    return ''
+
+
+def filter_submissions(submissions, cleaned_data):
+    """Filter submissions by the cleaned data of a StatusFilter."""
+    if cleaned_data['username']:
+        submissions = submissions.filter(user=cleaned_data['username'])
+    if cleaned_data['pid']:
+        submissions = submissions.filter(problem=cleaned_data['pid'])
+    if cleaned_data['cid']:
+        contest = Contest.objects.get(id=cleaned_data['cid'])
+        submissions = get_contest_submissions(contest, submissions)
+    if cleaned_data['status']:
+        submissions = submissions.filter(status=cleaned_data['status'])
+    return submissions
+
+
+def get_status_counts(user, cleaned_data):
+    """Return a dict mapping each status to the number of submissions the
+    user can view matching the cleaned data of a StatusFilter but its
+    status, or None if it can't be told from the submission counts.
+
+    The counts are kept for all submissions and per problem, user and
+    contest, so at most one of username, pid and cid can be given. A
+    running contest after its freeze time lists only the submissions
+    before it, which are not counted apart. The submissions hidden from
+    the user are counted and subtracted, they are few compared to all.
+    Verdicts the judge has written meanwhile are reconciled first."""
+    facets = [
+        (SubmissionCount.USER, cleaned_data['username']),
+        (SubmissionCount.PROBLEM, cleaned_data['pid']),
+        (SubmissionCount.CONTEST, cleaned_data['cid']),
+    ]
+    facets = [(facet, key) for facet, key in facets if key]
+    if len(facets) > 1:
+        return None
+    facet, key = facets[0] if facets else (SubmissionCount.ALL, '')
+    if facet == SubmissionCount.CONTEST:
+        contest = Contest.objects.get(id=key)
+        if not is_ended(contest) and \
+                datetime.now() > get_freeze_time_datetime(contest):
+            return None
+    if facet != SubmissionCount.USER and key:
+        key = int(key)
+    sync_submission_counts()
+    counts = get_submission_counts(facet, key)
+
+    user = validate_user(user)
+    if not user.has_admin_auth():
+        hidden = filter_submissions(
+            Submission.objects.filter(get_hidden_submission_filter(user)),
+            dict(cleaned_data, status=''))
+        for status, count in hidden.order_by().values_list(
+                'status').annotate(count=Count('id')):
+            counts[status] = counts.get(status, 0) - count
+    return counts
+
+
+def get_status_facets(counts):
+    """Return (status, count) of the statuses having submissions in the
+    given counts, in the order of Submission.STATUS_CHOICE."""
+    return [(status, counts[status])
+            for status, name in Submission.STATUS_CHOICE
+            if counts.get(status, 0) > 0]
+
+
 def get_visible_submission(user):
     """Get all submissions that can be viewed by the given user."""
     user = validate_user(user)
@@ -31,47 +128,4 @@ def get_visible_submission(user):
     if user.has_admin_auth():
         return submissions
 
-    # No one can view admins' submissions
-    submissions = submissions.exclude(
-        user__in=User.objects.filter(user_level=User.ADMIN)
-    )
-
-    # Invisible problem is
-    invisible_problem = Problem.objects.filter(
-        visible=False
-    ).exclude(
-        owner=user
-    )
-
-    # Not ended contest has something to judge
-    contests = Contest.objects.filter(
-        is_homework=False,
-        end_time__gte=datetime.now()
-    )
-    for contest in contests:
-        # Those who don't have contest ownership has some limitations
-        if not has_contest_ownership(user, contest):
-            # 1. Can't view contest owner/coowners' submission before the end
-            submissions = submissions.exclude(
-                Q(user__in=contest.coowner.all()) | Q(user=contest.owner),
-                problem__in=contest.problem.all(),
-                submit_time__gte=contest.creation_time
-            )
-            # 2. Can't view other contestants' submission after contest freeze
-            submissions = submissions.exclude(
-                user=get_contestant(contest).exclude(username=user.username),
-                problem__in=contest.problem.all(),
-                submit_time__gte=get_freeze_time_datetime(contest)
-            )
-        else:
-            # Exclude contest problem from invlsible problem for owner/coowners
-            invisible_problem = invisible_problem.exclude(
-                id__in=contest.problem.filter(visible=False).values_list('id', flat=True)
-            )
-
-    # Invisible problems' submission can't be seen
-    submissions = submissions.exclude(
-        problem__in=invisible_problem
-    )
-
-    return submissions
+    return submissions.exclude(get_hidden_submission_filter(user))
@@ -27,7 +27,8 @@ from django import template
 
 from contest.models import Contest, Contestant
 from contest.contest_info import get_running_contests, get_contestant
-from problem.models import SubmissionDetail
+from problem.problem_info import get_testcase_counts_map
+from status.status_info import get_testcase_summary
 from team.models import TeamMember
 from utils.user_info import validate_user, has_contest_ownership, \
     has_problem_ownership
@@ -134,9 +135,15 @@ def can_rejudge(submission, user):
 
 @register.simple_tag()
 def show_passed_testcase(submission):
-    details = submission['list']
-    if details:
-        return '(%d/%d)' % \
-            (details.filter(verdict=SubmissionDetail.AC).count(),
-             details.count())
-    return ''
+    # precomputed by status_info.regroup_submission
+    if 'summary' in submission:
+        return submission['summary']
+    submission = submission['grouper']
+    counts = get_testcase_counts_map([submission.id])
+    return get_testcase_summary(*counts.get(submission.id, (0, 0)))
+
+
+@register.filter()
+def group_digits(number):
+    """Format a number with thousands separators, e.g. 1,203"""
+    return '{:,}'.format(number)
@@ -1,7 +1,30 @@
+import json
+
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from django.contrib.auth.models import AnonymousUser
+
+from contest.contest_info import get_freeze_time_datetime
+from contest.contest_info import get_contest_submissions
+from contest.active_contests import invalidate_active_contest_index
+from problem.submission_count import SUBMISSION_COUNT_SYNC_KEY
+from status import feed
+from status.feed import FEED_FIELDS
+from status.forms import StatusFilter
+from status.pending import PENDING_POLL_INTERVAL
+from status.permission import get_permission_matrix
+from status.status_info import regroup_submission, get_visible_submission, \
+    filter_submissions
+from status.templatetags.status_filters import show_detail, can_rejudge
+from team.models import Team, TeamMember
 
 from users.forms import CodeSubmitForm
 from utils.nthuoj_testcase import NTHUOJ_TestCase_Complex01
+from utils.rejudge import rejudge_submission
 from utils.test_helper import *
 from utils.file_info import get_extension
 
@@ -436,3 +459,685 @@ class Tester_Status_view_code(NTHUOJ_TestCase_Complex01):
                         if p!=j:
                             response = client.get(target_url)
                             self.assertEqual(response.status_code, 403)
+
+
+class Tester_Status_regroup(NTHUOJ_TestCase_Complex01):
+    """ test function 'status_info.regroup_submission' """
+
+    def setUp(self):
+        super(Tester_Status_regroup, self).setUp()
+        problem = self.CONTEST_PROBLEMS[0]
+        testcases = [create_testcase(problem, local_files=False)
+                     for i in xrange(3)]
+        for i in xrange(25):
+            submission = create_submission(
+                problem, self.NORMAL_USER, Submission.NOT_ACCEPTED)
+            for j, testcase in enumerate(testcases[:i % 4]):
+                verdict = SubmissionDetail.AC if j % 2 == 0 \
+                    else SubmissionDetail.WA
+                create_submission_detail(submission, testcase, verdict)
+
+    def test_01_regroup(self):
+        # 1.details of a page are loaded at once with their summary
+        submissions = Submission.objects.order_by('id')
+        with self.assertNumQueries(2):
+            groups = regroup_submission(submissions)
+            for group in groups:
+                str(group['grouper'].user)
+                str(group['grouper'].problem)
+        summaries = [group['summary'] for group in groups[:4]]
+        self.assertEqual(summaries, ['', '(1/1)', '(1/2)', '(2/3)'])
+        tids = [detail.tid_id for detail in groups[3]['list']]
+        self.assertEqual(tids, sorted(tids))
+
+    def test_02_status_page(self):
+        # 2.the status page reads details in one query
+        with CaptureQueriesContext(connection) as context:
+            response = self.ADMIN_CLIENT.get(reverse('status:status'))
+        self.assertEqual(response.status_code, 200)
+        detail_queries = [query for query in context.captured_queries
+                          if 'problem_submissiondetail' in query['sql']]
+        self.assertEqual(len(detail_queries), 1)
+
+
+class Tester_Status_visibility(NTHUOJ_TestCase_Complex01):
+    """ test function 'status_info.get_visible_submission' """
+
+    def setUp(self):
+        super(Tester_Status_visibility, self).setUp()
+        self.CONTEST.freeze_time = 60
+        self.CONTEST.save()
+        self.PROBLEM = self.CONTEST_PROBLEMS[0]
+        self.FREEZE_TIME = get_freeze_time_datetime(self.CONTEST)
+        self.BEFORE_FREEZE = self.FREEZE_TIME - timedelta(minutes=10)
+        self.AFTER_FREEZE = self.FREEZE_TIME + timedelta(minutes=10)
+
+    def submit(self, user, problem=None, submit_time=None):
+        problem = problem or self.PROBLEM
+        return create_submission(problem, user, Submission.ACCEPTED,
+                                 submit_time=submit_time)
+
+    def assertVisible(self, user, submission, visible=True):
+        visible_ids = get_visible_submission(user).values_list(
+            'id', flat=True)
+        self.assertEqual(submission.id in visible_ids, visible)
+
+    def test_01_admin(self):
+        # 1.admin views all, no one else views admin's submissions
+        submission = self.submit(self.ADMIN_USER)
+        self.assertVisible(self.ADMIN_USER, submission)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        self.assertVisible(AnonymousUser(), submission, False)
+        submission = self.submit(self.CONTEST_CONTESTANTS[0],
+                                 submit_time=self.AFTER_FREEZE)
+        self.assertVisible(self.ADMIN_USER, submission)
+
+    def test_02_contest_owner(self):
+        # 2.owner/coowners' contest submissions are hidden from others
+        for owner in [self.CONTEST_OWNER] + self.CONTEST_COOWNERS:
+            submission = self.submit(owner)
+            self.assertVisible(self.NORMAL_USER, submission, False)
+            self.assertVisible(self.CONTEST_COOWNERS[1], submission)
+        # but not their submissions of other problems
+        problem = create_problem(self.ADMIN_USER, visible=True)
+        submission = self.submit(self.CONTEST_OWNER, problem)
+        self.assertVisible(self.NORMAL_USER, submission)
+
+    def test_03_freeze(self):
+        # 3.contestants' submissions after freeze time are hidden
+        contestant, other = self.CONTEST_CONTESTANTS
+        before = self.submit(contestant, submit_time=self.BEFORE_FREEZE)
+        after = self.submit(contestant, submit_time=self.AFTER_FREEZE)
+        self.assertVisible(other, before)
+        self.assertVisible(other, after, False)
+        self.assertVisible(AnonymousUser(), after, False)
+        self.assertVisible(contestant, after)
+        self.assertVisible(self.CONTEST_OWNER, after)
+        # with more than one other contestant
+        add_contestants([self.JUDGE_USERS[3]], self.CONTEST)
+        self.assertVisible(other, after, False)
+        self.assertVisible(self.JUDGE_USERS[3], after, False)
+
+    def test_04_invisible_problem(self):
+        # 4.invisible problems' submissions are seen by owners only
+        problem = create_problem(self.JUDGE_USERS[3], visible=False)
+        submission = self.submit(self.NORMAL_USER, problem)
+        self.assertVisible(self.JUDGE_USERS[3], submission)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        self.assertVisible(self.CONTEST_OWNER, submission, False)
+        # unless they are problems of a contest the user owns
+        self.CONTEST.problem.add(problem)
+        self.assertVisible(self.CONTEST_OWNER, submission)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+
+    def test_05_inactive(self):
+        # 5.ended contests and homework restrict nothing
+        submission = self.submit(self.CONTEST_CONTESTANTS[0],
+                                 submit_time=self.AFTER_FREEZE)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        self.CONTEST.is_homework = True
+        self.CONTEST.save()
+        self.assertVisible(self.NORMAL_USER, submission)
+        self.CONTEST.is_homework = False
+        self.CONTEST.end_time = datetime.now() - timedelta(minutes=1)
+        self.CONTEST.save()
+        self.assertVisible(self.NORMAL_USER, submission)
+
+    def test_06_index(self):
+        # 6.the contest index is cached and refreshed on changes
+        get_visible_submission(self.NORMAL_USER).count()
+        with CaptureQueriesContext(connection) as context:
+            get_visible_submission(self.NORMAL_USER).count()
+        for query in context.captured_queries:
+            self.assertNotIn('contest_contestant', query['sql'])
+        contest = create_contest(self.JUDGE_USERS[3],
+                                 problems=[self.CONTEST_PROBLEMS[1]])
+        submission = self.submit(self.JUDGE_USERS[3], self.CONTEST_PROBLEMS[1])
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        contest.coowner.add(self.NORMAL_USER)
+        self.assertVisible(self.NORMAL_USER, submission)
+
+    def test_07_index_version(self):
+        # 7.an index cached by this process is dropped once any process
+        # bumps the version kept in the database
+        submission = self.submit(self.CONTEST_CONTESTANTS[0],
+                                 submit_time=self.AFTER_FREEZE)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        # changed without signals, the cached index is kept
+        Contest.objects.filter(pk=self.CONTEST.pk).update(is_homework=True)
+        self.assertVisible(self.NORMAL_USER, submission, False)
+        # as done by another process, which can't touch this cache
+        invalidate_active_contest_index()
+        self.assertVisible(self.NORMAL_USER, submission)
+
+
+class Tester_Status_cursor_page(NTHUOJ_TestCase_Complex01):
+    """ test keyset paging of view 'status:status' """
+
+    def setUp(self):
+        super(Tester_Status_cursor_page, self).setUp()
+        self.SUBMISSIONS = []
+        for i in xrange(60):
+            problem = self.CONTEST_PROBLEMS[i % 2]
+            self.SUBMISSIONS.append(create_submission(
+                problem, self.NORMAL_USER, Submission.ACCEPTED))
+        self.SIDS = [submission.id for submission in self.SUBMISSIONS][::-1]
+
+    def get_sids(self, **data):
+        response = self.ADMIN_CLIENT.get(reverse('status:status'), data)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['submissions']
+        return [group['grouper'].id for group in page], page
+
+    def test_01_pages(self):
+        # 1.pages are located by the sid before or after them
+        sids, page = self.get_sids()
+        self.assertEqual(sids, self.SIDS[:25])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+        sids, page = self.get_sids(before=page.next_cursor())
+        self.assertEqual(sids, self.SIDS[25:50])
+        sids, page = self.get_sids(before=page.next_cursor())
+        self.assertEqual(sids, self.SIDS[50:])
+        self.assertFalse(page.has_next())
+        sids, page = self.get_sids(after=page.previous_cursor())
+        self.assertEqual(sids, self.SIDS[25:50])
+        self.assertTrue(page.has_previous())
+        sids, page = self.get_sids(after=page.previous_cursor())
+        self.assertEqual(sids, self.SIDS[:25])
+        self.assertFalse(page.has_previous())
+
+    def test_02_filter(self):
+        # 2.filters are kept while paging
+        pid = self.CONTEST_PROBLEMS[0].id
+        sids, page = self.get_sids(pid=pid)
+        self.assertEqual(sids, self.SIDS[1::2][:25])
+        sids, page = self.get_sids(pid=pid, before=page.next_cursor())
+        self.assertEqual(sids, self.SIDS[1::2][25:])
+
+    def test_03_cost(self):
+        # 3.deep pages need neither counting nor offset
+        with CaptureQueriesContext(connection) as context:
+            self.get_sids(before=self.SIDS[40])
+        for query in context.captured_queries:
+            sql = query['sql'].upper()
+            if 'FROM "PROBLEM_SUBMISSION"' in sql.replace('`', '"'):
+                self.assertNotIn('COUNT(', sql)
+                self.assertNotIn('OFFSET', sql)
+
+    def test_04_json(self):
+        # 4.JSON output is paged the same way with sids
+        response = self.ADMIN_CLIENT.get(
+            reverse('status:status'), {'type': 'json', 'before': self.SIDS[9]})
+        submissions = json.loads(response.content)
+        self.assertEqual([submission['id'] for submission in submissions],
+                         self.SIDS[10:35])
+
+    def test_05_page_number(self):
+        # 5.paging by page number still works
+        sids, page = self.get_sids(page=2)
+        self.assertEqual(sids, self.SIDS[25:50])
+        self.assertEqual(page.paginator.num_pages, 3)
+
+
+class Tester_Status_permission(NTHUOJ_TestCase_Complex01):
+    """ test function 'permission.get_permission_matrix' """
+
+    def setUp(self):
+        super(Tester_Status_permission, self).setUp()
+        team = Team.objects.create(team_name='team', leader=self.JUDGE_USERS[3])
+        TeamMember.objects.create(team=team, member=self.NORMAL_USER)
+        self.all_submisions_when_contest_running()
+        other_problem = create_problem(self.JUDGE_USERS[4], visible=True)
+        for user in [self.JUDGE_USERS[5], self.NORMAL_USER]:
+            create_submission(other_problem, user, Submission.ACCEPTED)
+            Submission.objects.create(problem=other_problem, user=user,
+                                      team=team)
+        self.VIEWERS = [self.ADMIN_USER, self.NORMAL_USER, AnonymousUser()] + \
+            self.JUDGE_USERS
+
+    def assertMatrix(self):
+        submissions = list(Submission.objects.select_related(
+            'user', 'problem', 'team').order_by('id'))
+        for viewer in self.VIEWERS:
+            matrix = get_permission_matrix(viewer, submissions)
+            for submission in submissions:
+                self.assertEqual(
+                    matrix[submission.id],
+                    (show_detail(submission, viewer),
+                     can_rejudge(submission, viewer)),
+                    'sid %s viewed by %s' % (submission.id, viewer))
+
+    def test_01_running(self):
+        # 1.same permissions as the filters during a contest
+        self.assertMatrix()
+
+    def test_02_ended(self):
+        # 2.same permissions as the filters after the contest
+        self.stop_running_contest()
+        self.assertMatrix()
+
+    def test_03_queries(self):
+        # 3.the number of queries does not depend on the page size
+        submissions = list(Submission.objects.select_related(
+            'user', 'problem', 'team').order_by('id'))
+        with CaptureQueriesContext(connection) as context:
+            get_permission_matrix(self.JUDGE_USERS[0], submissions[-5:])
+        with self.assertNumQueries(len(context.captured_queries)):
+            get_permission_matrix(self.JUDGE_USERS[0], submissions)
+
+    def test_04_status_table(self):
+        # 4.status rows carry the permissions of the viewer
+        response = self.JUDGE_CLIENTS[0].get(reverse('status:status'))
+        for group in response.context['submissions']:
+            submission = group['grouper']
+            self.assertEqual(
+                group['show_detail'],
+                show_detail(submission, self.JUDGE_USERS[0]))
+            self.assertEqual(
+                group['can_rejudge'],
+                can_rejudge(submission, self.JUDGE_USERS[0]))
+
+
+class Tester_Status_feed(NTHUOJ_TestCase_Complex01):
+    """ test view 'status:feed' """
+
+    def setUp(self):
+        super(Tester_Status_feed, self).setUp()
+        self.SIDS = []
+        for i in xrange(30):
+            problem = self.CONTEST_PROBLEMS[i % 2]
+            submission = create_submission(
+                problem, self.JUDGE_USERS[5], Submission.ACCEPTED)
+            self.SIDS.append(submission.id)
+        create_submission(problem, self.ADMIN_USER, Submission.ACCEPTED)
+
+    def get_feed(self, client=None, status_code=200, **data):
+        client = client or self.JUDGE_CLIENTS[0]
+        response = client.get(reverse('status:feed'), data)
+        self.assertEqual(response.status_code, status_code)
+        if status_code != 200:
+            return None
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = ''.join(response.streaming_content)
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_01_fields(self):
+        # 1.all fields by default, or the chosen fields with the sid
+        rows = self.get_feed()
+        self.assertEqual([row['sid'] for row in rows], self.SIDS)
+        self.assertEqual(sorted(rows[0].keys()), sorted(FEED_FIELDS.keys()))
+        self.assertEqual(rows[0]['user'], self.JUDGE_USERS[5].username)
+        self.assertEqual(rows[0]['pid'], self.CONTEST_PROBLEMS[0].id)
+        rows = self.get_feed(fields='status,passed')
+        self.assertEqual(sorted(rows[0].keys()), ['passed', 'sid', 'status'])
+        self.get_feed(fields='code', status_code=400)
+        self.get_feed(after='x', status_code=400)
+
+    def test_02_cursor(self):
+        # 2.the feed is synced incrementally by sid
+        rows = self.get_feed(limit=10)
+        self.assertEqual([row['sid'] for row in rows], self.SIDS[:10])
+        rows = self.get_feed(limit=10, after=rows[-1]['sid'])
+        self.assertEqual([row['sid'] for row in rows], self.SIDS[10:20])
+        rows = self.get_feed(limit=5, before=self.SIDS[10])
+        self.assertEqual([row['sid'] for row in rows],
+                         self.SIDS[5:10][::-1])
+
+    def test_03_batch(self):
+        # 3.submissions are read in batches of plain values
+        batch_size = feed.FEED_BATCH_SIZE
+        feed.FEED_BATCH_SIZE = 7
+        try:
+            with CaptureQueriesContext(connection) as context:
+                rows = self.get_feed(fields='status')
+        finally:
+            feed.FEED_BATCH_SIZE = batch_size
+        self.assertEqual([row['sid'] for row in rows], self.SIDS)
+        batches = [query for query in context.captured_queries
+                   if 'problem_submission' in query['sql']]
+        self.assertEqual(len(batches), 5)
+
+    def test_04_filter(self):
+        # 4.status filters and visibility apply
+        rows = self.get_feed(pid=self.CONTEST_PROBLEMS[1].id)
+        self.assertEqual([row['sid'] for row in rows], self.SIDS[1::2])
+        rows = self.get_feed(client=self.ADMIN_CLIENT, fields='user')
+        self.assertEqual(rows[-1]['user'], self.ADMIN_USER.username)
+        self.get_feed(username='nobody', status_code=400)
+
+    def test_05_testcases(self):
+        # 5.passed and total testcases are counted from the details
+        #   with one query per batch
+        submission = Submission.objects.get(pk=self.SIDS[0])
+        testcases = [create_testcase(submission.problem, local_files=False)
+                     for i in xrange(2)]
+        create_submission_detail(
+            submission, testcases[0], SubmissionDetail.AC)
+        create_submission_detail(
+            submission, testcases[1], SubmissionDetail.WA)
+        batch_size = feed.FEED_BATCH_SIZE
+        feed.FEED_BATCH_SIZE = 10
+        try:
+            with CaptureQueriesContext(connection) as context:
+                rows = self.get_feed(fields='passed,total')
+        finally:
+            feed.FEED_BATCH_SIZE = batch_size
+        self.assertEqual((rows[0]['passed'], rows[0]['total']), (1, 2))
+        self.assertEqual((rows[1]['passed'], rows[1]['total']), (0, 0))
+        details = [query for query in context.captured_queries
+                   if 'problem_submissiondetail' in query['sql']]
+        self.assertEqual(len(details), 3)
+
+    def test_06_testcases_first(self):
+        # 6.testcase counts asked before other fields keep every field
+        #   to its own value
+        submission = Submission.objects.get(pk=self.SIDS[0])
+        testcase = create_testcase(submission.problem, local_files=False)
+        create_submission_detail(submission, testcase, SubmissionDetail.AC)
+        rows = self.get_feed(fields='passed,user,pid')
+        self.assertEqual(rows[0], {
+            'sid': submission.id, 'passed': 1,
+            'user': self.JUDGE_USERS[5].username,
+            'pid': self.CONTEST_PROBLEMS[0].id})
+
+
+class Tester_Status_pending(NTHUOJ_TestCase_Complex01):
+    """ test view 'status:pending' """
+
+    def setUp(self):
+        super(Tester_Status_pending, self).setUp()
+        problem = self.CONTEST_PROBLEMS[0]
+        self.SUBMISSIONS = [
+            create_submission(problem, self.NORMAL_USER, Submission.WAIT)
+            for i in xrange(3)]
+        self.ADMIN_SUBMISSION = create_submission(
+            problem, self.ADMIN_USER, Submission.WAIT)
+
+    def get_response(self, status_code=200, client=None, **data):
+        client = client or self.NORMAL_CLIENT
+        response = client.get(reverse('status:pending'), data)
+        self.assertEqual(response.status_code, status_code)
+        return response
+
+    def get_pending(self, status_code=200, client=None, **data):
+        response = self.get_response(status_code, client, **data)
+        if status_code == 200:
+            return json.loads(response.content)['submissions']
+
+    def judge(self, submission, status):
+        Submission.objects.filter(pk=submission.pk).update(status=status)
+
+    def test_01_changed(self):
+        # 1.submissions the client shows outdated are returned
+        submission = self.SUBMISSIONS[0]
+        self.judge(submission, Submission.ACCEPTED)
+        sids = ','.join('%d:WAIT' % s.id for s in self.SUBMISSIONS)
+        rows = self.get_pending(sids=sids)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['sid'], submission.id)
+        self.assertEqual(rows[0]['status'], Submission.ACCEPTED)
+        self.assertIn('data-sid="%d"' % submission.id, rows[0]['row'])
+
+    def test_02_unchanged(self):
+        # 2.requests return at once with the interval to poll again
+        sids = ','.join(str(s.id) for s in self.SUBMISSIONS)
+        response = self.get_response(sids=sids)
+        content = json.loads(response.content)
+        self.assertEqual(content['submissions'], [])
+        self.assertEqual(content['poll_interval'], PENDING_POLL_INTERVAL)
+        self.assertEqual(response['Retry-After'], str(PENDING_POLL_INTERVAL))
+        rows = self.get_pending(mine=1)
+        self.assertEqual([row['sid'] for row in rows],
+                         [s.id for s in self.SUBMISSIONS])
+        self.get_pending(sids='x', status_code=400)
+
+    def test_03_invisible(self):
+        # 3.submissions the user can not view are left out
+        self.judge(self.ADMIN_SUBMISSION, Submission.ACCEPTED)
+        rows = self.get_pending(sids='%d:WAIT' % self.ADMIN_SUBMISSION.id)
+        self.assertEqual(rows, [])
+
+    def test_04_row(self):
+        # 4.rows keep the error message link and count the testcases
+        #   from the details
+        submission = self.SUBMISSIONS[0]
+        self.judge(submission, Submission.COMPILE_ERROR)
+        rows = self.get_pending(client=self.ADMIN_CLIENT,
+                                sids='%d:WAIT' % submission.id)
+        self.assertIn(reverse('status:error_message', args=[submission.id]),
+                      rows[0]['row'])
+
+        submission = self.SUBMISSIONS[1]
+        testcase = create_testcase(submission.problem, local_files=False)
+        create_submission_detail(submission, testcase, SubmissionDetail.AC)
+        self.judge(submission, Submission.ACCEPTED)
+        rows = self.get_pending(sids='%d:JUDGING' % submission.id)
+        self.assertEqual((rows[0]['passed'], rows[0]['total']), (1, 1))
+        self.assertIn('(1/1)', rows[0]['row'])
+
+
+class Tester_Status_counts(NTHUOJ_TestCase_Complex01):
+    """ test totals and status facets of view 'status:status' """
+
+    def setUp(self):
+        super(Tester_Status_counts, self).setUp()
+        self.all_submisions_when_contest_running()
+        # submissions of an invisible problem
+        problem = create_problem(self.ADMIN_USER)
+        for status in self.STATUSES:
+            create_submission(problem, self.JUDGE_USERS[0], status)
+        self.FILTERS = [
+            {}, {'pid': self.CONTEST_PROBLEMS[0].id},
+            {'username': self.NORMAL_USER.username},
+            {'username': self.JUDGE_USERS[0].username},
+            {'cid': self.CONTEST.id}, {'status': Submission.ACCEPTED},
+            {'pid': self.CONTEST_PROBLEMS[1].id, 'status': Submission.JUDGING}]
+
+    def get_response(self, client, **data):
+        response = client.get(reverse('status:status'), data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertCounts(self, client, user, **data):
+        """Assert that the total and facets on the status page are those of
+        the submissions the user can view."""
+        response = self.get_response(client, **data)
+        status_filter = StatusFilter(data)
+        self.assertTrue(status_filter.is_valid())
+        submissions = filter_submissions(
+            get_visible_submission(user),
+            dict(status_filter.cleaned_data, status=''))
+        counts = dict(submissions.order_by().values_list(
+            'status').annotate(count=Count('id')))
+        facets = [(status, counts[status])
+                  for status, name in Submission.STATUS_CHOICE
+                  if status in counts]
+        self.assertEqual(response.context['status_facets'], facets)
+        total = counts.get(data['status'], 0) if 'status' in data \
+            else sum(counts.values())
+        self.assertEqual(response.context['status_total'], total)
+
+    def test_01_admin(self):
+        # 1.admin sees the counts of all submissions
+        for data in self.FILTERS:
+            self.assertCounts(self.ADMIN_CLIENT, self.ADMIN_USER, **data)
+
+    def test_02_hidden(self):
+        # 2.submissions hidden from the user are not counted
+        for data in self.FILTERS:
+            self.assertCounts(self.NORMAL_CLIENT, self.NORMAL_USER, **data)
+            self.assertCounts(
+                self.ANONYMOUS_CLIENT, AnonymousUser(), **data)
+        # after the freeze time contest counts are not split by time
+        self.CONTEST.freeze_time = 300
+        self.CONTEST.save()
+        self.assertCounts(self.NORMAL_CLIENT, self.NORMAL_USER)
+        response = self.get_response(self.NORMAL_CLIENT, cid=self.CONTEST.id)
+        self.assertNotIn('status_total', response.context)
+
+    def test_03_cost(self):
+        # 3.totals are read without counting the submissions
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_response(self.ADMIN_CLIENT, page=2)
+        for query in context.captured_queries:
+            sql = query['sql'].upper().replace('`', '"')
+            if 'FROM "PROBLEM_SUBMISSION"' in sql:
+                self.assertNotIn('COUNT(', sql)
+        self.assertEqual(response.context['submissions'].paginator.count,
+                         Submission.objects.count())
+        self.assertContains(response, 'id="status-facets"')
+
+    def test_04_several_facets(self):
+        # 4.filters on several facets are counted the usual way
+        data = {'pid': self.CONTEST_PROBLEMS[0].id,
+                'username': self.NORMAL_USER.username, 'page': 1}
+        response = self.get_response(self.ADMIN_CLIENT, **data)
+        self.assertNotIn('status_total', response.context)
+        self.assertEqual(
+            response.context['submissions'].paginator.count,
+            Submission.objects.filter(
+                problem=self.CONTEST_PROBLEMS[0],
+                user=self.NORMAL_USER).count())
+
+    def test_05_judge_verdict(self):
+        # 5.pages of a status are counted right before the verdicts the
+        # judge writes are reconciled
+        Submission.objects.filter(status=Submission.JUDGING).update(
+            status=Submission.ACCEPTED)
+        cache.set(SUBMISSION_COUNT_SYNC_KEY, True)
+        data = {'status': Submission.ACCEPTED, 'page': 1}
+        response = self.get_response(self.ADMIN_CLIENT, **data)
+        self.assertEqual(
+            response.context['submissions'].paginator.count,
+            Submission.objects.filter(status=Submission.ACCEPTED).count())
+        # and the counts once they are
+        cache.delete(SUBMISSION_COUNT_SYNC_KEY)
+        self.assertCounts(self.ADMIN_CLIENT, self.ADMIN_USER, **data)
+
+
+class Tester_Status_row_cache(NTHUOJ_TestCase_Complex01):
+    """ test cached rows of the status table """
+
+    def setUp(self):
+        super(Tester_Status_row_cache, self).setUp()
+        self.PROBLEM = create_problem(
+            self.JUDGE_USERS[3], pname='old_name', visible=True)
+        self.FINAL = create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.ACCEPTED)
+        self.PENDING = create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.JUDGING)
+
+    def get_rows(self, client, **data):
+        response = client.get(reverse('status:status'), data)
+        self.assertEqual(response.status_code, 200)
+        return dict((group['grouper'].id, group['row'])
+                    for group in response.context['submissions'])
+
+    def rename_problem(self):
+        # renaming without saving through the model changes no version
+        Problem.objects.filter(pk=self.PROBLEM.pk).update(pname='new_name')
+
+    def test_01_final(self):
+        # 1.rows of final statuses are served from cache
+        self.get_rows(self.NORMAL_CLIENT)
+        self.rename_problem()
+        rows = self.get_rows(self.NORMAL_CLIENT)
+        self.assertIn('old_name', rows[self.FINAL.id])
+        self.assertIn('new_name', rows[self.PENDING.id])
+
+    def test_02_rejudge(self):
+        # 2.rejudging renders the row again
+        self.get_rows(self.NORMAL_CLIENT)
+        self.rename_problem()
+        rejudge_submission(Submission.objects.get(pk=self.FINAL.pk))
+        rows = self.get_rows(self.NORMAL_CLIENT)
+        self.assertIn('Being Judged', rows[self.FINAL.id])
+        submission = Submission.objects.get(pk=self.FINAL.pk)
+        submission.status = Submission.ACCEPTED
+        submission.save()
+        self.get_rows(self.NORMAL_CLIENT)
+        Problem.objects.filter(pk=self.PROBLEM.pk).update(pname='last_name')
+        rows = self.get_rows(self.NORMAL_CLIENT)
+        self.assertIn('All Accepted', rows[self.FINAL.id])
+        self.assertIn('new_name', rows[self.FINAL.id])
+
+    def test_03_permission(self):
+        # 3.rows are cached per permission class of the viewer
+        rejudge_url = reverse('status:rejudge', args=[self.FINAL.id])
+        view_code_url = reverse('status:view_code', args=[self.FINAL.id])
+        rows = self.get_rows(self.ADMIN_CLIENT)
+        self.assertIn(rejudge_url, rows[self.FINAL.id])
+        self.assertIn(view_code_url, rows[self.FINAL.id])
+        for client in [self.NORMAL_CLIENT, self.ANONYMOUS_CLIENT]:
+            rows = self.get_rows(client)
+            self.assertNotIn(rejudge_url, rows[self.FINAL.id])
+            self.assertNotIn(view_code_url, rows[self.FINAL.id])
+
+    def test_04_rejudge_link(self):
+        # 4.rejudge links keep the query string of their own page
+        rows = self.get_rows(self.ADMIN_CLIENT, pid=self.PROBLEM.id)
+        self.assertIn('?pid=%d' % self.PROBLEM.id, rows[self.FINAL.id])
+        rows = self.get_rows(self.ADMIN_CLIENT, username=self.NORMAL_USER)
+        self.assertIn('?username=%s' % self.NORMAL_USER, rows[self.FINAL.id])
+
+
+class Tester_Status_contest_status(NTHUOJ_TestCase_Complex01):
+    """ test view 'status:contest_status' """
+
+    def setUp(self):
+        super(Tester_Status_contest_status, self).setUp()
+        self.all_submisions_when_contest_running()
+        self.URL = reverse('status:contest_status', args=[self.CONTEST.id])
+
+    def get_expected_sids(self, user):
+        return list(get_contest_submissions(
+            self.CONTEST, get_visible_submission(user)
+        ).values_list('id', flat=True))
+
+    def get_page(self, client, **data):
+        response = client.get(self.URL, data)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['submissions']
+        return [group['grouper'].id for group in page], page, response
+
+    def test_01_pages(self):
+        # 1.submissions of the contest are paged by sid
+        expected = self.get_expected_sids(self.ADMIN_USER)
+        self.assertTrue(len(expected) > 25)
+        sids, page, response = self.get_page(self.ADMIN_CLIENT)
+        self.assertEqual(sids, expected[:25])
+        self.assertContains(
+            response, 'class="contest-status-link" href="%s?before=%d"'
+            % (self.URL, page.next_cursor()))
+        sids, page, response = self.get_page(
+            self.ADMIN_CLIENT, before=page.next_cursor())
+        self.assertEqual(sids, expected[25:50])
+
+    def test_02_visibility(self):
+        # 2.only submissions the user can view are listed
+        for client, user in [(self.NORMAL_CLIENT, self.NORMAL_USER),
+                             (self.JUDGE_CLIENTS[0], self.JUDGE_USERS[0])]:
+            sids, page, response = self.get_page(client)
+            self.assertEqual(sids, self.get_expected_sids(user)[:25])
+
+    def test_03_not_started(self):
+        # 3.the status of a contest not started is its owners' only
+        self.CONTEST.start_time = datetime.now() + timedelta(hours=1)
+        self.CONTEST.save()
+        response = self.NORMAL_CLIENT.get(self.URL)
+        self.assertEqual(response.status_code, 403)
+        self.get_page(self.JUDGE_CLIENTS[0])
+
+    def test_04_contest_page(self):
+        # 4.the contest page loads the status panel on demand
+        response = self.ADMIN_CLIENT.get(
+            reverse('contest:contest', args=[self.CONTEST.id]))
+        self.assertContains(response, 'data-url="%s"' % self.URL)
+        self.assertNotContains(response, 'data-sid=')
+
+    def test_05_rejudge_link(self):
+        # 5.rejudging from the panel returns to the status of the contest
+        sids, page, response = self.get_page(self.ADMIN_CLIENT)
+        self.assertContains(response, '%s?cid=%d' % (
+            reverse('status:rejudge', args=[sids[0]]), self.CONTEST.id))
@@ -27,6 +27,9 @@ import views
 
 urlpatterns = patterns('',
     url(r'^$', views.status, name='status'),
+    url(r'^feed/$', views.feed, name='feed'),
+    url(r'^pending/$', views.pending, name='pending'),
+    url(r'^contest/(?P<cid>\d+)/$', views.contest_status, name='contest_status'),
     url(r'^view_code/(?P<sid>\d+)$', views.view_code, name='view_code'),
     url(r'^rejudge/(?P<sid>\d+)$', views.rejudge, name='rejudge'),
     url(r'^error_message/(?P<sid>\d+)$', views.error_message, name="error_message"),
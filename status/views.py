@@ -21,33 +21,40 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import re
 import json
 import time
 import urllib
+from datetime import datetime
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.exceptions import PermissionDenied
 from django.core.serializers import serialize
 from django.core.urlresolvers import reverse
-from django.core.cache import cache
 
-from contest.models import Contest
 from contest.contest_info import get_running_contests
 from contest.contest_info import get_freeze_time_datetime
 from contest.contest_info import get_contest_submissions
-from problem.models import Submission, Problem
+from contest.models import Contest
+from problem.models import Submission
 from status.templatetags.status_filters import show_detail, can_rejudge
 from status.forms import StatusFilter
-from status.status_info import get_visible_submission, regroup_submission
+from status.status_info import get_visible_submission, regroup_submission, \
+    filter_submissions, get_status_counts, get_status_facets
+from status.feed import FEED_MAX_LIMIT, parse_feed_fields, get_feed_lines
+from status.row_cache import render_status_rows
+from status.pending import PENDING_STATUSES, PENDING_POLL_INTERVAL, \
+    PENDING_MAX_SUBMISSIONS, get_changed_sids, get_pending_rows, \
+    parse_statuses
 from users.forms import CodeSubmitForm
-from users.models import User
+from utils.code_store import read_code
 from utils.log_info import get_logger
-from utils.file_info import get_extension
-from utils.render_helper import render_index, get_current_page
+from utils.user_info import validate_user, has_contest_ownership
+from utils.render_helper import render_index, get_current_page, \
+    get_cursor_page
 from utils.rejudge import rejudge_submission
 
 # Create your views here.
@@ -64,40 +71,36 @@ def status(request):
     render_data['running_contests'] = get_running_contests().order_by('id')
 
     if status_filter.is_valid():
-        username = status_filter.cleaned_data['username']
-        cid = status_filter.cleaned_data['cid']
-        pid = status_filter.cleaned_data['pid']
         status = status_filter.cleaned_data['status']
-
-        if username:
-            user = User.objects.get(username=username)
-            submissions = submissions.filter(user=user)
-
-        if pid:
-            problem = Problem.objects.get(id=pid)
-            submissions = submissions.filter(problem=problem)
-
-        if cid:
-            contest = Contest.objects.get(id=cid)
-            submissions = get_contest_submissions(contest, submissions)
-
-        if status:
-            submissions = submissions.filter(status=status)
-
-        huge_table_count = None
-        # No constriant provided, the search result would be huge
-        # Cache the count for faster paging
-        if not (username or pid or cid or status):
-            if cache.get('huge_table_count'):
-                huge_table_count = cache.get('huge_table_count')
+        submissions = filter_submissions(
+            submissions, status_filter.cleaned_data)
+
+        submissions = submissions.select_related('user', 'problem', 'team')
+        # Exact totals from the maintained counts instead of a COUNT
+        status_counts = get_status_counts(
+            request.user, status_filter.cleaned_data)
+        total = None
+        if status_counts is not None:
+            render_data['status_facets'] = get_status_facets(status_counts)
+            if status:
+                total = max(status_counts.get(status, 0), 0)
             else:
-                huge_table_count = submissions.count()
-                cache.set('huge_table_count', huge_table_count, 60)
-
-        submissions = get_current_page(request, submissions, count=huge_table_count)
+                total = sum(
+                    count for _, count in render_data['status_facets'])
+            render_data['status_total'] = total
+        if 'page' in request.GET:
+            # Verdicts only move submissions between statuses, so the total
+            # stays exact. The count of a single status may lag until the
+            # verdict is reconciled, so the paginator counts those itself.
+            count = None if status else total
+            submissions = get_current_page(request, submissions, count=count)
+        else:
+            # Page by sid, deep pages cost as much as the first one
+            submissions = get_cursor_page(request, submissions)
 
         # Regroup submission details
-        submissions.object_list = regroup_submission(submissions.object_list)
+        submissions.object_list = regroup_submission(
+            submissions.object_list, request.user)
 
         # Serialize to json
         if 'type' in request.GET and request.GET['type'] == 'json':
@@ -105,9 +108,12 @@ def status(request):
                            for submission in submissions.object_list]
             # Remove unnecessary fields
             submissions = serialize("python", submissions)
-            submissions = [s['fields'] for s in submissions]
+            submissions = [dict(s['fields'], id=s['pk']) for s in submissions]
 
             return HttpResponse(json.dumps(submissions, default=lambda obj: obj.isoformat() if hasattr(obj, 'isoformat') else obj))
+
+        # Finalized rows are mostly served from cache
+        render_status_rows(request, submissions.object_list)
     else:
         messages.warning(request, 'Please check filter constraints again!')
         return render_index(request, 'status/status.html', render_data)
@@ -120,18 +126,98 @@ def status(request):
     return render_index(request, 'status/status.html', render_data)
 
 
-def contest_status(request, contest):
-    """Return a status table of given contest"""
+def feed(request):
+    """Stream the submissions visible to the user as NDJSON, one object
+    per line holding the fields named in `fields` (all by default).
+
+    The status filters (username, pid, cid, status) apply. Submissions
+    come in ascending sid order after the sid given as `after`, or in
+    descending order before the sid given as `before`, `limit` of them at
+    most. The sid of the last line is the cursor to continue from.
+    """
+    status_filter = StatusFilter(request.GET)
+    if not status_filter.is_valid():
+        return HttpResponseBadRequest(status_filter.errors.as_text())
+    try:
+        fields = parse_feed_fields(request.GET.get('fields'))
+        after = request.GET.get('after')
+        after = int(after) if after else None
+        before = request.GET.get('before')
+        before = int(before) if before else None
+        limit = int(request.GET.get('limit') or FEED_MAX_LIMIT)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    limit = max(0, min(limit, FEED_MAX_LIMIT))
+
+    submissions = filter_submissions(
+        get_visible_submission(request.user), status_filter.cleaned_data)
+    return StreamingHttpResponse(
+        get_feed_lines(submissions, fields, after, before, limit),
+        content_type='application/x-ndjson')
+
+
+def pending(request):
+    """Return the submissions whose status changed as JSON, at once.
+
+    Submissions are given as `sids=12:WAIT,13:JUDGING`, the status being
+    the one the client shows (the current one if left out), or as
+    `mine=1` for all pending submissions of the user. Each changed
+    submission comes with its rendered status row, whose rejudge link
+    keeps the query string given as `query`.
+
+    Clients wait for changes at `wait/` under this url, which the push
+    server holds open until a status changes, and ask here once one
+    does. Without the push server they are told in `poll_interval` and
+    Retry-After how many seconds to wait before asking again.
+    """
     submissions = get_visible_submission(request.user)
+    try:
+        if request.GET.get('mine'):
+            sids = []
+            if request.user.is_authenticated():
+                sids = submissions.filter(
+                    user=request.user, status__in=PENDING_STATUSES
+                ).values_list('id', flat=True)[:PENDING_MAX_SUBMISSIONS]
+        else:
+            statuses = parse_statuses(request.GET.get('sids', ''))
+            # unknown or invisible submissions are left out
+            current = dict(submissions.filter(
+                id__in=statuses.keys()).values_list('id', 'status'))
+            sids = get_changed_sids(statuses, current)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    rows = get_pending_rows(request, submissions, list(sids),
+                            request.GET.get('query', ''))
+    response = HttpResponse(
+        json.dumps({'submissions': rows,
+                    'poll_interval': PENDING_POLL_INTERVAL}),
+        content_type='application/json')
+    response['Retry-After'] = PENDING_POLL_INTERVAL
+    return response
+
+
+def contest_status(request, cid):
+    """A page of the status table of a contest, loaded into the contest
+    page. Paged by sid like the status page."""
+    user = validate_user(request.user)
+    contest = get_object_or_404(Contest, id=cid)
+    if not ((contest.start_time < datetime.now()) or
+            has_contest_ownership(user, contest) or
+            user.has_admin_auth()):
+        raise PermissionDenied
+    submissions = get_visible_submission(user)
     submissions = get_contest_submissions(contest, submissions)
-
-    submissions = regroup_submission(submissions)
-    table_content = str(
-        render(request, 'status/statusTable.html', {'submissions': submissions}))
-    # remove rendered response header
-    table_content = re.sub(
-        'Content-Type: text/html; charset=utf-8', '', table_content)
-    return table_content
+    submissions = get_cursor_page(request, submissions)
+    submissions.object_list = regroup_submission(
+        submissions.object_list, user)
+    # rejudging a row returns to the status page of the contest
+    query = request.GET.copy()
+    query['cid'] = contest.id
+    render_status_rows(request, submissions.object_list, query.urlencode())
+    return render(request, 'status/contestStatus.html',
+                  {'contest': contest, 'submissions': submissions,
+                   'request': request})
 
 
 @login_required()
@@ -156,11 +242,8 @@ def error_message(request, sid):
 def view_code(request, sid):
     try:
         submission = Submission.objects.get(id=sid)
-        filename = '%s.%s' % (sid, get_extension(submission.language))
         if show_detail(submission, request.user):
-            f = open('%s%s' % (CodeSubmitForm.SUBMIT_PATH, filename), 'r')
-            code = f.read()
-            f.close()
+            code = read_code(submission)
             codesubmitform = CodeSubmitForm(
                 initial={'code': code, 'pid': submission.problem.id, 'language': submission.language})
             problem_name = str(submission.problem)
@@ -174,8 +257,8 @@ def view_code(request, sid):
         logger.warning('SID %s Not Found!' % sid)
         raise Http404('SID %s Not Found!' % sid)
     except IOError:
-        logger.warning('File %s Not Found!' % filename)
-        raise Http404('File %s Not Found!' % filename)
+        logger.warning('Code of SID %s Not Found!' % sid)
+        raise Http404('Code of SID %s Not Found!' % sid)
 
 
 @login_required()
@@ -0,0 +1,79 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import operator
+from collections import defaultdict
+
+from django.db.models import Q
+
+from contest.active_contests import get_active_contest_index
+from problem.models import Problem
+from users.models import User
+
+
+def get_hidden_submission_filter(user):
+    """Return a Q object matching the submissions a validated user who is
+    not an admin can not view. The rules of all contests restricting
+    visibility are collected from the active contest index and compiled
+    into one predicate on submission columns with literal id lists.
+
+    1. No one can view admins' submissions.
+    2. In a contest the user does not own, they can't view
+       a. the contest owner/coowners' submissions of the contest problems
+          since the contest was created,
+       b. other contestants' submissions of the contest problems since the
+          freeze time.
+    3. Submissions of invisible problems the user does not own can't be
+       viewed, except for problems of contests the user owns.
+    """
+    hidden = Q(user__user_level=User.ADMIN)
+    owned_problems = set()
+    # (problems, since) windows of each set of restricted users
+    windows = defaultdict(list)
+    for contest in get_active_contest_index():
+        if user.username in contest['owners']:
+            owned_problems |= contest['problems']
+            continue
+        if not contest['problems']:
+            continue
+        windows[frozenset(contest['owners'])].append(
+            (contest['problems'], contest['creation_time']))
+        contestants = contest['contestants'] - set([user.username])
+        if contestants:
+            windows[frozenset(contestants)].append(
+                (contest['problems'], contest['freeze_time']))
+
+    # contests sharing their restricted users share one user list
+    for users, user_windows in windows.items():
+        hidden |= Q(user__in=sorted(users)) & reduce(operator.or_, [
+            Q(problem__in=sorted(problems), submit_time__gte=since)
+            for problems, since in user_windows])
+
+    invisible_problems = set(Problem.objects.filter(
+        visible=False
+    ).exclude(
+        owner=user.username
+    ).values_list('id', flat=True)) - owned_problems
+    if invisible_problems:
+        hidden |= Q(problem__in=sorted(invisible_problems))
+    return hidden
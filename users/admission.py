@@ -0,0 +1,138 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+from datetime import datetime
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+
+from problem.models import Submission
+from problem.submission_count import get_submission_contests
+from users.models import SubmitBucket
+from utils import config_info
+from utils.log_info import get_logger
+
+logger = get_logger()
+
+# limits used unless set in the [admission] section of nthuoj.cfg
+# rates are tokens (submissions) per second, bursts the tokens a bucket holds
+# and a rate or burst of 0 turns that limit off
+DEFAULT_LIMITS = {
+    'user_rate': 0.2,
+    'user_burst': 5,
+    'contest_rate': 5,
+    'contest_burst': 100,
+    # waiting submissions above which new ones are refused, 0 for no limit
+    'max_waiting': 500,
+    # seconds a submission refused for the waiting ones is asked to wait
+    'retry_after': 30,
+}
+# attempts to take a token while other workers update the bucket
+BUCKET_RETRIES = 5
+
+
+def get_admission_config(option):
+    try:
+        value = float(config_info.get_config('admission', option))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMITS[option]
+    return max(value, 0)
+
+
+def take_token(key, rate, burst):
+    """Take a token from the bucket of the key, refilled at rate tokens per
+    second up to burst tokens. Return 0 if taken, else the seconds until
+    a token is available."""
+    if rate <= 0 or burst <= 0:
+        return 0
+    for i in xrange(BUCKET_RETRIES):
+        # MySQL stores no microseconds, so refill from the time it stores
+        now = datetime.now().replace(microsecond=0)
+        try:
+            bucket = SubmitBucket.objects.get(key=key)
+        except SubmitBucket.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    SubmitBucket.objects.create(
+                        key=key, tokens=burst - 1, updated=now)
+                return 0
+            except IntegrityError:
+                # created by another worker meanwhile
+                continue
+        elapsed = max((now - bucket.updated).total_seconds(), 0)
+        tokens = min(burst, bucket.tokens + elapsed * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        # the bucket may be changed by another worker meanwhile
+        taken = SubmitBucket.objects.filter(
+            pk=bucket.pk, tokens=bucket.tokens, updated=bucket.updated
+        ).update(tokens=tokens - 1, updated=now)
+        if taken:
+            return 0
+    logger.warning('Bucket %s is too busy to take a token' % key)
+    return 1.0 / rate
+
+
+def give_token(key):
+    """Put back a token taken from the bucket of the key."""
+    SubmitBucket.objects.filter(key=key).update(tokens=F('tokens') + 1)
+
+
+def get_waiting_count():
+    """Return the number of waiting submissions, counted over the status
+    index as the submission counts lag behind the verdicts of the judge."""
+    return Submission.objects.filter(status=Submission.WAIT).count()
+
+
+def check_admission(user, problem):
+    """Take the tokens a submission of the user to the problem needs: one of
+    the user and one of each running contest it is in. Return 0 if the
+    submission is admitted, else the seconds to wait before submitting
+    again. Admins are not limited."""
+    if user.has_admin_auth():
+        return 0
+    max_waiting = get_admission_config('max_waiting')
+    if max_waiting and get_waiting_count() > max_waiting:
+        logger.warning('User %s refused, too many waiting submissions' % user)
+        return int(math.ceil(get_admission_config('retry_after')))
+    buckets = [('user:%s' % user.pk, get_admission_config('user_rate'),
+                get_admission_config('user_burst'))]
+    submission = Submission(
+        user=user, problem=problem, submit_time=datetime.now())
+    for contest in sorted(get_submission_contests(submission)):
+        buckets.append(('contest:%s' % contest,
+                        get_admission_config('contest_rate'),
+                        get_admission_config('contest_burst')))
+    taken = []
+    for key, rate, burst in buckets:
+        wait = take_token(key, rate, burst)
+        if wait:
+            # the submission is refused as a whole
+            for taken_key in taken:
+                give_token(taken_key)
+            logger.warning('User %s refused by bucket %s' % (user, key))
+            return int(math.ceil(wait))
+        taken.append(key)
+    return 0
@@ -22,11 +22,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 from django import forms
+from django.db import transaction
 from threading import Thread
 
 from users.models import User
 from problem.models import Problem, Submission, SubmissionDetail, Testcase
-from utils import log_info, user_info, config_info, file_info
+from problem.problem_info import add_problem_counts
+from problem.judge_queue import writes_code_files
+from utils import log_info, user_info, config_info, code_store
 
 logger = log_info.get_logger()
 
@@ -65,21 +68,29 @@ class CodeSubmitForm(forms.Form):
         code = self.cleaned_data['code']
         language = self.cleaned_data['language']
 
-        problem = Problem.objects.get(id=pid)
-        problem.total_submission += 1
-        problem.save()
-        submission = Submission.objects.create(
-            user=self.user,
-            problem=problem,
-            language=language)
         try:
-            filename = '%s.%s' % (
-                submission.id, file_info.get_extension(submission.language))
-            f = open('%s%s' % (self.SUBMIT_PATH, filename), 'w')
-            f.write(code.encode('utf-8'))
-            f.close()
-        except IOError:
-            logger.warning('Sid %s fail to save code' % submission.id)
+            code_hash = code_store.save_code(code)
+        except (IOError, OSError):
+            logger.warning('User %s fail to save code of pid %s' %
+                           (self.user, pid))
+            code_hash = ''
+
+        # the submission and its submission counts are saved together
+        with transaction.atomic():
+            problem = Problem.objects.get(id=pid)
+            submission = Submission.objects.create(
+                user=self.user,
+                problem=problem,
+                language=language,
+                code_hash=code_hash)
+            # last, so that the counter row is locked only until the commit
+            add_problem_counts(problem.id, total_submission=1)
+        # the external judge not using the queue reads <sid>.<ext> only
+        if writes_code_files():
+            try:
+                code_store.save_judge_code(submission, code)
+            except IOError:
+                logger.warning('Sid %s fail to save code' % submission.id)
 
         if problem.judge_source == Problem.OTHER:
             #  Send to other judge
@@ -135,15 +135,31 @@ class Notification(models.Model):
         return str(self.id)
 
 
+def get_default_active_time():
+    # default active time is 15 minutes
+    return datetime.now() + timedelta(minutes=15)
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User)
     activation_key = models.CharField(max_length=40, blank=True)
-    # default active time is 15 minutes
-    active_time = models.DateTimeField(
-        default=lambda: datetime.now() + timedelta(minutes=15))
+    active_time = models.DateTimeField(default=get_default_active_time)
 
     def __unicode__(self):
         return self.user.username
 
     class Meta:
         verbose_name_plural = u'User profiles'
+
+
+class SubmitBucket(models.Model):
+    """Token bucket limiting the submissions of a user or a contest, kept in
+    the database so that every web worker sees the same tokens.
+    Maintained by users.admission."""
+    # 'user:<user pk>' or 'contest:<contest id>'
+    key = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated = models.DateTimeField()
+
+    def __unicode__(self):
+        return '%s: %.2f' % (self.key, self.tokens)
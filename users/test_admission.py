@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+from django.core.urlresolvers import reverse
+
+from problem.models import Submission
+from users import admission
+from users.admission import check_admission, take_token
+from users.models import SubmitBucket
+from utils import code_store
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Basic
+from utils.test_helper import *
+
+
+class Tester_Submit_admission(NTHUOJ_TestCase_Basic):
+    """ test admission control of view 'users:submit' """
+
+    def setUp(self):
+        super(Tester_Submit_admission, self).setUp()
+        self.PROBLEM = create_problem(self.ADMIN_USER, visible=True)
+        self.LIMITS = dict(admission.DEFAULT_LIMITS)
+        self.get_admission_config = admission.get_admission_config
+        admission.get_admission_config = lambda option: self.LIMITS[option]
+        self.CODE_PATH = code_store.CODE_PATH
+        code_store.CODE_PATH = TEST_PATH
+
+    def tearDown(self):
+        admission.get_admission_config = self.get_admission_config
+        code_store.CODE_PATH = self.CODE_PATH
+        super(Tester_Submit_admission, self).tearDown()
+
+    def submit(self, client):
+        return client.post(reverse('users:submit'), {
+            'pid': self.PROBLEM.pk, 'code': 'int main(){}',
+            'language': Submission.C})
+
+    def rewind_buckets(self, seconds):
+        for bucket in SubmitBucket.objects.all():
+            bucket.updated -= timedelta(seconds=seconds)
+            bucket.save()
+
+    def test_01_user_bucket(self):
+        self.LIMITS.update(user_rate=0.1, user_burst=3)
+        # 1.submissions within the burst are accepted
+        for i in xrange(3):
+            response = self.submit(self.NORMAL_CLIENT)
+            self.assertEqual(response.status_code, 302)
+        # 2.the next one is refused with the time to wait
+        # Expectation: error 429
+        response = self.submit(self.NORMAL_CLIENT)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertContains(response, 'try again in 10 seconds',
+                            status_code=429)
+        self.assertEqual(Submission.objects.count(), 3)
+        # 3.another user has a bucket of its own
+        response = self.submit(self.JUDGE_CLIENT)
+        self.assertEqual(response.status_code, 302)
+        # 4.the bucket refills over time
+        self.rewind_buckets(10)
+        response = self.submit(self.NORMAL_CLIENT)
+        self.assertEqual(response.status_code, 302)
+        response = self.submit(self.NORMAL_CLIENT)
+        self.assertEqual(response.status_code, 429)
+
+    def test_02_contest_bucket(self):
+        self.LIMITS.update(contest_rate=0.5, contest_burst=1)
+        create_contest(self.ADMIN_USER, problems=[self.PROBLEM],
+                       contestants=[self.NORMAL_USER, self.JUDGE_USER])
+        # 1.contestants share the bucket of the contest
+        self.assertEqual(check_admission(self.NORMAL_USER, self.PROBLEM), 0)
+        self.assertEqual(check_admission(self.JUDGE_USER, self.PROBLEM), 2)
+        # 2.a refused submission takes no token of the user
+        bucket = SubmitBucket.objects.get(key='user:%s' % self.JUDGE_USER.pk)
+        self.assertAlmostEqual(bucket.tokens,
+                               self.LIMITS['user_burst'], places=2)
+        # 3.submissions out of the contest are limited by user only
+        problem = create_problem(self.ADMIN_USER, visible=True)
+        self.assertEqual(check_admission(self.JUDGE_USER, problem), 0)
+        # 4.admins are not limited
+        self.assertEqual(check_admission(self.ADMIN_USER, self.PROBLEM), 0)
+
+    def test_03_backpressure(self):
+        self.LIMITS.update(max_waiting=2, retry_after=45)
+        for i in xrange(3):
+            create_submission(self.PROBLEM, self.ADMIN_USER, Submission.WAIT)
+        # 1.new submissions are refused while too many are waiting
+        # Expectation: error 429
+        response = self.submit(self.NORMAL_CLIENT)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '45')
+        self.assertFalse(SubmitBucket.objects.exists())
+        # 2.they are accepted again once judged
+        Submission.objects.filter(problem=self.PROBLEM).first().delete()
+        response = self.submit(self.NORMAL_CLIENT)
+        self.assertEqual(response.status_code, 302)
+
+    def test_04_take_token(self):
+        # 1.a bucket is full at first and refused with time to wait once empty
+        self.assertEqual(take_token('user:x', 1, 2), 0)
+        self.assertEqual(take_token('user:x', 1, 2), 0)
+        self.assertAlmostEqual(take_token('user:x', 1, 2), 1, places=1)
+        # 2.tokens are read from the database every web worker shares
+        bucket = SubmitBucket.objects.get(key='user:x')
+        bucket.tokens = 5
+        bucket.save()
+        self.assertEqual(take_token('user:x', 1, 10), 0)
+        self.assertAlmostEqual(
+            SubmitBucket.objects.get(key='user:x').tokens, 4, places=1)
+        # 3.a rate or burst of 0 turns the limit off
+        self.assertEqual(take_token('user:y', 0, 0), 0)
+        self.assertFalse(SubmitBucket.objects.filter(key='user:y').exists())
+
+    def test_05_truncated_update_time(self):
+        # 1.a stored time without microseconds credits no extra tokens
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls):
+                return datetime(2015, 1, 1, 12, 0, 0, 900000)
+        admission.datetime = FixedDatetime
+        try:
+            for i in xrange(2):
+                self.assertEqual(take_token('user:x', 1, 2), 0)
+                # saved the way MySQL keeps it
+                bucket = SubmitBucket.objects.get(key='user:x')
+                bucket.updated = bucket.updated.replace(microsecond=0)
+                bucket.save()
+            self.assertAlmostEqual(take_token('user:x', 1, 2), 1, places=1)
+        finally:
+            admission.datetime = datetime
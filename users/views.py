@@ -36,6 +36,7 @@ from django.shortcuts import redirect
 from contest.public_user import is_public_user
 from problem.models import Problem
 from users.admin import UserCreationForm, AuthenticationForm
+from users.admission import check_admission
 from users.forms import CodeSubmitForm
 from users.forms import UserProfileForm, UserLevelForm, UserForgetPasswordForm
 from users.models import UserProfile, Notification
@@ -206,19 +207,29 @@ def user_block_wrong_tries(request):
 def submit(request, pid=None):
     render_data = {}
     render_data['form'] = CodeSubmitForm(initial={'pid': pid})
+    retry_after = 0
     if request.method == 'POST':
         codesubmitform = CodeSubmitForm(request.POST, user=request.user)
         render_data['form'] = codesubmitform
         if codesubmitform.is_valid():
-            codesubmitform.submit()
-            return redirect('%s?username=%s' % (reverse('status:status'), request.user.username))
+            problem = Problem.objects.get(id=codesubmitform.cleaned_data['pid'])
+            retry_after = check_admission(request.user, problem)
+            if not retry_after:
+                codesubmitform.submit()
+                return redirect('%s?username=%s' % (reverse('status:status'), request.user.username))
+            messages.error(
+                request, 'Too many submissions now, please try again in %d seconds.' % retry_after)
     # Get problem name
     try:
         pid = request.POST.get('pid', pid)
         render_data['problem_name'] = str(Problem.objects.get(id=pid))
     except:
         logger.warning('Submit pid %s does not exist!' % pid)
-    return render_index(request, 'users/submit.html', render_data)
+    response = render_index(request, 'users/submit.html', render_data)
+    if retry_after:
+        response.status_code = 429
+        response['Retry-After'] = str(retry_after)
+    return response
 
 
 def register_confirm(request, activation_key):
@@ -0,0 +1,167 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2014 NTHUOJ team
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import errno
+import hashlib
+import os
+import re
+import tempfile
+import zlib
+
+from problem.models import Submission
+from utils import config_info
+from utils.file_info import get_extension
+
+CODE_PATH = config_info.get_config('path', 'submission_code_path')
+# blobs live in CODE_PATH/blobs/ab/cd/abcd....z, named by the sha256 of the
+# uncompressed code so identical submissions share one blob
+BLOB_DIR = 'blobs'
+BLOB_SUFFIX = '.z'
+LEGACY_NAME = re.compile(r'^(\d+)\.(\w+)$')
+MIGRATE_BATCH_SIZE = 500
+
+
+def get_code_hash(data):
+    """Return the hash of the given code in bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_blob_path(code_hash):
+    """Return the path of the blob with the given hash"""
+    return os.path.join(CODE_PATH, BLOB_DIR, code_hash[0:2], code_hash[2:4],
+                        code_hash + BLOB_SUFFIX)
+
+
+def get_legacy_path(submission):
+    """Return the path of a submission's <sid>.<ext> code file, the only
+    place the external judge reads code from"""
+    return '%s%s.%s' % (CODE_PATH, submission.id,
+                        get_extension(submission.language))
+
+
+def save_code(code):
+    """Store the code compressed and return its hash.
+
+    Code already in the store is not written again. The blob is written to a
+    temporary file first and renamed, so a reader never sees half a blob.
+    Raise IOError or OSError when the blob can't be written.
+    """
+    if isinstance(code, unicode):
+        code = code.encode('utf-8')
+    code_hash = get_code_hash(code)
+    path = get_blob_path(code_hash)
+    if os.path.isfile(path):
+        return code_hash
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zlib.compress(code, 9))
+        os.chmod(temp_path, 0644)
+        os.rename(temp_path, path)
+    except (IOError, OSError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return code_hash
+
+
+def save_judge_code(submission, code):
+    """Write the code of a submission to its <sid>.<ext> file for the
+    external judge. Raise IOError when it can't be written."""
+    if isinstance(code, unicode):
+        code = code.encode('utf-8')
+    with open(get_legacy_path(submission), 'wb') as f:
+        f.write(code)
+
+
+def read_blob(code_hash):
+    """Return the code in bytes of the blob with the given hash"""
+    with open(get_blob_path(code_hash), 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+def read_code(submission):
+    """Return the code of a submission.
+
+    Submissions saved before the store have no code hash and are read from
+    their legacy file. Raise IOError when the code is missing.
+    """
+    if submission.code_hash:
+        try:
+            data = read_blob(submission.code_hash)
+        except zlib.error:
+            raise IOError('Blob %s is corrupted' % submission.code_hash)
+    else:
+        with open(get_legacy_path(submission), 'rb') as f:
+            data = f.read()
+    return data.decode('utf-8', 'replace')
+
+
+def get_legacy_files():
+    """Return {sid: file name} of the legacy code files"""
+    files = {}
+    for name in os.listdir(CODE_PATH):
+        match = LEGACY_NAME.match(name)
+        if match and os.path.isfile(os.path.join(CODE_PATH, name)):
+            files[int(match.group(1))] = name
+    return files
+
+
+def migrate_legacy_code(remove=False, batch_size=MIGRATE_BATCH_SIZE):
+    """Copy the legacy code files into the store batch by batch.
+
+    Only files of submissions not in the store yet whose name matches the
+    submission's language are copied, so nothing readable is lost. The
+    legacy files are kept for the external judge, which reads nothing else,
+    unless remove is set, in which case they are removed once their
+    submissions point to the blobs. Return the number of submissions
+    migrated.
+    """
+    files = get_legacy_files()
+    sids = sorted(files)
+    migrated = 0
+    for i in xrange(0, len(sids), batch_size):
+        submissions = Submission.objects.filter(
+            id__in=sids[i:i + batch_size], code_hash='').only('id', 'language')
+        sids_by_hash = {}
+        for submission in submissions:
+            name = files[submission.id]
+            if name != os.path.basename(get_legacy_path(submission)):
+                continue
+            with open(os.path.join(CODE_PATH, name), 'rb') as f:
+                code_hash = save_code(f.read())
+            sids_by_hash.setdefault(code_hash, []).append(submission.id)
+        for code_hash, hash_sids in sids_by_hash.iteritems():
+            Submission.objects.filter(id__in=hash_sids).update(
+                code_hash=code_hash)
+            migrated += len(hash_sids)
+            if remove:
+                for sid in hash_sids:
+                    os.remove(os.path.join(CODE_PATH, files[sid]))
+    return migrated
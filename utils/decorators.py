@@ -21,7 +21,11 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import hmac
+
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from problem import judge_queue
 from utils.user_info import validate_user
 
 
@@ -53,3 +57,15 @@ def admin_auth_required(view):
             return view(request, *args, **kwargs)
         return HttpResponseRedirect(settings.LOGIN_URL)
     return f
+
+
+def judge_token_required(view):
+    """A decorator to ensure the request carries the judge token in its
+    X-Judge-Token header."""
+    def f(request, *args, **kwargs):
+        token = judge_queue.get_judge_token()
+        given = request.META.get('HTTP_X_JUDGE_TOKEN', '')
+        if token and hmac.compare_digest(str(token), str(given)):
+            return view(request, *args, **kwargs)
+        raise PermissionDenied
+    return f
@@ -0,0 +1,39 @@
+'''
+    The MIT License (MIT)
+    Copyright (c) 2014 NTHUOJ team
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+    '''
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from utils.code_store import migrate_legacy_code
+
+
+class Command(BaseCommand):
+    help = 'Copy the <sid>.<ext> code files of submission_code_path into ' \
+        'the code store'
+    option_list = BaseCommand.option_list + (
+        make_option('--remove', action='store_true', dest='remove',
+                    default=False,
+                    help='Remove the legacy code files after copying them, '
+                    'only if no judge reads them'),
+    )
+
+    def handle(self, *args, **options):
+        migrated = migrate_legacy_code(remove=options['remove'])
+        self.stdout.write('%d submissions migrated' % migrated)
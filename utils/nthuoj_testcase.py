@@ -1,4 +1,5 @@
 from django.test import TestCase, Client
+from django.core.cache import cache
 
 from time import sleep
 from datetime import datetime, timedelta
@@ -8,6 +9,8 @@ from utils.test_helper import *
 class NTHUOJ_TestCase_Basic(TestCase):
 
     def setUp(self):
+        # database ids are reused between tests, so are cache keys
+        cache.clear()
         create_test_directory()
         create_test_admin_user()
         create_test_judge_user()
@@ -27,6 +30,7 @@ class NTHUOJ_TestCase_Basic(TestCase):
 class NTHUOJ_TestCase_Complex01(TestCase):
 
     def setUp(self):
+        cache.clear()
         create_test_directory()
         create_test_admin_user()
         # create 6 judge level users
@@ -86,6 +90,7 @@ class NTHUOJ_TestCase_Complex01(TestCase):
 class NTHUOJ_TestCase_Complex02(TestCase):
 
     def setUp(self):
+        cache.clear()
         create_test_admin_user()
         # create 6 judge level users
         # (1 as contest owner, 2 as coowner,
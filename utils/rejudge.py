@@ -21,12 +21,18 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+from django.db import transaction
+from django.db.models import F
+
 from problem.models import Problem
 from problem.models import Submission
 from problem.models import SubmissionDetail
+from problem.problem_info import add_problem_counts
 
 from contest.models import Contest
 from contest.models import Contestant
+from contest.contest_result import refresh_results
+from contest.contest_version import bump_data_version
 from utils.user_info import send_notification
 from utils.log_info import get_logger
 
@@ -59,18 +65,26 @@ def rejudge_problem(problem):
 
 
 def rejudge_submission(submission):
-    if submission.status == Submission.ACCEPTED:
-        submission.problem.ac_count -= 1
-        submission.problem.save()
-    submission.status = Submission.WAIT
-    submission.save()
+    # the status and its submission counts change together
+    with transaction.atomic():
+        accepted = submission.status == Submission.ACCEPTED
+        # remove details before saving so that contest results see no details
+        submission_details = SubmissionDetail.objects.filter(sid=submission)
+        for submission_detail in submission_details:
+            logger.info('SubmissionDetail %s deleted!' % submission_detail)
+            submission_detail.delete()
+        submission.status = Submission.WAIT
+        submission.save()
+        # rows rendered before the rejudge are no longer used
+        Submission.objects.filter(pk=submission.pk).update(
+            status_version=F('status_version') + 1)
+        submission.status_version += 1
+        # last, so that the counter row is locked only until the commit
+        if accepted:
+            add_problem_counts(submission.problem_id, ac_count=-1)
     notification = "Your submission %s is to be rejudged!" % submission.id
     send_notification(submission.user, notification)
     logger.info('Submission %s rejudged!' % submission.id)
-    submission_details = SubmissionDetail.objects.filter(sid=submission)
-    for submission_detail in submission_details:
-        logger.info('SubmissionDetail %s deleted!' % submission_detail)
-        submission_detail.delete()
 
 # rejudge submissions during contest
 
@@ -92,3 +106,7 @@ def rejudge_contest_problem(contest, problem):
         user__in=contestants)
     for submission in submissions:
         rejudge_submission(submission)
+    refresh_results(contest, problems=[problem])
+    # the snapshot of an ended contest is stored again at the new
+    # version once the rejudged submissions are judged
+    bump_data_version(contest)
@@ -79,7 +79,7 @@ def get_current_page(request, objects, **kwargs):
     """
     # Show 25 items per page by default
     paginator = Paginator(objects, kwargs.get('slice', 25))
-    page = request.GET.get('page')
+    page = kwargs.get('page') or request.GET.get('page')
     paginator._count = kwargs.get('count')
     try:
         objects = paginator.page(page)
@@ -93,6 +93,82 @@ def get_current_page(request, objects, **kwargs):
     return objects
 
 
+class CursorPage(object):
+    """A page of objects ordered by descending id, located by the id right
+    before or after it instead of a page number, so that no page needs a
+    total count or an OFFSET scan."""
+
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        # kept apart as object_list may be regrouped later
+        ids = [obj.id for obj in object_list]
+        self._first_id = ids[0] if ids else None
+        self._last_id = ids[-1] if ids else None
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def previous_cursor(self):
+        """Return the `after` cursor of the previous (newer) page."""
+        return self._first_id
+
+    def next_cursor(self):
+        """Return the `before` cursor of the next (older) page."""
+        return self._last_id
+
+
+def get_cursor_page(request, objects, **kwargs):
+    """Keyset paging over a querySet ordered by descending id
+        The page holds the objects right before the id given as `before`,
+        or right after the id given as `after`, or the first objects.
+
+        Returns a CursorPage.
+    """
+    # Show 25 items per page by default
+    size = kwargs.get('slice', 25)
+    objects = objects.order_by()
+    try:
+        before = int(request.GET.get('before'))
+    except (TypeError, ValueError):
+        before = None
+    try:
+        after = int(request.GET.get('after'))
+    except (TypeError, ValueError):
+        after = None
+
+    if after is not None:
+        # fetch one more object to know whether there is a newer page
+        object_list = list(
+            objects.filter(id__gt=after).order_by('id')[:size + 1])
+        if object_list:
+            has_previous = len(object_list) > size
+            has_next = objects.filter(id__lte=after).exists()
+            return CursorPage(object_list[:size][::-1], has_previous, has_next)
+        # no newer objects, show the first page then
+        before = None
+
+    if before is not None:
+        objects_before = objects.filter(id__lt=before)
+    else:
+        objects_before = objects
+    object_list = list(objects_before.order_by('-id')[:size + 1])
+    has_next = len(object_list) > size
+    has_previous = before is not None and \
+        objects.filter(id__gte=before).exists()
+    return CursorPage(object_list[:size], has_previous, has_next)
+
+
 def get_next_page(next_page):
     try:
         resolve(next_page)
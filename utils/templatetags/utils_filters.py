@@ -36,3 +36,13 @@ def url_replace(request, field, value):
         dict_ = QueryDict('', mutable=True)
     dict_[field] = value
     return dict_.urlencode()
+
+
+@register.simple_tag()
+def cursor_url(request, field, value):
+    """Return the query string of the request moved to another cursor page."""
+    dict_ = request.GET.copy()
+    for cursor in ('page', 'before', 'after'):
+        dict_.pop(cursor, None)
+    dict_[field] = value
+    return dict_.urlencode()
@@ -0,0 +1,139 @@
+import os
+import zlib
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+
+from problem import judge_queue
+from problem.models import Submission
+from users.forms import CodeSubmitForm
+from utils import code_store
+from utils.code_store import get_blob_path, get_legacy_path, read_code, \
+    save_code
+from utils.nthuoj_testcase import NTHUOJ_TestCase_Basic
+from utils.test_helper import *
+
+
+class Tester_Code_store(NTHUOJ_TestCase_Basic):
+    """ test storage of submitted code """
+
+    def setUp(self):
+        super(Tester_Code_store, self).setUp()
+        self.PROBLEM = create_problem(self.ADMIN_USER, visible=True)
+        self.CODE_PATH = code_store.CODE_PATH
+        code_store.CODE_PATH = TEST_PATH
+
+    def tearDown(self):
+        code_store.CODE_PATH = self.CODE_PATH
+        super(Tester_Code_store, self).tearDown()
+
+    def get_blob_files(self):
+        blob_files = []
+        for root, dirs, files in os.walk(os.path.join(TEST_PATH, 'blobs')):
+            blob_files.extend(files)
+        return blob_files
+
+    def create_legacy_code(self, submission, code):
+        with open(get_legacy_path(submission), 'wb') as f:
+            f.write(code)
+
+    def test_01_save_code(self):
+        # 1.code is compressed in a sharded blob named by its hash
+        code = 'int main(){return 0;}\n' * 100
+        code_hash = save_code(code)
+        path = get_blob_path(code_hash)
+        self.assertEqual(
+            path, os.path.join(TEST_PATH, 'blobs', code_hash[0:2],
+                               code_hash[2:4], code_hash + '.z'))
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertLess(len(data), len(code))
+        self.assertEqual(zlib.decompress(data), code)
+        # 2.identical code is stored once, different code in another blob
+        self.assertEqual(save_code(unicode(code)), code_hash)
+        self.assertNotEqual(save_code(code + '\n'), code_hash)
+        self.assertEqual(len(self.get_blob_files()), 2)
+
+    def test_02_submit(self):
+        # 1.submitted code goes to the store and to <sid>.<ext>, which the
+        # external judge reads without the queue
+        # Expectation: view_code shows it from the blob
+        code = u'int main(){puts("\u4f60\u597d");}'
+        form = CodeSubmitForm(user=self.NORMAL_USER)
+        form.cleaned_data = {'pid': self.PROBLEM.pk, 'code': code,
+                             'language': Submission.C}
+        form.submit()
+        submission = Submission.objects.get(problem=self.PROBLEM)
+        self.assertEqual(len(submission.code_hash), 64)
+        with open(get_legacy_path(submission), 'rb') as f:
+            self.assertEqual(f.read().decode('utf-8'), code)
+        os.remove(get_legacy_path(submission))
+        self.assertEqual(read_code(submission), code)
+        target_url = reverse('status:view_code', args=[submission.pk])
+        response = self.NORMAL_CLIENT.get(target_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].initial['code'], code)
+
+    def test_03_legacy_code(self):
+        # 1.code of submissions before the store is read from <sid>.<ext>
+        submission = create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.ACCEPTED)
+        self.create_legacy_code(submission, 'legacy code')
+        self.assertEqual(read_code(submission), 'legacy code')
+        # 2.a missing blob is reported like a missing file
+        # Expectation: error 404
+        submission.code_hash = 'f' * 64
+        submission.save()
+        target_url = reverse('status:view_code', args=[submission.pk])
+        response = self.ADMIN_CLIENT.get(target_url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_04_migrate(self):
+        submissions = [create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.ACCEPTED)
+            for i in xrange(3)]
+        for submission, code in zip(submissions, ['a', 'a', 'b']):
+            self.create_legacy_code(submission, code)
+        # files of no submission or of another language are left alone
+        stray_files = [
+            os.path.join(TEST_PATH, '1000000.c'),
+            os.path.join(TEST_PATH, '%s.cpp' % submissions[0].pk)]
+        for file_name in stray_files:
+            with open(file_name, 'w') as f:
+                f.write('stray')
+        # 1.legacy files are copied into deduped blobs and kept
+        call_command('migrate_submission_code', stdout=open(os.devnull, 'w'))
+        for submission, code in zip(submissions, ['a', 'a', 'b']):
+            submission = Submission.objects.get(pk=submission.pk)
+            self.assertNotEqual(submission.code_hash, '')
+            self.assertEqual(read_code(submission), code)
+            self.assertTrue(os.path.exists(get_legacy_path(submission)))
+        self.assertEqual(len(self.get_blob_files()), 2)
+        for file_name in stray_files:
+            self.assertTrue(os.path.exists(file_name))
+        # 2.the legacy files can be removed
+        submission = create_submission(
+            self.PROBLEM, self.NORMAL_USER, Submission.ACCEPTED)
+        self.create_legacy_code(submission, 'c')
+        call_command('migrate_submission_code', remove=True,
+                     stdout=open(os.devnull, 'w'))
+        submission = Submission.objects.get(pk=submission.pk)
+        self.assertEqual(read_code(submission), 'c')
+        self.assertFalse(os.path.exists(get_legacy_path(submission)))
+        self.assertTrue(os.path.exists(get_legacy_path(submissions[0])))
+
+    def test_05_submit_with_queue(self):
+        # 1.judges using the queue get the code from it, so no <sid>.<ext>
+        # is written unless asked for
+        get_judge_token = judge_queue.get_judge_token
+        judge_queue.get_judge_token = lambda: 'judge-token'
+        try:
+            form = CodeSubmitForm(user=self.NORMAL_USER)
+            form.cleaned_data = {'pid': self.PROBLEM.pk, 'code': 'code',
+                                 'language': Submission.C}
+            form.submit()
+        finally:
+            judge_queue.get_judge_token = get_judge_token
+        submission = Submission.objects.get(problem=self.PROBLEM)
+        self.assertFalse(os.path.exists(get_legacy_path(submission)))
+        self.assertEqual(read_code(submission), 'code')
@@ -7,7 +7,7 @@ import filecmp
 import shutil
 from datetime import datetime, timedelta
 
-from problem.models import Problem, Tag, Testcase, Submission
+from problem.models import Problem, Tag, Testcase, Submission, SubmissionDetail
 from contest.models import Contest, Clarification
 from contest.register_contest import add_contestants
 from users.models import User
@@ -190,6 +190,12 @@ def create_submission(problem, user, status, submit_time=None, error_msg=None):
     submission.save()
     return submission
 
+
+def create_submission_detail(submission, testcase, verdict):
+    submission_detail = SubmissionDetail.objects.create(
+        sid=submission, tid=testcase, verdict=verdict)
+    return submission_detail
+
 def POST_data_of_editing_Problem(owner, pname=None, description=None, input=None,
                                  output=None, sample_in=None, sample_out=None,
                                  visible=True, judge_source=Problem.LOCAL,
@@ -288,6 +294,30 @@ def POST_data_of_editing_Contest(owner, cname=None, start_time=None, end_time=No
     }
     return data
 
+
+def random_scoreboard_results(usernames, problems, total_testcases, start_time):
+    """Return random (attempts, AC time, passed testcases) of each user on
+    each problem, keyed by (username, problem id)."""
+    results = {}
+    for username in usernames:
+        for problem in problems:
+            attempts = random.randint(0, 5)
+            if attempts == 0:
+                continue
+            total = total_testcases[problem.id]
+            if total == 0:
+                # any submission solves a problem without testcase
+                attempts = 1
+            if total == 0 or random.randint(0, 1):
+                ac_time = start_time + timedelta(
+                    seconds=random.randint(0, 5 * 60 * 60))
+                passed = total
+            else:
+                ac_time = None
+                passed = random.randint(0, max(total - 1, 0))
+            results[(username, problem.id)] = (attempts, ac_time, passed)
+    return results
+
 def create_clarification(contest, problem, asker, content=None):
     if content == None:
         content = random_word(100)
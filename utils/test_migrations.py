@@ -0,0 +1,17 @@
+from django.apps import apps
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+from django.test import TestCase
+
+
+class Tester_Migrations(TestCase):
+    """ test the migrations shipped with the apps """
+
+    def test_01_up_to_date(self):
+        # 1.the models have no changes the migrations miss
+        # Expectation: nothing for makemigrations to write
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        autodetector = MigrationAutodetector(
+            loader.project_state(), ProjectState.from_apps(apps))
+        self.assertEqual(autodetector.changes(graph=loader.graph), {})